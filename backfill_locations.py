@@ -0,0 +1,32 @@
+"""Geocode the receiver address of every shipment that has no stored coordinates yet.
+
+Shipments created one at a time are located right after creation; this covers existing rows and shipments
+from bulk creation and CSV imports. Safe to run again, e.g. after an import:
+
+python backfill_locations.py --concurrency 10
+"""
+
+import argparse
+import asyncio
+
+from src.config.redis import create_redis
+from src.db.session import async_session, engine
+from src.services.shipment_locations import backfill_locations
+
+
+async def main(batch_size: int, concurrency: int) -> None:
+    redis = create_redis()
+    try:
+        result = await backfill_locations(async_session, redis, batch_size=batch_size, concurrency=concurrency)
+    finally:
+        await redis.aclose()
+        await engine.dispose()
+    print(f"Located {result.located} of {result.shipments} shipments in {result.seconds:.1f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000, help="shipments per transaction")
+    parser.add_argument("--concurrency", type=int, default=10, help="geocoding calls in flight")
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size, args.concurrency))
@@ -0,0 +1,120 @@
+"""Memory of the shipment export over a large table.
+
+Seeds synthetic shipments (two articles each, tracking numbers prefixed BENCH) into DATABASE_URL if they
+aren't there yet, then runs the NDJSON export in this process and samples its RSS as the rows go by:
+
+    DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.bench_export_rss --shipments 1000000
+
+With --load-all it loads the same rows with ShipmentsRepo.fetch_all instead, for comparison.
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from sqlalchemy import text
+
+from src.db.session import async_session, engine
+from src.db.shipments_repo import ShipmentsRepo
+from src.services.shipments_export import ExportFormat, export_shipments
+
+
+SEED_BATCH_SIZE = 100_000
+
+SEED_SQL = text(
+    """
+    WITH new_shipments AS (
+        INSERT INTO shipment (tracking_number, carrier, sender_address, receiver_address, status)
+        SELECT
+            'BENCH' || lpad(n::text, 9, '0'),
+            (ARRAY['DHL', 'UPS', 'DPD', 'GLS', 'FedEx'])[1 + n % 5],
+            'Street ' || n % 100 || ', 10115 Berlin, Germany',
+            'Street ' || n % 97 || ', 75001 Paris, France',
+            'in_transit'
+        FROM generate_series(CAST(:first AS integer), CAST(:last AS integer)) AS n
+        ON CONFLICT (tracking_number) DO NOTHING
+        RETURNING id
+    )
+    INSERT INTO article (shipment_id, name, quantity, price, sku)
+    SELECT new_shipments.id, 'Article ' || k, k, 9.99 * k, 'SKU' || k
+    FROM new_shipments CROSS JOIN generate_series(1, 2) AS k
+    """
+)
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as statm:
+        resident_pages = int(statm.read().split()[1])
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+
+async def seed(total: int) -> None:
+    async with engine.begin() as conn:
+        existing = await conn.scalar(text("SELECT count(*) FROM shipment WHERE tracking_number LIKE 'BENCH%'"))
+    if existing >= total:
+        return
+    print(f"seeding {total - existing} shipments...")
+    for first in range(1, total + 1, SEED_BATCH_SIZE):
+        async with engine.begin() as conn:
+            await conn.execute(SEED_SQL, {"first": first, "last": min(first + SEED_BATCH_SIZE - 1, total)})
+
+
+async def export(sample_every: int) -> dict[str, float]:
+    started_rss = peak_rss = rss_mb()
+    rows = exported_bytes = 0
+    started = time.perf_counter()
+    async with async_session() as session:
+        async for chunk in export_shipments(ShipmentsRepo(session), ExportFormat.ndjson):
+            chunk_rows = chunk.count("\n")
+            if (rows + chunk_rows) // sample_every > rows // sample_every:
+                peak_rss = max(peak_rss, rss_mb())
+                print(f"{rows + chunk_rows:>10} rows  rss {rss_mb():8.1f} MB")
+            rows += chunk_rows
+            exported_bytes += len(chunk)
+    elapsed = time.perf_counter() - started
+    return {
+        "rows": rows,
+        "mb_exported": exported_bytes / 1024 / 1024,
+        "rows_per_s": rows / elapsed,
+        "rss_start_mb": started_rss,
+        "rss_peak_mb": max(peak_rss, rss_mb()),
+    }
+
+
+async def load_all() -> dict[str, float]:
+    started_rss = rss_mb()
+    started = time.perf_counter()
+    async with async_session() as session:
+        shipments = await ShipmentsRepo(session).fetch_all()
+        loaded_rss = rss_mb()
+    return {
+        "rows": len(shipments),
+        "rows_per_s": len(shipments) / (time.perf_counter() - started),
+        "rss_start_mb": started_rss,
+        "rss_peak_mb": loaded_rss,
+    }
+
+
+async def run(total: int, sample_every: int, load_everything: bool) -> dict[str, float]:
+    await seed(total)
+    try:
+        return await (load_all() if load_everything else export(sample_every))
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shipments", type=int, default=1_000_000)
+    parser.add_argument("--sample-every", type=int, default=100_000, help="print RSS every N exported rows")
+    parser.add_argument("--load-all", action="store_true", help="load everything with fetch_all instead")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.shipments, args.sample_every, args.load_all))
+    for name, value in result.items():
+        print(f"{name:>12}: {value:.1f}" if isinstance(value, float) else f"{name:>12}: {value}")
+
+
+if __name__ == "__main__":
+    main()
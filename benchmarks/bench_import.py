@@ -0,0 +1,81 @@
+"""Throughput and memory of the CSV shipment importer.
+
+Writes a synthetic CSV in the task.md format (two articles per shipment, tracking numbers unique to the run)
+and imports it into DATABASE_URL:
+
+    DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.bench_import --rows 1000000
+"""
+
+import argparse
+import asyncio
+import csv
+import os
+import tempfile
+import time
+import uuid
+
+from benchmarks.bench_export_rss import rss_mb
+from src.db.session import engine
+from src.services.shipments_import import CSV_HEADER, import_shipments
+
+
+STATUSES = ("in_transit", "inbound-scan", "delivery", "transit", "scanned")
+
+
+def write_csv(path: str, rows: int) -> None:
+    run = uuid.uuid4().hex[:8].upper()
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(CSV_HEADER)
+        for n in range(rows):
+            shipment = n // 2
+            writer.writerow(
+                (
+                    f"IMP{run}{shipment:09d}",
+                    "DHL",
+                    f"Street {shipment % 100}, 10115 Berlin, Germany",
+                    f"Street {shipment % 97}, 75001 Paris, France",
+                    f"Article {n % 2}",
+                    1 + n % 3,
+                    9.99,
+                    f"SKU{n % 1000}",
+                    STATUSES[shipment % len(STATUSES)],
+                )
+            )
+
+
+async def run(path: str) -> dict[str, float]:
+    started_rss = rss_mb()
+    started = time.perf_counter()
+    try:
+        with open(path, newline="") as file:
+            async with engine.begin() as conn:
+                result = await import_shipments(conn, file)
+    finally:
+        await engine.dispose()
+    return {
+        "rows": result.rows,
+        "shipments_created": result.shipments_created,
+        "articles_created": result.articles_created,
+        "seconds": time.perf_counter() - started,
+        "rows_per_s": result.rows_per_second,
+        "rss_start_mb": started_rss,
+        "rss_end_mb": rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "shipments.csv")
+        write_csv(path, args.rows)
+        result = asyncio.run(run(path))
+    for name, value in result.items():
+        print(f"{name:>17}: {value:.1f}" if isinstance(value, float) else f"{name:>17}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Logging cost per request on the calling (event loop) thread: handlers writing inline vs the queue to a writer thread.
+
+Replays the log calls of a cached `GET /api/v1/shipments/{tracking_number}` once per --interval-ms, writing to a
+temporary log file and to /dev/null for the console:
+
+    python -m benchmarks.bench_logging --requests 5000
+
+"before" is the previous setup: the stream and file handlers on the logger and the hot-path lines at INFO.
+"""
+
+import argparse
+import logging
+import os
+import queue
+import tempfile
+import time
+
+from logging.handlers import QueueListener
+from pathlib import Path
+
+from benchmarks.bench_shipment_latency import percentile
+from src.config.logging import NonBlockingQueueHandler, RateLimitFilter, build_handlers
+from src.config.settings import Settings
+
+
+ADDRESS = "Lisa-Fittko-Str 13, 10557 Berlin, Germany"
+
+
+def request_logs(logger: logging.Logger, hot_level: int) -> None:
+    logger.log(hot_level, f"{ADDRESS=}")
+    logger.log(hot_level, "Getting weather for address: %s", ADDRESS)
+    logger.log(hot_level, "Found cached weather data for %s", "weather:10557:de")
+
+
+def run(name: str, handlers: list[logging.Handler], hot_level: int, args: argparse.Namespace) -> None:
+    logger = logging.getLogger(f"bench.{name}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    for handler in handlers:
+        logger.addHandler(handler)
+
+    timings = []
+    for _ in range(args.requests):
+        started = time.perf_counter()
+        request_logs(logger, hot_level)
+        timings.append((time.perf_counter() - started) * 1_000_000)
+        time.sleep(args.interval_ms / 1000)
+
+    print(
+        f"{name:<34} mean {sum(timings) / len(timings):7.1f} us  p50 {percentile(timings, 50):7.1f} us  "
+        f"p99 {percentile(timings, 99):7.1f} us  max {max(timings):8.1f} us"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--interval-ms", type=float, default=1, help="pause between requests")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, "w") as devnull:
+        config = Settings(log_file=str(Path(tmp) / "app.log"))
+
+        def writers() -> list[logging.Handler]:
+            handlers = build_handlers(config)
+            handlers[0].setStream(devnull)
+            return handlers
+
+        def queued(rate_limit: float = 0) -> list[logging.Handler]:
+            records: queue.Queue[logging.LogRecord] = queue.Queue(config.log_queue_size)
+            handler = NonBlockingQueueHandler(records)
+            if rate_limit:
+                handler.addFilter(RateLimitFilter(rate_limit))
+            listeners.append(QueueListener(records, *writers()))
+            listeners[-1].start()
+            return [handler]
+
+        listeners: list[QueueListener] = []
+        run("before: inline handlers, INFO", writers(), logging.INFO, args)
+        run("queue, hot path at INFO", queued(), logging.INFO, args)
+        run("queue, INFO rate-limited to 10/s", queued(rate_limit=10), logging.INFO, args)
+        run("after: queue, hot path at DEBUG", queued(), logging.DEBUG, args)
+        for listener in listeners:
+            listener.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Shipment reads through ORM instances vs the Core records ShipmentsRepo returns.
+
+Uses the BENCH shipments seeded by bench_export_rss, so run that first:
+
+    DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.bench_reads --lookups 2000 --page 1000
+
+The ORM path is the query the repository used before: ShipmentModel with a selectinload of its articles.
+"""
+
+import argparse
+import asyncio
+import gc
+import random
+import statistics
+import time
+import tracemalloc
+
+from sqlalchemy import event
+from sqlalchemy.orm import selectinload
+from sqlmodel import select
+
+from src.db.models.shipment import Shipment as ShipmentModel
+from src.db.session import async_session, engine
+from src.db.shipments_repo import ShipmentsRepo
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+
+async def orm_one(session, tracking_number: str):
+    stmt = (
+        select(ShipmentModel)
+        .options(selectinload(ShipmentModel.articles))
+        .where(ShipmentModel.tracking_number == tracking_number)
+    )
+    return (await session.execute(stmt)).scalar_one_or_none()
+
+
+async def orm_page(session, limit: int):
+    stmt = select(ShipmentModel).options(selectinload(ShipmentModel.articles)).order_by(ShipmentModel.id)
+    return (await session.execute(stmt.limit(limit))).scalars().all()
+
+
+async def record_one(session, tracking_number: str):
+    return await ShipmentsRepo(session).get_one_by_tracking(tracking_number)
+
+
+async def record_page(session, limit: int):
+    return await ShipmentsRepo(session).fetch_page(limit=limit)
+
+
+async def measure_lookups(read, tracking_numbers: list[str], counter: StatementCounter) -> dict:
+    counter.count = 0
+    timings = []
+    for tracking_number in tracking_numbers:
+        # A fresh session per lookup, like a request: no identity map carried over.
+        async with async_session() as session:
+            started = time.perf_counter()
+            assert await read(session, tracking_number) is not None
+            timings.append(time.perf_counter() - started)
+    return {
+        "p50_ms": statistics.median(timings) * 1000,
+        "p99_ms": statistics.quantiles(timings, n=100)[98] * 1000,
+        "statements": counter.count / len(tracking_numbers),
+    }
+
+
+async def measure_page(read, limit: int) -> dict:
+    async with async_session() as session:
+        await read(session, limit)
+    gc.collect()
+    async with async_session() as session:
+        tracemalloc.start()
+        started = time.perf_counter()
+        rows = await read(session, limit)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    assert len(rows) == limit
+    return {"ms": elapsed * 1000, "peak_alloc_kib": peak / 1024}
+
+
+def report(name: str, result: dict) -> None:
+    print(f"{name:>14}: " + "  ".join(f"{key} {value:,.2f}" for key, value in result.items()))
+
+
+async def main(lookups: int, page: int) -> None:
+    counter = StatementCounter()
+    event.listen(engine.sync_engine, "before_cursor_execute", counter)
+    tracking_numbers = [f"BENCH{random.randint(1, 100_000):09d}" for _ in range(lookups)]
+
+    for name, read in (("orm", orm_one), ("records", record_one)):
+        await measure_lookups(read, tracking_numbers[:100], counter)
+        report(f"{name} lookup", await measure_lookups(read, tracking_numbers, counter))
+    for name, read in (("orm", orm_page), ("records", record_page)):
+        report(f"{name} page", await measure_page(read, page))
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--page", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(main(args.lookups, args.page))
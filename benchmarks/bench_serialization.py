@@ -0,0 +1,91 @@
+"""Serialization cost of a shipment list response: validated models vs the direct orjson path.
+
+Builds shipments with two articles each in memory (no database) and renders them both ways:
+
+    python -m benchmarks.bench_serialization --shipments 10000
+"""
+
+import argparse
+import asyncio
+import gc
+import time
+import tracemalloc
+
+from typing import Callable
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from src.api.schemas.shipment import Shipment, ShipmentsResponse
+from src.api.serialization import shipment_to_dict
+from src.db.enums import ShipmentStatus
+from src.db.shipments_repo import ShipmentRecord
+
+
+def make_shipments(count: int) -> list[ShipmentRecord]:
+    return [
+        ShipmentRecord(
+            id=n,
+            tracking_number=f"TN{n:08d}",
+            carrier="DHL",
+            sender_address="Street 1, 10115 Berlin, Germany",
+            receiver_address="Street 10, 75001 Paris, France",
+            status=ShipmentStatus.in_transit,
+            articles=[
+                {"name": "Laptop", "quantity": 1, "price": 800.0, "sku": "LP123", "id": 2 * n},
+                {"name": "Mouse", "quantity": 1, "price": 25.0, "sku": "MO456", "id": 2 * n + 1},
+            ],
+        )
+        for n in range(count)
+    ]
+
+
+_response_field = create_response_field("Response_find_shipments", ShipmentsResponse)
+_loop = asyncio.new_event_loop()
+
+
+def validated(records: list[ShipmentRecord]) -> bytes:
+    """What find_shipments did before: model_validate, response_model validation, then stdlib json."""
+    content = ShipmentsResponse(shipments=[Shipment.model_validate(record) for record in records])
+    jsonable = _loop.run_until_complete(
+        serialize_response(field=_response_field, response_content=content, is_coroutine=True)
+    )
+    return JSONResponse(jsonable).body
+
+
+def direct(records: list[ShipmentRecord]) -> bytes:
+    return ORJSONResponse({"shipments": [shipment_to_dict(record) for record in records], "next_cursor": None}).body
+
+
+def measure(render: Callable[[list[ShipmentRecord]], bytes], records: list[ShipmentRecord], rounds: int) -> dict:
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        render(records)
+        timings.append(time.perf_counter() - started)
+
+    gc.collect()
+    tracemalloc.start()
+    render(records)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"best_ms": min(timings) * 1000, "peak_alloc_kib": peak / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shipments", type=int, default=10_000)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    records = make_shipments(args.shipments)
+    assert validated(records[:10]) == direct(records[:10])
+
+    for name, render in (("validated", validated), ("direct", direct)):
+        result = measure(render, records, args.rounds)
+        print(f"{name:>10}: " + "  ".join(f"{key} {value:,.1f}" for key, value in result.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Latency of GET /api/v1/shipments/{tracking_number} under concurrent weather cache misses.
+
+Start the fake upstreams with --random-coordinates (every lookup is a weather cache miss),
+start the API pointed at them, seed shipments (`make generate_shipments`), then:
+
+    python -m benchmarks.bench_shipment_latency --concurrency 50 --requests 1000
+"""
+
+import argparse
+import asyncio
+import itertools
+import statistics
+import time
+
+from http import HTTPStatus
+
+import aiohttp
+
+
+DEFAULT_TRACKING_NUMBERS = ["TN12345678", "TN12345679", "TN12345680", "TN12345681", "TN12345682"]
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def run(base_url: str, tracking_numbers: list[str], concurrency: int, total: int) -> dict[str, float]:
+    latencies: list[float] = []
+    errors = 0
+    numbers = itertools.cycle(tracking_numbers)
+    queue: asyncio.Queue[str] = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(next(numbers))
+
+    async def worker(session: aiohttp.ClientSession):
+        nonlocal errors
+        while not queue.empty():
+            tracking_number = queue.get_nowait()
+            started = time.perf_counter()
+            async with session.get(f"{base_url}/api/v1/shipments/{tracking_number}") as response:
+                await response.read()
+                if response.status != HTTPStatus.OK:
+                    errors += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": total,
+        "errors": errors,
+        "rps": total / elapsed,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": max(latencies),
+        "mean_ms": statistics.fmean(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--tracking-number", action="append", dest="tracking_numbers")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=1000)
+    args = parser.parse_args()
+
+    result = asyncio.run(
+        run(args.base_url, args.tracking_numbers or DEFAULT_TRACKING_NUMBERS, args.concurrency, args.requests)
+    )
+    for name, value in result.items():
+        print(f"{name:>8}: {value:.1f}" if isinstance(value, float) else f"{name:>8}: {value}")
+
+
+if __name__ == "__main__":
+    main()
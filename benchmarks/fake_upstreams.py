@@ -0,0 +1,88 @@
+"""Local stand-ins for Nominatim and OpenWeatherMap.
+
+Run it next to the API and point the service at it:
+
+    python -m benchmarks.fake_upstreams --port 9100 --latency-ms 200 --jitter-ms 50 --error-rate 0.01
+    NOMINATIM_DOMAIN=localhost:9100 NOMINATIM_SCHEME=http \
+    OPENWEATHERMAP_URL=http://localhost:9100/data/2.5/weather uvicorn src.main:app
+"""
+
+import argparse
+import asyncio
+import random
+
+from aiohttp import web
+
+
+def _coordinates_for(query: str, randomize: bool) -> tuple[float, float]:
+    rnd = random.Random(None if randomize else query)
+    return round(rnd.uniform(36.0, 60.0), 7), round(rnd.uniform(-9.0, 30.0), 7)
+
+
+async def _respond_slowly(latency_ms: float, jitter_ms: float, error_rate: float) -> None:
+    """Wait like the real service would, and fail a share of the calls with a 503 like it sometimes does."""
+    await asyncio.sleep(max(0.0, latency_ms + random.uniform(-jitter_ms, jitter_ms)) / 1000)
+    if random.random() < error_rate:
+        raise web.HTTPServiceUnavailable()
+
+
+def build_app(  # noqa: PLR0913
+    latency_ms: float,
+    geocode_latency_ms: float,
+    random_coordinates: bool,
+    jitter_ms: float = 0,
+    error_rate: float = 0,
+    geocode_error_rate: float = 0,
+) -> web.Application:
+    async def search(request: web.Request) -> web.Response:
+        await _respond_slowly(geocode_latency_ms, jitter_ms, geocode_error_rate)
+        query = request.query.get("q", "")
+        lat, lon = _coordinates_for(query, random_coordinates)
+        return web.json_response([{"lat": str(lat), "lon": str(lon), "display_name": query}])
+
+    async def weather(request: web.Request) -> web.Response:
+        await _respond_slowly(latency_ms, jitter_ms, error_rate)
+        return web.json_response(
+            {
+                "coord": {"lat": float(request.query["lat"]), "lon": float(request.query["lon"])},
+                "weather": [{"id": 800, "main": "Clear", "description": "clear sky"}],
+                "main": {"temp": 293.65, "humidity": 40},
+                "name": "Fakeville",
+            }
+        )
+
+    app = web.Application()
+    app.router.add_get("/search", search)
+    app.router.add_get("/data/2.5/weather", weather)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=200, help="OpenWeatherMap response delay")
+    parser.add_argument("--geocode-latency-ms", type=float, default=0, help="Nominatim response delay")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="spread delays uniformly by up to this much")
+    parser.add_argument("--error-rate", type=float, default=0, help="share of OpenWeatherMap calls failing with 503")
+    parser.add_argument("--geocode-error-rate", type=float, default=0, help="share of Nominatim calls failing with 503")
+    parser.add_argument(
+        "--random-coordinates",
+        action="store_true",
+        help="geocode every call to fresh coordinates, so each lookup misses the weather cache",
+    )
+    args = parser.parse_args()
+
+    app = build_app(
+        args.latency_ms,
+        args.geocode_latency_ms,
+        args.random_coordinates,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        geocode_error_rate=args.geocode_error_rate,
+    )
+    web.run_app(app, host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""Load test the API with a few traffic scenarios and save the results for comparison across commits.
+
+Scenarios:
+    hot     GET /api/v1/shipments/{tracking_number} polling a few popular shipments (track-and-trace pages)
+    cold    the same over all seeded shipments, mostly cache misses
+    list    GET /api/v1/shipments/?carrier=...&limit=100
+    bulk    POST /api/v1/shipments/bulk with --bulk-size new shipments per request (carrier ingestion)
+
+Start the fake upstreams and the API pointed at them, seed shipments with benchmarks.seed_shipments, then:
+
+    python -m benchmarks.load_test --shipments 100000 --scenario hot --scenario cold --rate 1000 --duration 30
+
+With --rate the load is open-loop: requests start on a fixed schedule whether or not earlier ones have finished
+(up to --concurrency in flight), and latency counts from the scheduled start, so a slow server can't hide its
+queueing delay. Without it, --concurrency clients send requests back to back. Each run is saved as JSON under
+benchmarks/results/ with the commit it ran against; --compare prints the difference to an earlier run.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import statistics
+import subprocess
+import time
+
+from collections import Counter
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, Callable
+
+import aiohttp
+
+from benchmarks.bench_shipment_latency import percentile
+from benchmarks.seed_shipments import CARRIERS, ShipmentFactory, tracking_number
+
+
+RESULTS_DIR = Path(__file__).parent / "results"
+REPORTED = ("requests", "errors", "rps", "p50_ms", "p95_ms", "p99_ms", "max_ms")
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    body: Any = None
+
+
+def build_scenarios(args: argparse.Namespace) -> dict[str, Callable[[], Request]]:
+    rnd = random.Random(args.seed)
+    bulk_template = [ShipmentFactory(args.seed).shipment(n) for n in range(args.bulk_size)]
+    bulk_run = f"BULK{int(time.time())}"
+    bulk_batches = itertools.count()
+
+    def hot() -> Request:
+        return Request("GET", f"/api/v1/shipments/{tracking_number(rnd.randint(1, args.hot_keys))}")
+
+    def cold() -> Request:
+        return Request("GET", f"/api/v1/shipments/{tracking_number(rnd.randint(1, args.shipments))}")
+
+    def listing() -> Request:
+        return Request("GET", f"/api/v1/shipments/?carrier={rnd.choice(CARRIERS)}&limit=100")
+
+    def bulk() -> Request:
+        batch = next(bulk_batches)
+        return Request(
+            "POST",
+            "/api/v1/shipments/bulk",
+            [{**shipment, "tracking_number": f"{bulk_run}-{batch}-{n}"} for n, shipment in enumerate(bulk_template)],
+        )
+
+    return {"hot": hot, "cold": cold, "list": listing, "bulk": bulk}
+
+
+async def run_scenario(
+    session: aiohttp.ClientSession, base_url: str, next_request: Callable[[], Request], args: argparse.Namespace
+) -> dict[str, Any]:
+    latencies: list[float] = []
+    statuses: Counter[str] = Counter()
+
+    async def send(scheduled: float) -> None:
+        request = next_request()
+        try:
+            async with session.request(request.method, base_url + request.path, json=request.body) as response:
+                await response.read()
+                statuses[str(response.status)] += 1
+        except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+            statuses[type(err).__name__] += 1
+        latencies.append((time.perf_counter() - scheduled) * 1000)
+
+    started = time.perf_counter()
+    deadline = started + args.duration
+    if args.rate:
+        in_flight = asyncio.Semaphore(args.concurrency)
+        tasks = set()
+        for n in range(int(args.duration * args.rate)):
+            scheduled = started + n / args.rate
+            if (delay := scheduled - time.perf_counter()) > 0:
+                await asyncio.sleep(delay)
+            await in_flight.acquire()
+            task = asyncio.create_task(send(scheduled))
+            tasks.add(task)
+            task.add_done_callback(lambda done: (tasks.discard(done), in_flight.release()))
+        await asyncio.gather(*tasks)
+    else:
+
+        async def client() -> None:
+            while time.perf_counter() < deadline:
+                await send(time.perf_counter())
+
+        await asyncio.gather(*(client() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    ok = sum(count for status, count in statuses.items() if status.startswith("2"))
+    return {
+        "requests": len(latencies),
+        "errors": len(latencies) - ok,
+        "statuses": dict(statuses),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": max(latencies),
+        "mean_ms": statistics.fmean(latencies),
+    }
+
+
+def git_commit() -> str:
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+        dirty = subprocess.run(["git", "diff", "--quiet", "HEAD"], check=False).returncode != 0
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if dirty else commit
+
+
+def print_results(results: dict[str, dict], baseline: dict[str, dict] | None = None) -> None:
+    print(f"{'scenario':<8}" + "".join(f"{column:>16}" for column in REPORTED))
+    for scenario, result in results.items():
+        cells = []
+        for column in REPORTED:
+            value = f"{result[column]:,.1f}"
+            if baseline and scenario in baseline and baseline[scenario][column]:
+                value += f" {(result[column] / baseline[scenario][column] - 1) * 100:+.0f}%"
+            cells.append(f"{value:>16}")
+        print(f"{scenario:<8}" + "".join(cells))
+
+
+async def main(args: argparse.Namespace) -> None:
+    scenarios = build_scenarios(args)
+    results = {}
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        for name in args.scenarios or ["hot", "cold", "list"]:
+            if args.warmup:
+                await run_scenario(
+                    session,
+                    args.base_url,
+                    scenarios[name],
+                    argparse.Namespace(**{**vars(args), "duration": args.warmup}),
+                )
+            results[name] = await run_scenario(session, args.base_url, scenarios[name], args)
+            print(f"{name}: {results[name]['rps']:,.0f} req/s, p99 {results[name]['p99_ms']:,.1f} ms")
+
+    baseline = json.loads(Path(args.compare).read_text())["results"] if args.compare else None
+    print_results(results, baseline)
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    commit = git_commit()
+    path = Path(args.output or RESULTS_DIR / f"{datetime.now(UTC):%Y%m%dT%H%M%S}-{commit}.json")
+    arguments = {key: value for key, value in vars(args).items() if key not in ("output", "compare")}
+    run = {"commit": commit, "started_at": datetime.now(UTC).isoformat(), "args": arguments, "results": results}
+    path.write_text(json.dumps(run, indent=2))
+    print(f"saved {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--scenario", action="append", dest="scenarios", choices=["hot", "cold", "list", "bulk"])
+    parser.add_argument("--shipments", type=int, default=100_000, help="how many were seeded by seed_shipments")
+    parser.add_argument("--hot-keys", type=int, default=20, help="shipments the hot scenario polls")
+    parser.add_argument("--bulk-size", type=int, default=100, help="shipments per bulk request")
+    parser.add_argument("--duration", type=float, default=30, help="seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=3, help="seconds per scenario before measuring")
+    parser.add_argument("--rate", type=float, help="requests per second, open-loop; default closed-loop")
+    parser.add_argument("--concurrency", type=int, default=100, help="clients, or max in flight with --rate")
+    parser.add_argument("--timeout", type=float, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="result file, default benchmarks/results/<time>-<commit>.json")
+    parser.add_argument("--compare", help="earlier result file to show changes against")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,85 @@
+"""Seed synthetic shipments for load tests through POST /api/v1/shipments/bulk.
+
+Shipments get tracking numbers LOAD000000001, LOAD000000002, ... and Faker addresses across a few countries, with
+one to three articles each. The same --seed gives the same data, already existing tracking numbers are skipped:
+
+    python -m benchmarks.seed_shipments --shipments 100000
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+import aiohttp
+
+from faker import Faker
+
+from src.db.enums import ShipmentStatus
+
+
+TRACKING_PREFIX = "LOAD"
+CARRIERS = ("DHL", "UPS", "DPD", "GLS", "FedEx")
+COUNTRIES = {"de_DE": "Germany", "fr_FR": "France", "es_ES": "Spain", "it_IT": "Italy", "nl_NL": "Netherlands"}
+PRODUCTS = (("Laptop", 800.0), ("Mouse", 25.0), ("Monitor", 200.0), ("Keyboard", 50.0), ("Headphones", 100.0))
+
+
+def tracking_number(n: int) -> str:
+    return f"{TRACKING_PREFIX}{n:09d}"
+
+
+def carrier_of(n: int) -> str:
+    """Carrier of the nth seeded shipment, so load tests can pick matching ones without asking the API."""
+    return CARRIERS[n % len(CARRIERS)]
+
+
+class ShipmentFactory:
+    def __init__(self, seed: int):
+        self.fake = Faker(list(COUNTRIES))
+        self.fake.seed_instance(seed)
+        self.random = random.Random(seed)
+
+    def address(self) -> str:
+        locale = self.random.choice(list(COUNTRIES))
+        fake = self.fake[locale]
+        return f"{fake.street_address()}, {fake.postcode()} {fake.city()}, {COUNTRIES[locale]}"
+
+    def shipment(self, n: int) -> dict:
+        return {
+            "tracking_number": tracking_number(n),
+            "carrier": carrier_of(n),
+            "sender_address": self.address(),
+            "receiver_address": self.address(),
+            "status": self.random.choice(list(ShipmentStatus)).value,
+            "articles": [
+                {"name": name, "quantity": self.random.randint(1, 3), "price": price, "sku": f"SKU-{name.upper()}"}
+                for name, price in self.random.sample(PRODUCTS, self.random.randint(1, 3))
+            ],
+        }
+
+
+async def seed(base_url: str, total: int, batch_size: int, seed_value: int) -> None:
+    factory = ShipmentFactory(seed_value)
+    created = 0
+    started = time.perf_counter()
+    async with aiohttp.ClientSession(raise_for_status=True) as session:
+        for first in range(1, total + 1, batch_size):
+            batch = [factory.shipment(n) for n in range(first, min(first + batch_size, total + 1))]
+            async with session.post(f"{base_url}/api/v1/shipments/bulk", json=batch) as response:
+                created += (await response.json())["created"]
+            print(f"\r{first + len(batch) - 1}/{total} shipments, {created} created", end="", flush=True)
+    print(f"\nseeded in {time.perf_counter() - started:.1f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--shipments", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    asyncio.run(seed(args.base_url, args.shipments, args.batch_size, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -92,34 +92,30 @@ def collect_specific_shipments() -> List[ShipmentCreate]:
     
     return shipments
 
-async def create_shipment(session: aiohttp.ClientSession, shipment: ShipmentCreate) -> None:
-    """Create a single shipment via API."""
-    json_data = {
-        "shipment": shipment.model_dump(),
-        "articles": [article.model_dump() for article in shipment.articles],
-    }
+async def create_shipments(session: aiohttp.ClientSession, shipments: List[ShipmentCreate]) -> None:
+    """Create shipments with a single bulk API call."""
+    json_data = [shipment.model_dump(mode="json") for shipment in shipments]
     try:
-        async with session.post(SHIPMENTS_API_URL, json=json_data) as response:
-            if response.status == HTTPStatus.CREATED:
-                print(f"Created shipment: {shipment.tracking_number}")
-            else:
-                print(f"Failed to create shipment {shipment.tracking_number}: {response.status=}")
+        async with session.post(f"{SHIPMENTS_API_URL}/bulk", json=json_data) as response:
+            if response.status != HTTPStatus.OK:
+                print(f"Failed to create shipments: {response.status=}")
                 print(await response.json())
+                return
+            result = await response.json()
     except Exception as err:
-        print(f"Error creating shipment {shipment.tracking_number}: {err}")
+        print(f"Error creating shipments: {err}")
+        return
+    for item in result["results"]:
+        state = "Created" if item["created"] else "Already exists"
+        print(f"{state}: {item['tracking_number']}")
 
 async def main():
     """Main function to create multiple shipments."""
     # Generate specific shipments
     shipments = collect_specific_shipments()
     
-    # Create aiohttp session
     async with aiohttp.ClientSession() as session:
-        # Create tasks for all shipments
-        tasks = [create_shipment(session, shipment) for shipment in shipments]
-        
-        # Run all tasks concurrently
-        await asyncio.gather(*tasks)
+        await create_shipments(session, shipments)
 
 if __name__ == "__main__":
     asyncio.run(main()) 
\ No newline at end of file
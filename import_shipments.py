@@ -0,0 +1,43 @@
+"""Import shipments from a CSV file in the carrier seed format described in task.md.
+
+python import_shipments.py data/shipments.csv
+gunzip -c shipments.csv.gz | python import_shipments.py -
+"""
+
+import argparse
+import asyncio
+import sys
+
+from src.api.middleware.response_cache import invalidate_responses
+from src.config.redis import create_redis
+from src.db.session import engine
+from src.services.shipments_import import ShipmentImportError, import_shipments
+
+
+async def main(path: str) -> None:
+    file = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+    try:
+        async with engine.begin() as conn:
+            result = await import_shipments(conn, file)
+    except ShipmentImportError as err:
+        sys.exit(f"Nothing imported, {err}")
+    finally:
+        file.close()
+        await engine.dispose()
+    if result.shipments_created:
+        # Imported once committed. Existing shipments are skipped, so only list pages may be missing the new ones.
+        redis = create_redis()
+        try:
+            await invalidate_responses(redis, [])
+        finally:
+            await redis.aclose()
+    print(
+        f"{result.rows} rows, {result.shipments} shipments: created {result.shipments_created} shipments "
+        f"and {result.articles_created} articles, {result.rows_per_second:.0f} rows/s"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="CSV file, - for stdin")
+    asyncio.run(main(parser.parse_args().path))
@@ -0,0 +1,46 @@
+import time
+
+from starlette.routing import Match, Route
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.metrics import HTTP_REQUEST_SECONDS
+
+
+def _route_template(scope: Scope) -> str:
+    """Path template of the matched route, so that label values stay bounded."""
+    route = scope.get("route")
+    if isinstance(route, Route):
+        return route.path
+    # Answered before routing, e.g. from the response cache: match it here.
+    for candidate in scope["app"].router.routes:
+        if isinstance(candidate, Route) and candidate.matches(scope)[0] == Match.FULL:
+            return candidate.path
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """Records every HTTP request's latency by method, route template and status in HTTP_REQUEST_SECONDS."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUEST_SECONDS.labels(
+                method=scope["method"], route=_route_template(scope), status=str(status)
+            ).observe(time.perf_counter() - started)
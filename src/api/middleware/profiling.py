@@ -0,0 +1,77 @@
+import asyncio
+import hmac
+import itertools
+import logging
+import re
+import time
+
+from pathlib import Path
+from urllib.parse import parse_qs
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.config.settings import settings
+from src.core.profiling import TaskProfiler
+
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile"
+
+
+class ProfilingMiddleware:
+    """Profiles single requests on demand and saves each profile as a speedscope file in `output_dir`.
+
+    A request is profiled when it carries the token in an `X-Profile` header or a `profile` query parameter, and
+    every `sample_every`-th request if that is set. The response names the file in its own `X-Profile` header.
+    Only added to the app when profiling is configured, other requests pass straight through.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        token: str | None = settings.profiling_token,
+        sample_every: int = settings.profiling_sample_every,
+        output_dir: str = settings.profiling_dir,
+    ):
+        self.app = app
+        self.token = token
+        self.sample_every = sample_every
+        self.output_dir = Path(output_dir)
+        self._requests = itertools.count(1)
+
+    def _triggered(self, scope: Scope) -> bool:
+        if self.sample_every and next(self._requests) % self.sample_every == 0:
+            return True
+        if not self.token:
+            return False
+        supplied = Headers(scope=scope).get(PROFILE_HEADER)
+        if supplied is None and b"profile=" in scope["query_string"]:
+            supplied = parse_qs(scope["query_string"].decode()).get("profile", [None])[0]
+        return supplied is not None and hmac.compare_digest(supplied.encode(), self.token.encode())
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # The request's own task is what gets sampled; ASGI servers always run requests in one.
+        task = asyncio.current_task()
+        if scope["type"] != "http" or task is None or not self._triggered(scope):
+            await self.app(scope, receive, send)
+            return
+
+        name = f"{scope['method']} {scope['path']}"
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", name).strip("-")
+        filename = f"{time.strftime('%Y%m%dT%H%M%S')}-{time.perf_counter_ns() % 10**6:06d}-{slug}.speedscope.json"
+
+        async def send_with_profile(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[PROFILE_HEADER] = filename
+            await send(message)
+
+        profiler = TaskProfiler(task, interval=settings.profiling_interval)
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            profiler.stop()
+            await asyncio.to_thread(profiler.save, self.output_dir / filename, name)
+            logger.info("Saved profile of %s to %s", name, filename)
@@ -0,0 +1,165 @@
+import hashlib
+import logging
+import re
+import time
+
+from http import HTTPStatus
+from typing import Awaitable, cast
+from urllib.parse import parse_qsl, urlencode
+
+from redis.asyncio import Redis
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.config.settings import settings
+from src.core.metrics import RESPONSE_CACHE_REQUESTS
+from src.db.session import READ_PRIMARY_HEADER
+
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_TTL = settings.response_cache_ttl
+
+# Rendered responses are grouped in one Redis hash per tracking number and one for all list pages, with the
+# query string as field, so a write drops every variant with a single DEL.
+SHIPMENT_KEY = "response:shipment:{tracking_number}"
+SHIPMENTS_KEY = "response:shipments"
+# Cache-Control directive of responses that are never cached.
+NO_STORE = "no-store"
+
+_SHIPMENT_PATH = re.compile(r"^/api/v1/shipments/(?!export$)(?P<tracking_number>[^/]+)$")
+_SHIPMENTS_PATH = "/api/v1/shipments/"
+
+
+def _cache_key(path: str) -> tuple[str, str] | None:
+    """(resource, Redis key) for a cacheable path."""
+    if path == _SHIPMENTS_PATH:
+        return "shipments", SHIPMENTS_KEY
+    if match := _SHIPMENT_PATH.match(path):
+        return "shipment", SHIPMENT_KEY.format(tracking_number=match["tracking_number"])
+    return None
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
+
+async def invalidate_responses(redis_client: Redis, tracking_numbers: list[str]) -> None:
+    """Drop cached responses that may include these shipments: their own and every list page."""
+    keys = [SHIPMENT_KEY.format(tracking_number=tracking_number) for tracking_number in tracking_numbers]
+    try:
+        await redis_client.delete(SHIPMENTS_KEY, *keys)
+    except Exception as e:
+        logger.error("Failed to invalidate cached responses: %s", str(e))
+
+
+class ResponseCacheMiddleware:
+    """Serves shipment reads from rendered responses cached in Redis, with strong ETags and 304s.
+
+    A hit skips the route entirely: no database, weather or serialization work. Only 200 responses are cached,
+    for RESPONSE_CACHE_TTL seconds or until a write invalidates them; clients are told to revalidate every time.
+    A route marks a response that mustn't be reused, such as one served without fresh weather, with
+    `Cache-Control: no-store`: it is passed through as is.
+    """
+
+    def __init__(self, app: ASGIApp, ttl: int = RESPONSE_CACHE_TTL):
+        self.app = app
+        self.ttl = ttl
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "GET" or self.ttl <= 0:
+            await self.app(scope, receive, send)
+            return
+        cache_key = _cache_key(scope["path"])
+        if cache_key is None:
+            await self.app(scope, receive, send)
+            return
+
+        resource, key = cache_key
+        entry = key, urlencode(sorted(parse_qsl(scope["query_string"].decode())))
+        redis_client: Redis = scope["app"].state.redis
+        # A read that must see the client's own writes skips cached copies, which may predate them.
+        headers = Headers(scope=scope)
+        cached = None if READ_PRIMARY_HEADER in headers else await self._read(redis_client, entry)
+        if cached is not None:
+            etag, body = cached
+            not_modified = etag_matches(headers.get("if-none-match"), etag)
+            RESPONSE_CACHE_REQUESTS.labels(resource=resource, result="not_modified" if not_modified else "hit").inc()
+            await self._send(send, etag, None if not_modified else body, cache_status="hit")
+            return
+
+        RESPONSE_CACHE_REQUESTS.labels(resource=resource, result="miss").inc()
+        start: Message = {}
+        chunks: list[bytes] = []
+
+        async def capture(message: Message) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body"):
+                return
+            body = b"".join(chunks)
+            if start["status"] != HTTPStatus.OK or NO_STORE in Headers(raw=start["headers"]).get("cache-control", ""):
+                await send(start)
+                await send({"type": "http.response.body", "body": body})
+                return
+            etag = make_etag(body)
+            await self._write(redis_client, entry, etag, body)
+            not_modified = etag_matches(headers.get("if-none-match"), etag)
+            await self._send(send, etag, None if not_modified else body, cache_status="miss", start=start)
+
+        await self.app(scope, receive, capture)
+
+    async def _read(self, redis_client: Redis, entry: tuple[str, str]) -> tuple[str, bytes] | None:
+        """(etag, body) of a cached response; `entry` is the hash key and field."""
+        try:
+            # redis-py types its commands for the sync and asyncio clients alike.
+            value = await cast(Awaitable[bytes | None], redis_client.hget(*entry))
+        except Exception as e:
+            logger.error("Failed to read cached response: %s", str(e))
+            return None
+        if value is None:
+            return None
+        meta, _, body = value.partition(b"\n")
+        expires_at, etag = meta.decode().split(" ", 1)
+        if float(expires_at) <= time.time():
+            return None
+        return etag, body
+
+    async def _write(self, redis_client: Redis, entry: tuple[str, str], etag: str, body: bytes) -> None:
+        # Fields can't expire on their own, so each carries its deadline; the hash expires with the newest one.
+        value = f"{time.time() + self.ttl} {etag}\n".encode() + body
+        try:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                pipe.hset(entry[0], mapping={entry[1]: value})
+                pipe.expire(entry[0], self.ttl)
+                await pipe.execute()
+        except Exception as e:
+            logger.error("Failed to cache response: %s", str(e))
+
+    @staticmethod
+    async def _send(send: Send, etag: str, body: bytes | None, cache_status: str, start: Message | None = None):
+        """The response, or a bodiless 304 if `body` is None."""
+        headers = MutableHeaders(raw=list(start["headers"]) if start else [])
+        if not start:
+            headers["content-type"] = "application/json"
+        headers["etag"] = etag
+        headers["cache-control"] = "no-cache"
+        headers["x-cache"] = cache_status
+        if body is None:
+            del headers["content-type"]
+            del headers["content-length"]
+        else:
+            headers["content-length"] = str(len(body))
+        status = HTTPStatus.NOT_MODIFIED if body is None else HTTPStatus.OK
+        await send({"type": "http.response.start", "status": status, "headers": headers.raw})
+        await send({"type": "http.response.body", "body": body or b""})
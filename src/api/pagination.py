@@ -0,0 +1,25 @@
+import base64
+import binascii
+
+from http import HTTPStatus
+
+from fastapi import HTTPException
+
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(last_id: int) -> str:
+    """Opaque keyset cursor: clients pass it back as-is to get the rows after `last_id`."""
+    return base64.urlsafe_b64encode(f"id:{last_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        prefix, _, last_id = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode().partition(":")
+        if prefix != "id":
+            raise ValueError(prefix)
+        return int(last_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as err:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail="Invalid cursor") from err
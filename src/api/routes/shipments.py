@@ -1,55 +1,144 @@
 import logging
+import time
 
 from http import HTTPStatus
-from typing import List
+from typing import Annotated, Any, List
 
-from fastapi import APIRouter, Depends, HTTPException, Response
-from redis import Redis
+import aiohttp
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import TypeAdapter, ValidationError
+from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.api.schemas.shipment import ArticleCreate, Shipment, ShipmentCreate, ShipmentsResponse, ShipmentWithWeather
+from src.api.middleware.response_cache import NO_STORE, invalidate_responses
+from src.api.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, encode_cursor
+from src.api.schemas.shipment import (
+    ArticleCreate,
+    BulkShipmentResult,
+    BulkShipmentsResponse,
+    Shipment,
+    ShipmentCreate,
+    ShipmentsResponse,
+    ShipmentWithWeather,
+)
+from src.api.serialization import shipment_to_dict
+from src.config.http import get_http_session
 from src.config.redis import get_redis
-from src.db.session import get_db
+from src.config.settings import settings
+from src.core.metrics import timed
+from src.db.enums import ShipmentStatus
+from src.db.session import get_db, get_read_db, read_session
 from src.db.shipments_repo import ShipmentsRepo
+from src.services.shipment_locations import locate_in_background, stored_coordinates
+from src.services.shipments_cache import get_shipment, invalidate_shipment
+from src.services.shipments_export import ExportFormat, export_shipments
 from src.services.weather_service import WeatherService
 
 
 router = APIRouter()
 
-logger = logging.getLogger()
+logger = logging.getLogger(__name__)
+
+BULK_MAX_ITEMS = settings.shipment_bulk_max_items
+BULK_BATCH_SIZE = settings.shipment_bulk_batch_size
+
+_shipments_adapter = TypeAdapter(list[ShipmentCreate])
+_shipment_adapter = TypeAdapter(ShipmentCreate)
+
+
+def _parse_bulk_body(content_type: str, body: bytes) -> list[ShipmentCreate]:
+    """A JSON array of shipments, or one shipment per line for application/x-ndjson."""
+    if content_type.split(";")[0].strip() != "application/x-ndjson":
+        try:
+            return _shipments_adapter.validate_json(body)
+        except ValidationError as err:
+            raise RequestValidationError(err.errors(include_url=False)) from err
+
+    # Each line is parsed on its own; error locations start with the 1-based line number.
+    shipments: list[ShipmentCreate] = []
+    errors: list[dict[str, Any]] = []
+    for line_number, line in enumerate(body.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            shipments.append(_shipment_adapter.validate_json(line))
+        except ValidationError as err:
+            errors.extend({**error, "loc": (line_number, *error["loc"])} for error in err.errors(include_url=False))
+    if errors:
+        raise RequestValidationError(errors)
+    return shipments
 
 
 @router.get("/shipments/", response_model=ShipmentsResponse)
-async def find_shipments(carrier: str = "", db: AsyncSession = Depends(get_db)):
+async def find_shipments(
+    carrier: str = "",
+    status: ShipmentStatus | None = None,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_read_db),
+):
     repo = ShipmentsRepo(db)
 
-    if carrier:
-        db_shipments = await repo.filter_by_carrier(carrier=carrier)
-    else:
-        db_shipments = await repo.fetch_all()
+    after_id = decode_cursor(cursor) if cursor else None
+    # One extra row tells whether there is a next page.
+    db_shipments = await repo.fetch_page(limit=limit + 1, after_id=after_id, carrier=carrier, status=status)
     if not db_shipments:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="No shipments found")
-    return ShipmentsResponse(shipments=[Shipment.model_validate(db_obj) for db_obj in db_shipments])
+    page = db_shipments[:limit]
+    next_cursor = encode_cursor(page[-1].id) if len(db_shipments) > limit else None
+    # Rows go straight to JSON bytes; response_model still documents the shape, but isn't re-validated.
+    with timed("serialize.shipments"):
+        return ORJSONResponse({"shipments": [shipment_to_dict(record) for record in page], "next_cursor": next_cursor})
+
+
+@router.get("/shipments/export", response_class=StreamingResponse)
+async def export_all_shipments(
+    export_format: Annotated[ExportFormat, Query(alias="format")] = ExportFormat.ndjson,
+    carrier: str = "",
+    status: ShipmentStatus | None = None,
+):
+    # The body is produced after the handler returns, when a `get_db` session would already be closed,
+    # so the stream owns its session.
+    async def body():
+        async with read_session() as session:
+            async for chunk in export_shipments(ShipmentsRepo(session), export_format, carrier=carrier, status=status):
+                yield chunk
+
+    return StreamingResponse(
+        body(),
+        media_type=export_format.media_type,
+        headers={"Content-Disposition": f'attachment; filename="shipments.{export_format}"'},
+    )
 
 
 @router.get("/shipments/{tracking_number}", response_model=ShipmentWithWeather)
-async def get_one_shipment(tracking_number: str, db: AsyncSession = Depends(get_db), redis: Redis = Depends(get_redis)):
+async def get_one_shipment(  # noqa: PLR0913
+    tracking_number: str,
+    response: Response,
+    carrier: str | None = None,
+    db: AsyncSession = Depends(get_read_db),
+    redis: Redis = Depends(get_redis),
+    http_session: aiohttp.ClientSession = Depends(get_http_session),
+):
     if not tracking_number:
         raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail="Tracking number is required")
 
     repo = ShipmentsRepo(db)
-    db_shipment = await repo.get_one_by_tracking(tracking_number=tracking_number)
-    if not db_shipment:
+    shipment = await get_shipment(repo, tracking_number=tracking_number, carrier=carrier)
+    if not shipment:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Shipment not found")
-    logger.info(f"{db_shipment.receiver_address=}")
-
-    weather_service = WeatherService(redis)
-    try:
-        weather = await weather_service.get_weather(address=db_shipment.receiver_address)
-    except Exception as err:
-        logger.exception(err)
-        weather = None
-    shipment = Shipment.model_validate(db_shipment)
+    logger.debug("Receiver address: %s", shipment.receiver_address)
+
+    weather_service = WeatherService(redis, http_session)
+    is_fallback, weather = await weather_service.get_weather_within(
+        settings.weather_budget, address=shipment.receiver_address, coordinates=stored_coordinates(shipment)
+    )
+    if is_fallback:
+        # Last known or no weather isn't worth keeping: the next request may well get the current weather.
+        response.headers["Cache-Control"] = NO_STORE
     return ShipmentWithWeather(**shipment.model_dump(), weather=weather)
 
 
@@ -57,13 +146,72 @@ async def get_one_shipment(tracking_number: str, db: AsyncSession = Depends(get_
 async def create_shipment(
     shipment: ShipmentCreate,
     articles: List[ArticleCreate],
-    response: Response,
     db: AsyncSession = Depends(get_db),
+    redis: Redis = Depends(get_redis),
 ):
     repo = ShipmentsRepo(db)
-    if found_shipment := await repo.get_one_by_tracking(shipment.tracking_number):
-        response.status_code = HTTPStatus.NO_CONTENT
-        return found_shipment
-
     created = await repo.create_shipment(shipment, articles)
-    return Shipment.model_validate(created)
+    if created is None:
+        # Already exists: nothing was written and the existing shipment isn't loaded.
+        return Response(status_code=HTTPStatus.NO_CONTENT)
+
+    await invalidate_shipment(redis, created.tracking_number)
+    await invalidate_responses(redis, [created.tracking_number])
+    result = Shipment.model_validate(created)
+    # Geocoded once here rather than on every read; bulk created and imported ones by backfill_locations.py.
+    locate_in_background(redis, result.id, result.tracking_number, result.receiver_address)
+    return result
+
+
+@router.post(
+    "/shipments/bulk",
+    response_model=BulkShipmentsResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                media_type: {"schema": {"type": "array", "items": {"$ref": "#/components/schemas/ShipmentCreate"}}}
+                for media_type in ("application/json", "application/x-ndjson")
+            },
+        }
+    },
+)
+async def bulk_create_shipments(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    redis: Redis = Depends(get_redis),
+):
+    """Create many shipments at once; tracking numbers that already exist are reported, not changed."""
+    shipments = _parse_bulk_body(request.headers.get("content-type", ""), await request.body())
+    if len(shipments) > BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {BULK_MAX_ITEMS} shipments per request",
+        )
+
+    repo = ShipmentsRepo(db)
+    started = time.perf_counter()
+    results = []
+    rows_written = 0
+    # One transaction per batch keeps transactions short; a failed batch leaves earlier ones in place.
+    for offset in range(0, len(shipments), BULK_BATCH_SIZE):
+        batch = shipments[offset : offset + BULK_BATCH_SIZE]
+        for shipment, (shipment_id, created) in zip(batch, await repo.bulk_create(batch), strict=True):
+            results.append(
+                BulkShipmentResult(tracking_number=shipment.tracking_number, id=shipment_id, created=created)
+            )
+            rows_written += 1 + len(shipment.articles) if created else 0
+    elapsed = time.perf_counter() - started
+
+    created_count = sum(result.created for result in results)
+    if created_count:
+        # New shipments can't be cached on their own yet, but list pages may now be missing them.
+        await invalidate_responses(redis, [])
+    rows_per_second = rows_written / elapsed if elapsed else 0.0
+    logger.info("Bulk created %d of %d shipments, %.0f rows/s", created_count, len(results), rows_per_second)
+    return BulkShipmentsResponse(
+        results=results,
+        created=created_count,
+        existing=len(results) - created_count,
+        rows_per_second=rows_per_second,
+    )
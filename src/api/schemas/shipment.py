@@ -41,6 +41,13 @@ class Shipment(ShipmentBase):
     articles: list[Article] = Field(default_factory=list)
 
 
+class StoredShipment(Shipment):
+    """A shipment with the stored receiver coordinates, which aren't part of the API representation."""
+
+    receiver_latitude: float | None = None
+    receiver_longitude: float | None = None
+
+
 class ShipmentWithWeather(Shipment):
     weather: dict | None = None
 
@@ -49,3 +56,17 @@ class ShipmentsResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
     shipments: Sequence[Shipment]
+    next_cursor: str | None = None
+
+
+class BulkShipmentResult(BaseModel):
+    tracking_number: str
+    id: int
+    created: bool
+
+
+class BulkShipmentsResponse(BaseModel):
+    results: list[BulkShipmentResult]
+    created: int
+    existing: int
+    rows_per_second: float
@@ -0,0 +1,22 @@
+from operator import attrgetter
+from typing import Any
+
+from src.api.schemas.shipment import Shipment
+from src.db.shipments_repo import ShipmentRecord
+
+
+# Field layout of the response schema, in its serialization order, read once at import.
+SHIPMENT_FIELDS = tuple(name for name in Shipment.model_fields if name != "articles")
+
+_shipment_values = attrgetter(*SHIPMENT_FIELDS)
+
+
+def shipment_to_dict(record: ShipmentRecord) -> dict[str, Any]:
+    """JSON-ready dict matching the `Shipment` schema, read straight off a record without validation.
+
+    Only for data from our own database, which already satisfies the schema. The articles are taken as the
+    database aggregated them, except that prices are made floats again: JSON drops the fraction of `800.0`.
+    """
+    data = dict(zip(SHIPMENT_FIELDS, _shipment_values(record), strict=True))
+    data["articles"] = [{**article, "price": float(article["price"])} for article in record.articles]
+    return data
@@ -0,0 +1,25 @@
+import aiohttp
+
+from fastapi import Request
+
+from src.config.settings import settings
+
+
+def create_http_session() -> aiohttp.ClientSession:
+    """Build the shared upstream HTTP session. Owned by the app lifespan, keep-alive connections are pooled."""
+    connector = aiohttp.TCPConnector(
+        limit=settings.http_pool_size,
+        limit_per_host=settings.http_pool_size_per_host,
+        keepalive_timeout=settings.http_keepalive_timeout,
+        ttl_dns_cache=300,
+    )
+    timeout = aiohttp.ClientTimeout(
+        total=settings.http_timeout,
+        connect=settings.http_connect_timeout,
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=timeout, raise_for_status=True)
+
+
+def get_http_session(request: Request) -> aiohttp.ClientSession:
+    http_session: aiohttp.ClientSession = request.app.state.http_session
+    return http_session
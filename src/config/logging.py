@@ -1,50 +1,159 @@
+import atexit
+import copy
 import logging
-import os
+import queue
 import sys
 
+from datetime import UTC, datetime
 from logging import Logger
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
 
+import orjson
 
-def setup_logging() -> Logger:
-    # Create logs directory if it doesn't exist
-    log_file = os.getenv("LOG_FILE", "logs/app.log")
-    logs_dir = Path(log_file).parent
-    logs_dir.mkdir(exist_ok=True)
+from src.config.settings import Settings, settings
+from src.core.metrics import LOG_RECORDS_DROPPED
 
-    # Get logging configuration from environment variables
-    log_level = os.getenv("LOG_LEVEL", "DEBUG")
-    max_bytes = int(os.getenv("LOG_MAX_BYTES", 10485760))  # Default 10MB
-    backup_count = int(os.getenv("LOG_BACKUP_COUNT", 5))
-    console_format = os.getenv("LOG_FORMAT_CONSOLE", "%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-    file_format = os.getenv(
-        "LOG_FORMAT_FILE", "%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s"
-    )
 
-    # Create a logger
-    logger = logging.getLogger()
-    logger.setLevel(log_level)
+# Attributes every LogRecord has; anything else on a record was passed through `extra=`.
+_RECORD_ATTRIBUTES = {*logging.makeLogRecord({}).__dict__, "message", "asctime"}
+
+_listener: QueueListener | None = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with `extra=` fields as keys of their own."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, UTC).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "location": f"{record.filename}:{record.lineno}",
+        }
+        entry.update((key, value) for key, value in record.__dict__.items() if key not in _RECORD_ATTRIBUTES)
+        if record.exc_info:
+            record.exc_text = record.exc_text or self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return orjson.dumps(entry, default=str).decode()
+
+
+class RateLimitFilter(logging.Filter):
+    """Lets through at most `per_second` INFO and DEBUG records per second from each logging call site.
+
+    Warnings and errors always pass. Dropped records are counted in LOG_RECORDS_DROPPED.
+    """
+
+    def __init__(self, per_second: float):
+        super().__init__()
+        self.per_second = per_second
+        self._windows: dict[tuple[str, int], tuple[int, int]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO:
+            return True
+        site = (record.pathname, record.lineno)
+        second = int(record.created)
+        window, count = self._windows.get(site, (second, 0))
+        if window != second:
+            window, count = second, 0
+        self._windows[site] = (window, count + 1)
+        if count < self.per_second:
+            return True
+        LOG_RECORDS_DROPPED.labels(reason="rate_limited").inc()
+        return False
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Hands records to the listener thread, dropping them rather than blocking when the queue is full.
+
+    Only the message is rendered on the calling thread (its arguments may change afterwards); timestamps, formats
+    and the writes happen on the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
 
-    # Create formatters
-    console_formatter = logging.Formatter(console_format)
-    file_formatter = logging.Formatter(file_format)
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.labels(reason="queue_full").inc()
+
+
+def build_handlers(config: Settings = settings) -> list[logging.Handler]:
+    """The handlers that write log records: stdout and a rotating file."""
+    log_file = config.log_file
+    Path(log_file).parent.mkdir(exist_ok=True)
+
+    console_formatter: logging.Formatter
+    file_formatter: logging.Formatter
+    if config.log_json:
+        console_formatter = file_formatter = JsonFormatter()
+    else:
+        console_formatter = logging.Formatter(config.log_format_console)
+        file_formatter = logging.Formatter(config.log_format_file)
 
-    # Console handler
     console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(log_level)
     console_handler.setFormatter(console_formatter)
 
-    # File handler
-    file_handler = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count)
-    file_handler.setLevel(log_level)
+    file_handler = RotatingFileHandler(log_file, maxBytes=config.log_max_bytes, backupCount=config.log_backup_count)
     file_handler.setFormatter(file_formatter)
+    return [console_handler, file_handler]
+
+
+def setup_logging(config: Settings = settings) -> Logger:
+    """Route the root logger through a queue to a listener thread that writes the records.
+
+    Logging calls on the event loop then only render the message and enqueue it; formatting and disk and console
+    writes no longer block request handling. Calling it again replaces the previous setup.
+    """
+    global _listener
+    stop_logging()
+
+    logger = logging.getLogger()
+    logger.setLevel(config.log_level)
+    for name, level in config.logger_levels.items():
+        logging.getLogger(name).setLevel(level)
+
+    records: queue.Queue[logging.LogRecord] = queue.Queue(config.log_queue_size)
+    queue_handler = NonBlockingQueueHandler(records)
+    if config.log_rate_limit:
+        queue_handler.addFilter(RateLimitFilter(config.log_rate_limit))
+    for handler in [handler for handler in logger.handlers if isinstance(handler, NonBlockingQueueHandler)]:
+        logger.removeHandler(handler)
+    logger.addHandler(queue_handler)
 
-    # Add handlers to logger
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
+    _listener = QueueListener(records, *build_handlers(config), respect_handler_level=True)
+    _listener.start()
 
-    logger.info("Logging configured with level %s", log_level)
-    logger.debug("Log file: %s, max bytes: %d, backup count: %d", log_file, max_bytes, backup_count)
+    logger.info("Logging configured with level %s", config.log_level)
+    logger.debug(
+        "Log file: %s, max bytes: %d, backup count: %d", config.log_file, config.log_max_bytes, config.log_backup_count
+    )
 
     return logger
+
+
+def stop_logging() -> None:
+    """Write out the queued records and stop the listener thread."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+
+
+atexit.register(stop_logging)
@@ -1,7 +1,24 @@
-import os
+from fastapi import Request
+from redis.asyncio import BlockingConnectionPool, Redis
 
-from redis import Redis
+from src.config.settings import settings
 
 
-def get_redis():
-    return Redis(host=os.getenv("REDIS_HOST", "localhost"), port=int(os.getenv("REDIS_PORT", 6379)), db=0)
+def create_redis() -> Redis:
+    """Build the shared Redis client. Owned by the app lifespan, callers wait for a free pooled connection."""
+    pool = BlockingConnectionPool(
+        host=settings.redis_host,
+        port=settings.redis_port,
+        db=0,
+        max_connections=settings.redis_pool_size,
+        timeout=settings.redis_pool_timeout,
+        socket_timeout=settings.redis_socket_timeout,
+        socket_connect_timeout=settings.redis_connect_timeout,
+        health_check_interval=30,
+    )
+    return Redis.from_pool(pool)
+
+
+def get_redis(request: Request) -> Redis:
+    redis: Redis = request.app.state.redis
+    return redis
@@ -0,0 +1,130 @@
+from enum import StrEnum
+
+from pydantic_settings import BaseSettings
+
+
+class CacheKeyStrategy(StrEnum):
+    """How weather cache entries are shared between addresses."""
+
+    zip = "zip"  # country + zip code, geohash cell when no zip code can be parsed
+    geohash = "geohash"  # geohash cell of the geocoded coordinates
+    coordinates = "coordinates"  # exact coordinates, one entry per distinct geocode result
+
+
+class CacheMode(StrEnum):
+    ttl = "ttl"  # entries expire after the cache TTL, the next request waits for upstream
+    swr = "swr"  # stale-while-revalidate: after the cache TTL serve stale and refresh in background
+
+
+class Settings(BaseSettings):
+    """Runtime configuration, read once from the environment; each field is the upper-cased env var.
+
+    See .env.example for what they do.
+    """
+
+    api_version: str = "0.0.1"
+
+    # Database
+    database_url: str | None = None
+    # Comma-separated read replicas for the GET routes; none means reads go to database_url too.
+    database_replica_urls: str = ""
+    db_pool_size: int = 20
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 5
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = False
+    db_statement_cache_size: int = 500
+
+    # Redis
+    redis_host: str = "localhost"
+    redis_port: int = 6379
+    redis_pool_size: int = 50
+    redis_pool_timeout: int = 2
+    redis_socket_timeout: float = 1
+    redis_connect_timeout: float = 1
+
+    # Upstream HTTP client
+    http_pool_size: int = 100
+    http_pool_size_per_host: int = 20
+    http_keepalive_timeout: float = 30
+    http_timeout: float = 5
+    http_connect_timeout: float = 2
+
+    # Weather and geocoding upstreams and their Redis caches
+    openweathermap_api_key: str | None = None
+    openweathermap_url: str = "https://api.openweathermap.org/data/2.5/weather"
+    nominatim_domain: str = "nominatim.openstreetmap.org"
+    nominatim_scheme: str = "https"
+    weather_cache_ttl: int = 2 * 3600
+    weather_cache_mode: CacheMode = CacheMode.ttl
+    weather_cache_hard_ttl: int = 6 * 3600
+    weather_cache_key_strategy: CacheKeyStrategy = CacheKeyStrategy.zip
+    weather_cache_geohash_precision: int = 5
+    weather_lease_ttl: float = 10
+    geocode_cache_ttl: int = 30 * 24 * 3600
+    geocode_negative_cache_ttl: int = 3600
+    geocode_lease_ttl: float = 10
+
+    # Time a shipment response waits for weather before it falls back to the last known weather, or none
+    weather_budget: float = 1.0
+    weather_last_known_ttl: int = 24 * 3600
+    # Per-upstream circuit breakers: open at this share of failed calls among at least min_calls in the window
+    upstream_breaker_failure_rate: float = 0.5
+    upstream_breaker_min_calls: int = 20
+    upstream_breaker_window: float = 30
+    upstream_breaker_open_seconds: float = 30
+
+    # Background refresh of the weather at active shipments' destinations, off with an interval of 0
+    weather_prefetch_interval: float = 0
+    weather_prefetch_refresh_ahead: float = 15 * 60
+    weather_prefetch_rate: float = 10
+    weather_prefetch_batch_size: int = 10
+
+    # In-process cache tiers (per worker) and the rendered response cache
+    weather_local_cache_size: int = 10000
+    weather_local_cache_ttl: float = 60
+    weather_local_cache_max_bytes: int = 16 * 1024 * 1024
+    geocode_local_cache_size: int = 10000
+    geocode_local_cache_ttl: float = 3600
+    shipment_local_cache_size: int = 10000
+    shipment_local_cache_ttl: float = 30
+    shipment_local_cache_max_bytes: int = 32 * 1024 * 1024
+    response_cache_ttl: int = 60
+
+    # Shipment export, bulk creation and import
+    shipment_export_batch_size: int = 1000
+    shipment_bulk_max_items: int = 50000
+    shipment_bulk_batch_size: int = 1000
+    shipment_import_batch_rows: int = 50000
+
+    # Request profiling, off unless a token or a sampling rate is set
+    profiling_token: str | None = None
+    profiling_sample_every: int = 0
+    profiling_interval: float = 0.001
+    profiling_dir: str = "profiles"
+
+    # Logging
+    log_level: str = "INFO"
+    # Comma-separated logger=LEVEL overrides, e.g. "src.services.weather_service=WARNING,sqlalchemy.engine=INFO".
+    log_levels: str = ""
+    log_json: bool = False
+    log_queue_size: int = 10000
+    # INFO and DEBUG records per second let through from each logging call site, 0 for no limit.
+    log_rate_limit: float = 0
+    log_file: str = "logs/app.log"
+    log_max_bytes: int = 10 * 1024 * 1024
+    log_backup_count: int = 5
+    log_format_console: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    log_format_file: str = "%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s"
+
+    @property
+    def replica_urls(self) -> list[str]:
+        return [url.strip() for url in self.database_replica_urls.split(",") if url.strip()]
+
+    @property
+    def logger_levels(self) -> dict[str, str]:
+        pairs = (item.split("=", 1) for item in self.log_levels.split(",") if item.strip())
+        return {name.strip(): level.strip().upper() for name, level in pairs}
+
+
+settings = Settings()
@@ -0,0 +1,110 @@
+import logging
+import time
+
+from contextlib import contextmanager
+from enum import IntEnum
+from typing import Iterator
+
+from src.core.metrics import CIRCUIT_BREAKER_STATE, CIRCUIT_BREAKER_TRANSITIONS
+
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitState(IntEnum):
+    closed = 0
+    half_open = 1
+    open = 2
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open."""
+
+
+class CircuitBreaker:
+    """Fails calls to an upstream fast while too many of its recent calls fail.
+
+    The circuit opens when at least `min_calls` calls were made in the last `window` seconds and at least
+    `failure_rate` of them raised. While open, calls raise CircuitOpenError without running. After `open_seconds`
+    a single trial call is let through (half-open): if it succeeds the circuit closes, otherwise it opens again.
+
+        with breaker.call():
+            response = await call_upstream()
+
+    State and transitions are exported as `circuit_breaker_*` metrics, labelled with `name` as the upstream.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self, name: str, failure_rate: float = 0.5, min_calls: int = 20, window: float = 30, open_seconds: float = 30
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.open_seconds = open_seconds
+        self.state = CircuitState.closed
+        self._opened_at = 0.0
+        self._trial_running = False
+        # Calls and failures per second of the window, oldest first.
+        self._buckets: dict[int, list[int]] = {}
+        CIRCUIT_BREAKER_STATE.labels(upstream=name).set(self.state)
+
+    @contextmanager
+    def call(self) -> Iterator[None]:
+        trial = self._admit()
+        try:
+            yield
+        except Exception:
+            self._finish(trial, failed=True)
+            raise
+        except BaseException:
+            # Cancellation says nothing about the upstream.
+            if trial:
+                self._trial_running = False
+            raise
+        else:
+            self._finish(trial, failed=False)
+
+    def _admit(self) -> bool:
+        """Raise CircuitOpenError unless the call may go ahead; True if it is the half-open trial call."""
+        if self.state == CircuitState.closed:
+            return False
+        if self.state == CircuitState.open and time.monotonic() - self._opened_at < self.open_seconds:
+            raise CircuitOpenError(f"Circuit for {self.name} is open")
+        if self._trial_running:
+            raise CircuitOpenError(f"Circuit for {self.name} is half-open, waiting for a trial call")
+        if self.state == CircuitState.open:
+            self._transition(CircuitState.half_open)
+        self._trial_running = True
+        return True
+
+    def _finish(self, trial: bool, failed: bool) -> None:
+        if trial:
+            self._trial_running = False
+            self._transition(CircuitState.open if failed else CircuitState.closed)
+        elif self.state == CircuitState.closed:
+            # Calls started before the circuit opened don't count.
+            self._record(failed)
+
+    def _record(self, failed: bool) -> None:
+        now = int(time.monotonic())
+        bucket = self._buckets.setdefault(now, [0, 0])
+        bucket[0] += 1
+        bucket[1] += failed
+        for second in [second for second in self._buckets if second <= now - self.window]:
+            del self._buckets[second]
+        if not failed:
+            return
+        calls = sum(bucket[0] for bucket in self._buckets.values())
+        failures = sum(bucket[1] for bucket in self._buckets.values())
+        if calls >= self.min_calls and failures >= self.failure_rate * calls:
+            logger.warning("Opening circuit for %s: %d of %d calls failed", self.name, failures, calls)
+            self._transition(CircuitState.open)
+
+    def _transition(self, state: CircuitState) -> None:
+        if state == CircuitState.open:
+            self._opened_at = time.monotonic()
+        self._buckets.clear()
+        self.state = state
+        CIRCUIT_BREAKER_STATE.labels(upstream=self.name).set(state)
+        CIRCUIT_BREAKER_TRANSITIONS.labels(upstream=self.name, state=state.name).inc()
@@ -0,0 +1,23 @@
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def encode(latitude: float, longitude: float, precision: int = 5) -> str:
+    """Geohash of a point. Precision 5 is a ~4.9 x 4.9 km cell, 4 is ~39 x 20 km."""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars: list[str] = []
+    bits, bit_count, even = 0, 0, True
+    while len(chars) < precision:
+        value, interval = (longitude, lon_range) if even else (latitude, lat_range)
+        mid = (interval[0] + interval[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            interval[0] = mid
+        else:
+            interval[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:  # noqa: PLR2004
+            chars.append(_BASE32[bits])
+            bits, bit_count = 0, 0
+    return "".join(chars)
@@ -0,0 +1,158 @@
+import functools
+import os
+import time
+
+from typing import Any, Awaitable, Callable, TypeVar
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+
+
+WEATHER_CACHE_REQUESTS = Counter(
+    "weather_cache_requests",
+    "Weather cache lookups by cache key kind (zip, geohash, coordinates) and result (hit, stale, miss, error)",
+    ["key_kind", "result"],
+)
+WEATHER_BACKGROUND_REFRESHES = Counter(
+    "weather_background_refreshes",
+    "Stale weather entries refreshed in the background, by result (success, failure)",
+    ["result"],
+)
+WEATHER_PREFETCH_LOCATIONS = Gauge(
+    "weather_prefetch_locations",
+    "Distinct weather cache keys of active shipments' destinations in the last prefetch scan",
+    multiprocess_mode="mostrecent",
+)
+WEATHER_PREFETCH_DUE = Gauge(
+    "weather_prefetch_due",
+    "Weather cache entries due for a refresh that the last prefetch run didn't get to",
+    multiprocess_mode="mostrecent",
+)
+WEATHER_PREFETCH_REFRESHES = Counter(
+    "weather_prefetch_refreshes",
+    "Weather cache entries refreshed by the prefetcher, by the entry's state (cached: still there, expired: gone "
+    "already) and result (success, failure)",
+    ["entry", "result"],
+)
+WEATHER_PREFETCH_LAG_SECONDS = Histogram(
+    "weather_prefetch_lag_seconds",
+    "How long after it was due for a refresh a still cached entry got refreshed by the prefetcher",
+    buckets=(0, 1, 5, 15, 30, 60, 120, 300, 600, 900, 1800, 3600, 7200),
+)
+COALESCED_CALLS = Counter(
+    "coalesced_calls",
+    "Calls that awaited an upstream fetch already in flight, in this process or in another worker (cluster)",
+    ["name", "scope"],
+)
+RESPONSE_CACHE_REQUESTS = Counter(
+    "response_cache_requests",
+    "Cacheable GET requests by resource (shipment, shipments) and result (hit, not_modified, miss)",
+    ["resource", "result"],
+)
+
+LOCAL_CACHE_REQUESTS = Counter(
+    "local_cache_requests",
+    "In-process cache lookups by cache (weather, geocode, shipments) and result (hit, miss)",
+    ["cache", "result"],
+)
+LOCAL_CACHE_EVICTIONS = Counter(
+    "local_cache_evictions",
+    "In-process cache evictions by cache and reason (capacity: entry or memory cap, expired: TTL)",
+    ["cache", "reason"],
+)
+LOCAL_CACHE_ENTRIES = Gauge("local_cache_entries", "Entries held by an in-process cache", ["cache"])
+LOCAL_CACHE_BYTES = Gauge("local_cache_bytes", "Approximate serialized size held by an in-process cache", ["cache"])
+
+# Database connection pools by pool (engine logging name), summed over live workers.
+DB_POOL_SIZE = Gauge(
+    "db_pool_size", "Configured persistent connections per pool", ["pool"], multiprocess_mode="livesum"
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Connections currently checked out of a pool", ["pool"], multiprocess_mode="livesum"
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow", "Connections open beyond the pool size (max_overflow)", ["pool"], multiprocess_mode="livesum"
+)
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_seconds",
+    "Time to get a connection from a pool, including waiting for a free one and connecting a new one",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_seconds",
+    "Request latency by method, route template and response status",
+    ["method", "route", "status"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+STAGE_SECONDS = Histogram(
+    "stage_seconds",
+    "Time spent in a stage of request handling: db.*, geocode.*, weather.*, serialize.*",
+    ["stage"],
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+UPSTREAM_REQUESTS = Counter(
+    "upstream_requests",
+    "Calls to third-party APIs by upstream (nominatim, openweathermap) and result (ok, error, timeout, circuit_open)",
+    ["upstream", "result"],
+)
+CIRCUIT_BREAKER_STATE = Gauge(
+    "circuit_breaker_state",
+    "Circuit breaker state per upstream: 0 closed, 1 half-open, 2 open; the worst across workers",
+    ["upstream"],
+    multiprocess_mode="livemax",
+)
+CIRCUIT_BREAKER_TRANSITIONS = Counter(
+    "circuit_breaker_transitions",
+    "Circuit breaker state changes per upstream, by the state entered (open, half_open, closed)",
+    ["upstream", "state"],
+)
+WEATHER_FALLBACKS = Counter(
+    "weather_fallbacks",
+    "Shipment responses without fresh weather, by reason (budget: WEATHER_BUDGET exceeded, error, unavailable) "
+    "and what was served instead (last_known, none)",
+    ["reason", "served"],
+)
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped",
+    "Log records not written, by reason (rate_limited: over LOG_RATE_LIMIT, queue_full: writer falling behind)",
+    ["reason"],
+)
+
+T = TypeVar("T")
+
+
+class timed:  # noqa: N801
+    """Observe a stage's duration into STAGE_SECONDS, as a `with` block or as a decorator of async functions."""
+
+    def __init__(self, stage: str):
+        # Resolved once: a decorated function pays for two perf_counter calls and an observe.
+        self.histogram = STAGE_SECONDS.labels(stage=stage)
+
+    def __enter__(self) -> None:
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        self.histogram.observe(time.perf_counter() - self.started)
+
+    def __call__(self, func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        histogram = self.histogram
+
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> T:
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started)
+
+        return wrapper
+
+
+def render_latest() -> bytes:
+    """Metrics in Prometheus text format, aggregated across workers when PROMETHEUS_MULTIPROC_DIR is set."""
+    registry = REGISTRY
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
@@ -0,0 +1,141 @@
+import asyncio
+import gc
+import json
+import sys
+import threading
+import time
+
+from pathlib import Path
+from types import FrameType
+from typing import Any
+
+
+# Iterators that `await` goes through without exposing what they wrap: `coro.__await__()` (SQLAlchemy's greenlet
+# bridge awaits driver calls this way), an async generator's `__anext__()`, a future's `__await__()`.
+_WRAPPERS = {"coroutine_wrapper", "async_generator_asend", "async_generator_athrow", "FutureIter"}
+
+
+def _unwrap(awaitable: Any) -> Any:
+    if type(awaitable).__name__ in _WRAPPERS:
+        # Their only referent is the wrapped object.
+        referents = gc.get_referents(awaitable)
+        if len(referents) == 1:
+            return referents[0]
+    return awaitable
+
+
+def _frame_of(awaitable: Any) -> FrameType | None:
+    return (
+        getattr(awaitable, "cr_frame", None)
+        or getattr(awaitable, "ag_frame", None)
+        or getattr(awaitable, "gi_frame", None)
+    )
+
+
+class TaskProfiler:
+    """Wall-clock sampling profiler for one asyncio task, exported in speedscope's format.
+
+    A background thread samples the task every `interval` seconds. While the task runs, a sample is the thread's
+    stack down from the task's coroutines; while it is suspended, it is the chain of coroutines the task awaits
+    through, ending in what it waits on (e.g. "[await Future]" under asyncpg, redis or aiohttp frames). Time spent
+    waiting on I/O is therefore attributed to the code that waits, not to the event loop.
+    """
+
+    def __init__(self, task: asyncio.Task, interval: float = 0.001):
+        self.task = task
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.frames: list[dict[str, Any]] = []
+        self.samples: list[list[int]] = []
+        self.weights: list[float] = []
+        self._frame_indexes: dict[tuple[str, str, int], int] = {}
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="task-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        last = time.perf_counter()
+        while not self._stopped.wait(self.interval):
+            stack = self._sample()
+            now = time.perf_counter()
+            if stack:
+                self.samples.append(stack)
+                self.weights.append(now - last)
+            last = now
+
+    def _sample(self) -> list[int]:
+        coroutine_frames, awaiting = self._await_chain()
+        if not coroutine_frames:
+            return []
+        stack = [self._frame_index(frame) for frame in coroutine_frames]
+
+        # Running right now if the innermost coroutine is on the thread's stack; what it calls goes below it.
+        calls = []
+        frame = sys._current_frames().get(self.thread_id)
+        while frame is not None and frame is not coroutine_frames[-1]:
+            calls.append(frame)
+            frame = frame.f_back
+        if frame is not None:
+            stack.extend(self._frame_index(call) for call in reversed(calls))
+        elif awaiting is not None:
+            stack.append(self._index("", f"[await {type(awaiting).__name__}]", 0))
+        return stack
+
+    def _await_chain(self) -> tuple[list[FrameType], Any]:
+        """Frames of the coroutines the task awaits through, outermost first, and the frameless awaitable at the end."""
+        frames: list[FrameType] = []
+        awaitable: Any = self.task.get_coro()
+        while awaitable is not None:
+            awaitable = _unwrap(awaitable)
+            frame = _frame_of(awaitable)
+            if frame is None:
+                return frames, awaitable
+            frames.append(frame)
+            awaitable = (
+                getattr(awaitable, "cr_await", None)
+                or getattr(awaitable, "ag_await", None)
+                or getattr(awaitable, "gi_yieldfrom", None)
+            )
+        return frames, None
+
+    def _frame_index(self, frame: FrameType) -> int:
+        code = frame.f_code
+        return self._index(code.co_filename, code.co_qualname, code.co_firstlineno)
+
+    def _index(self, file: str, name: str, line: int) -> int:
+        key = (file, name, line)
+        index = self._frame_indexes.get(key)
+        if index is None:
+            index = self._frame_indexes[key] = len(self.frames)
+            self.frames.append({"name": name, "file": file, "line": line} if file else {"name": name})
+        return index
+
+    def speedscope(self, name: str) -> dict[str, Any]:
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "src.core.profiling",
+            "activeProfileIndex": 0,
+            "shared": {"frames": self.frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": name,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": sum(self.weights),
+                    "samples": self.samples,
+                    "weights": self.weights,
+                }
+            ],
+        }
+
+    def save(self, path: Path, name: str) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.speedscope(name)))
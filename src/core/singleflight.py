@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import time
+import uuid
+
+from functools import partial
+from typing import Awaitable, Callable, Generic, TypeVar
+
+from redis.asyncio import Redis
+
+from src.core.metrics import COALESCED_CALLS
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Delete the lease only if we still own it, it may have expired and been taken by another worker.
+_RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlight(Generic[T]):
+    """Coalesces concurrent calls with the same key in this process into one in-flight execution.
+
+    The call runs as its own task, so a caller that gets cancelled doesn't cancel it for the others.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._tasks: dict[str, asyncio.Future[T]] = {}
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(partial(self._forget, key))
+        else:
+            COALESCED_CALLS.labels(name=self.name, scope="process").inc()
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Future[T]) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            task.exception()  # retrieved by the callers, or nobody is left to care
+
+
+class RedisLease:
+    """Runs a fetch in one worker at a time per key, guarded by a short Redis lease.
+
+    Workers that don't get the lease poll the cache until the holder has filled it. If the lease is released
+    or expires first (holder failed, died or is too slow), the first waiter to take it over fetches instead;
+    waiters still without a value after `ttl` fetch themselves. Redis errors fall back to fetching directly.
+    """
+
+    def __init__(self, redis_client: Redis, name: str, ttl: float, poll_interval: float = 0.05):
+        self.redis_client = redis_client
+        self.name = name
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self._release = redis_client.register_script(_RELEASE_SCRIPT)
+
+    async def run(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[T]],
+        poll: Callable[[], Awaitable[tuple[bool, T | None]]],
+    ) -> T | None:
+        lease_key = f"lease:{key}"
+        token = uuid.uuid4().hex
+        try:
+            acquired = await self._acquire(lease_key, token)
+        except Exception as e:
+            logger.error("Failed to acquire lease %s: %s", lease_key, str(e))
+            return await fetch()
+
+        if not acquired:
+            COALESCED_CALLS.labels(name=self.name, scope="cluster").inc()
+            deadline = time.monotonic() + self.ttl
+            while not acquired:
+                if time.monotonic() >= deadline:
+                    logger.warning("Lease %s expired before the value was cached, fetching", lease_key)
+                    return await fetch()
+                await asyncio.sleep(self.poll_interval)
+                found, value = await poll()
+                if found:
+                    return value
+                # A lease released or expired without a cached value means the holder failed or died:
+                # one waiter takes over and fetches, the others keep waiting for it.
+                try:
+                    acquired = await self._acquire(lease_key, token)
+                except Exception as e:
+                    logger.error("Failed to acquire lease %s: %s", lease_key, str(e))
+                    return await fetch()
+
+        try:
+            return await fetch()
+        finally:
+            try:
+                await self._release(keys=[lease_key], args=[token])
+            except Exception as e:
+                logger.error("Failed to release lease %s: %s", lease_key, str(e))
+
+    async def _acquire(self, lease_key: str, token: str) -> bool:
+        return bool(await self.redis_client.set(lease_key, token, nx=True, px=int(self.ttl * 1000)))
@@ -0,0 +1,73 @@
+import time
+
+from collections import OrderedDict
+from typing import Any, Hashable
+
+from src.core.metrics import LOCAL_CACHE_BYTES, LOCAL_CACHE_ENTRIES, LOCAL_CACHE_EVICTIONS, LOCAL_CACHE_REQUESTS
+
+
+class TTLCache:
+    """Bounded in-process cache: entries expire after `ttl` seconds, least recently used are evicted first.
+
+    Besides the entry count, the cache can be capped by `max_bytes`. Entry sizes are approximate and passed
+    to `set` by the caller, typically the length of the payload the value was decoded from.
+    Hits, misses and evictions are exported as `local_cache_*` metrics labelled with `name`.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float, max_bytes: int = 0):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._data: OrderedDict[Hashable, tuple[float, int, Any]] = OrderedDict()
+
+        self._hits = LOCAL_CACHE_REQUESTS.labels(cache=name, result="hit")
+        self._misses = LOCAL_CACHE_REQUESTS.labels(cache=name, result="miss")
+        self._expired = LOCAL_CACHE_EVICTIONS.labels(cache=name, reason="expired")
+        self._evicted = LOCAL_CACHE_EVICTIONS.labels(cache=name, reason="capacity")
+        LOCAL_CACHE_ENTRIES.labels(cache=name).set_function(self.__len__)
+        LOCAL_CACHE_BYTES.labels(cache=name).set_function(lambda: self.bytes)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            self._misses.inc()
+            return default
+        expires_at, _, value = item
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self._expired.inc()
+            self._misses.inc()
+            return default
+        self._data.move_to_end(key)
+        self._hits.inc()
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None, size: int = 0) -> None:
+        if self.maxsize <= 0:
+            return
+        # Whatever was cached under the key is outdated now, even if the new value is too big to keep.
+        self._remove(key)
+        if self.max_bytes and size > self.max_bytes:
+            return
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), size, value)
+        self.bytes += size
+        while len(self._data) > self.maxsize or (self.max_bytes and self.bytes > self.max_bytes):
+            oldest = next(iter(self._data))
+            self._remove(oldest)
+            self._evicted.inc()
+
+    def delete(self, key: Hashable) -> None:
+        self._remove(key)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.bytes = 0
+
+    def _remove(self, key: Hashable) -> None:
+        if (item := self._data.pop(key, None)) is not None:
+            self.bytes -= item[1]
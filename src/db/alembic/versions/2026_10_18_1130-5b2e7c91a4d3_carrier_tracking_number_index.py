@@ -0,0 +1,42 @@
+"""Composite (carrier, tracking_number) index
+
+Revision ID: 5b2e7c91a4d3
+Revises: dcb68c87f04d
+Create Date: 2026-10-18 11:30:12.518204
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5b2e7c91a4d3"
+down_revision: Union[str, None] = "dcb68c87f04d"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Built concurrently so shipments can still be written meanwhile, which can't happen inside a transaction.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_shipment_carrier_tracking_number",
+            "shipment",
+            ["carrier", "tracking_number"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        # Carrier-only filters use the leading column of the composite index.
+        op.drop_index("ix_shipment_carrier", table_name="shipment", postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index("ix_shipment_carrier", "shipment", ["carrier"], unique=False, postgresql_concurrently=True)
+        op.drop_index(
+            "ix_shipment_carrier_tracking_number",
+            table_name="shipment",
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,35 @@
+"""Index article.shipment_id
+
+Revision ID: 8d3f1a6c2b57
+Revises: 5b2e7c91a4d3
+Create Date: 2026-10-18 14:15:41.207339
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8d3f1a6c2b57"
+down_revision: Union[str, None] = "5b2e7c91a4d3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Every shipment read aggregates its articles by shipment_id, which was a scan of the whole table.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_article_shipment_id",
+            "article",
+            ["shipment_id"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_article_shipment_id", table_name="article", postgresql_concurrently=True)
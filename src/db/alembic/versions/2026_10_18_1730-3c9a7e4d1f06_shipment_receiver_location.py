@@ -0,0 +1,31 @@
+"""Receiver location columns on shipment
+
+Revision ID: 3c9a7e4d1f06
+Revises: 8d3f1a6c2b57
+Create Date: 2026-10-18 17:30:12.584019
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3c9a7e4d1f06"
+down_revision: Union[str, None] = "8d3f1a6c2b57"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Nullable without defaults, so no table rewrite; existing rows are filled by backfill_locations.py.
+    op.add_column("shipment", sa.Column("receiver_latitude", sa.Float(), nullable=True))
+    op.add_column("shipment", sa.Column("receiver_longitude", sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("shipment", "receiver_longitude")
+    op.drop_column("shipment", "receiver_latitude")
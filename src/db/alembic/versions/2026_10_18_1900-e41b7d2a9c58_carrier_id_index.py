@@ -0,0 +1,35 @@
+"""Composite (carrier, id) index
+
+Revision ID: e41b7d2a9c58
+Revises: 3c9a7e4d1f06
+Create Date: 2026-10-18 19:00:41.207316
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e41b7d2a9c58"
+down_revision: Union[str, None] = "3c9a7e4d1f06"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Pages filtered by carrier are read in id order: this index serves them without filtering or sorting.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_shipment_carrier_id",
+            "shipment",
+            ["carrier", "id"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_shipment_carrier_id", table_name="shipment", postgresql_concurrently=True)
@@ -17,3 +17,7 @@ class ShipmentStatus(StrEnum):
     canceled = "canceled"
     returned = "returned"
     lost = "lost"
+
+
+# Shipments that won't move anymore; there is no "delivered", a delivered shipment keeps its last status.
+TERMINAL_STATUSES = frozenset({ShipmentStatus.canceled, ShipmentStatus.returned, ShipmentStatus.lost})
@@ -1,4 +1,4 @@
-from sqlmodel import Field, Relationship, SQLModel
+from sqlmodel import Field, Index, Relationship, SQLModel
 
 from src.db.enums import ShipmentStatus
 
@@ -7,7 +7,7 @@ class Article(SQLModel, table=True):
     __tablename__ = "article"
 
     id: int = Field(default=None, primary_key=True)
-    shipment_id: int | None = Field(default=None, foreign_key="shipment.id")
+    shipment_id: int | None = Field(default=None, foreign_key="shipment.id", index=True)
     name: str
     quantity: int | None = None
     price: float | None = None
@@ -18,12 +18,20 @@ class Article(SQLModel, table=True):
 
 class Shipment(SQLModel, table=True):
     __tablename__ = "shipment"
+    __table_args__ = (
+        Index("ix_shipment_carrier_tracking_number", "carrier", "tracking_number"),
+        # Keyset pages filtered by carrier, see ShipmentsRepo.fetch_page.
+        Index("ix_shipment_carrier_id", "carrier", "id"),
+    )
 
     id: int | None = Field(default=None, primary_key=True)
     tracking_number: str = Field(unique=True, index=True)
-    carrier: str | None = Field(default=None, index=True)
+    carrier: str | None = None
     sender_address: str | None = None
     receiver_address: str
     status: ShipmentStatus = Field(index=True)
+    # Geocoded receiver address, filled in after creation; None until then or if it can't be geocoded.
+    receiver_latitude: float | None = None
+    receiver_longitude: float | None = None
 
     articles: list[Article] = Relationship(back_populates="shipment")
@@ -1,27 +1,100 @@
-import os
+import itertools
+import time
 
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Callable
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+import orjson
 
+from fastapi import Request
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry
 
-# Get database URL from environment or use default
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    raise ValueError()
+from src.config.settings import Settings, settings
+from src.core.metrics import DB_POOL_CHECKED_OUT, DB_POOL_CHECKOUT_SECONDS, DB_POOL_OVERFLOW, DB_POOL_SIZE
 
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=False,
-)
 
-async_session = async_sessionmaker(
-    autoflush=False,
-    autocommit=False,
-    bind=engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-)
+class MeteredQueuePool(AsyncAdaptedQueuePool):
+    """The default asyncio pool, reporting utilization and checkout wait times to Prometheus."""
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.labels(pool=self.logging_name).observe(time.perf_counter() - started)
+            self._report()
+
+    def _do_return_conn(self, record: ConnectionPoolEntry) -> None:
+        super()._do_return_conn(record)
+        self._report()
+
+    def _report(self) -> None:
+        DB_POOL_CHECKED_OUT.labels(pool=self.logging_name).set(self.checkedout())
+        # Counts up from -pool_size as connections are opened, only positive once the pool is full.
+        DB_POOL_OVERFLOW.labels(pool=self.logging_name).set(max(self.overflow(), 0))
+
+
+def create_engine(url: str | None = None, name: str = "primary", config: Settings = settings) -> AsyncEngine:
+    """Async engine with the pool and asyncpg statement cache sized from settings; `name` labels its metrics."""
+    url = url or config.database_url
+    if not url:
+        raise ValueError("DATABASE_URL is not set")
+    DB_POOL_SIZE.labels(pool=name).set(config.db_pool_size)
+    return create_async_engine(
+        url,
+        echo=False,
+        poolclass=MeteredQueuePool,
+        pool_logging_name=name,
+        pool_size=config.db_pool_size,
+        max_overflow=config.db_max_overflow,
+        pool_timeout=config.db_pool_timeout,
+        pool_recycle=config.db_pool_recycle,
+        pool_pre_ping=config.db_pool_pre_ping,
+        # Statements asyncpg keeps prepared per connection; 0 is needed behind pgbouncer in transaction mode.
+        connect_args={"prepared_statement_cache_size": config.db_statement_cache_size},
+        # Shipment reads return their articles as aggregated JSON.
+        json_deserializer=orjson.loads,
+    )
+
+
+def create_sessionmaker(bind: AsyncEngine) -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(
+        autoflush=False,
+        autocommit=False,
+        bind=bind,
+        class_=AsyncSession,
+        expire_on_commit=False,
+    )
+
+
+class ReadRouter:
+    """Hands out sessions for reads: on the replicas in turn, or on the primary if there are none.
+
+    Replica sessions run READ ONLY transactions, so a write that slips into a read path fails even when a
+    "replica" is the primary under another DSN, as in local setups.
+    """
+
+    def __init__(self, primary: async_sessionmaker[AsyncSession], replicas: list[AsyncEngine]):
+        self.primary = primary
+        self.replicas = [
+            create_sessionmaker(replica.execution_options(postgresql_readonly=True)) for replica in replicas
+        ]
+        self._next = itertools.cycle(self.replicas or [primary])
+
+    def session(self, read_primary: bool = False) -> AsyncSession:
+        return self.primary() if read_primary else next(self._next)()
+
+
+engine = create_engine()
+replica_engines = [create_engine(url, name=f"replica{n}") for n, url in enumerate(settings.replica_urls, 1)]
+
+async_session = create_sessionmaker(engine)
+read_router = ReadRouter(async_session, replica_engines)
+read_session: Callable[[], AsyncSession] = read_router.session
+
+# Replicas lag behind the primary; clients that must see their own writes, say right after creating a
+# shipment, send this header on the read to have it served by the primary.
+READ_PRIMARY_HEADER = "x-read-primary"
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
@@ -30,3 +103,9 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             yield session
     finally:
         await session.close()
+
+
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """Session for read-only routes, on a replica unless the request asks for the primary."""
+    async with read_router.session(read_primary=READ_PRIMARY_HEADER in request.headers) as session:
+        yield session
@@ -1,70 +1,295 @@
-from typing import Sequence
+from typing import Any, AsyncIterator, NamedTuple, Sequence
 
+from sqlalchemy import Select, bindparam, func, literal_column, select, text, update
+from sqlalchemy.dialects.postgresql import JSON, aggregate_order_by, insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
-from sqlmodel import and_, select
 
-from src.api.schemas.shipment import ArticleCreate, ShipmentCreate
+from src.api.schemas.shipment import Article, ArticleCreate, ShipmentCreate
+from src.core.metrics import timed
+from src.db.enums import TERMINAL_STATUSES, ShipmentStatus
 from src.db.models.shipment import Article as ArticleModel, Shipment as ShipmentModel
 
 
+# The articles are only inserted if the shipment was; a known tracking number returns no rows.
+_CREATE_SHIPMENT = text(
+    """
+    WITH new_shipment AS (
+        INSERT INTO shipment (tracking_number, carrier, sender_address, receiver_address, status)
+        VALUES (:tracking_number, :carrier, :sender_address, :receiver_address, CAST(:status AS shipmentstatus))
+        ON CONFLICT (tracking_number) DO NOTHING
+        RETURNING id
+    ),
+    new_articles AS (
+        INSERT INTO article (shipment_id, name, quantity, price, sku)
+        SELECT new_shipment.id, a.name, a.quantity, a.price, a.sku
+        FROM new_shipment,
+            unnest(
+                CAST(:names AS text[]),
+                CAST(:quantities AS integer[]),
+                CAST(:prices AS double precision[]),
+                CAST(:skus AS text[])
+            ) WITH ORDINALITY AS a(name, quantity, price, sku, position)
+        ORDER BY a.position
+        RETURNING id, name, quantity, price, sku
+    )
+    SELECT new_shipment.id, new_articles.id AS article_id, new_articles.name, new_articles.quantity,
+        new_articles.price, new_articles.sku
+    FROM new_shipment LEFT JOIN new_articles ON true
+    ORDER BY new_articles.id
+    """
+)
+
+
+class ShipmentRecord(NamedTuple):
+    """A shipment as read for the API: plain columns, articles as JSON objects with `Article` schema keys."""
+
+    id: int
+    tracking_number: str
+    carrier: str | None
+    sender_address: str | None
+    receiver_address: str
+    status: ShipmentStatus
+    articles: list[dict[str, Any]]
+    # Not part of the API representation, see ShipmentsRepo.set_receiver_locations.
+    receiver_latitude: float | None = None
+    receiver_longitude: float | None = None
+
+
+_shipment = ShipmentModel.__table__  # type: ignore[attr-defined]
+_article = ArticleModel.__table__  # type: ignore[attr-defined]
+# In schema order, so the aggregated JSON serializes exactly like an `Article`.
+_ARTICLE_COLUMNS = tuple(Article.model_fields)
+
+# Articles are aggregated per shipment in the same statement, so a read is one round trip and no ORM objects.
+_articles_json = (
+    select(
+        func.coalesce(
+            func.json_agg(
+                aggregate_order_by(
+                    func.json_build_object(*(arg for name in _ARTICLE_COLUMNS for arg in (name, _article.c[name]))),
+                    _article.c.id,
+                )
+            ),
+            literal_column("'[]'::json"),
+            type_=JSON,
+        )
+    )
+    .where(_article.c.shipment_id == _shipment.c.id)
+    .scalar_subquery()
+    .label("articles")
+)
+
+
+def _select_records() -> Select:
+    return select(
+        _shipment.c.id,
+        _shipment.c.tracking_number,
+        _shipment.c.carrier,
+        _shipment.c.sender_address,
+        _shipment.c.receiver_address,
+        _shipment.c.status,
+        _articles_json,
+        _shipment.c.receiver_latitude,
+        _shipment.c.receiver_longitude,
+    )
+
+
+def _records(rows: Sequence[Any]) -> list[ShipmentRecord]:
+    return [ShipmentRecord._make(row) for row in rows]
+
+
 class ShipmentsRepo:
     def __init__(self, session: AsyncSession):
         self.db = session
 
-    async def fetch_all(self) -> Sequence[ShipmentModel]:
-        stmt = select(ShipmentModel).options(selectinload(ShipmentModel.articles))
-        result = await self.db.execute(stmt)
-        return result.scalars().all()
+    @timed("db.fetch_all")
+    async def fetch_all(self) -> list[ShipmentRecord]:
+        result = await self.db.execute(_select_records())
+        return _records(result.all())
 
-    async def get_one_by_tracking(self, tracking_number: str) -> ShipmentModel | None:
-        stmt = (
-            select(ShipmentModel)
-            .options(selectinload(ShipmentModel.articles))
-            .where(
-                ShipmentModel.tracking_number == tracking_number,
-            )
+    @timed("db.fetch_page")
+    async def fetch_page(
+        self,
+        limit: int,
+        after_id: int | None = None,
+        carrier: str | None = None,
+        status: ShipmentStatus | None = None,
+    ) -> list[ShipmentRecord]:
+        """Keyset pagination: up to `limit` shipments with id greater than `after_id`, in id order."""
+        stmt = _select_records().order_by(_shipment.c.id)
+        if after_id is not None:
+            stmt = stmt.where(_shipment.c.id > after_id)
+        if carrier:
+            stmt = stmt.where(_shipment.c.carrier == carrier)
+        if status:
+            stmt = stmt.where(_shipment.c.status == status)
+        result = await self.db.execute(stmt.limit(limit))
+        return _records(result.all())
+
+    async def stream(
+        self,
+        batch_size: int,
+        carrier: str | None = None,
+        status: ShipmentStatus | None = None,
+    ) -> AsyncIterator[list[ShipmentRecord]]:
+        """Yield shipments with their articles in id order, `batch_size` at a time, from a server-side cursor.
+
+        Only one batch stays in memory as long as callers don't keep references to earlier batches.
+        """
+        stmt = _select_records().order_by(_shipment.c.id)
+        if carrier:
+            stmt = stmt.where(_shipment.c.carrier == carrier)
+        if status:
+            stmt = stmt.where(_shipment.c.status == status)
+        result = await self.db.stream(stmt.execution_options(yield_per=batch_size))
+        async for batch in result.partitions():
+            yield _records(batch)
+
+    @timed("db.get_one_by_tracking")
+    async def get_one_by_tracking(self, tracking_number: str) -> ShipmentRecord | None:
+        result = await self.db.execute(_select_records().where(_shipment.c.tracking_number == tracking_number))
+        row = result.one_or_none()
+        return ShipmentRecord._make(row) if row else None
+
+    @timed("db.filter_by_carrier")
+    async def filter_by_carrier(self, carrier: str) -> list[ShipmentRecord]:
+        result = await self.db.execute(_select_records().where(_shipment.c.carrier == carrier))
+        return _records(result.all())
+
+    @timed("db.find_one_by_params")
+    async def find_one_by_params(self, tracking_number: str, carrier: str) -> ShipmentRecord | None:
+        result = await self.db.execute(
+            _select_records().where(_shipment.c.tracking_number == tracking_number, _shipment.c.carrier == carrier)
+        )
+        row = result.one_or_none()
+        return ShipmentRecord._make(row) if row else None
+
+    @timed("db.fetch_unlocated")
+    async def fetch_unlocated(self, limit: int, after_id: int = 0) -> list[tuple[int, str]]:
+        """(id, receiver_address) of up to `limit` shipments without receiver coordinates, in id order."""
+        result = await self.db.execute(
+            select(_shipment.c.id, _shipment.c.receiver_address)
+            .where(_shipment.c.receiver_latitude.is_(None), _shipment.c.id > after_id)
+            .order_by(_shipment.c.id)
+            .limit(limit)
         )
-        result = await self.db.execute(stmt)
-        return result.scalar_one_or_none()
+        return [tuple(row) for row in result.all()]
 
-    async def filter_by_carrier(self, carrier: str) -> Sequence[ShipmentModel]:
+    async def stream_active_locations(self, batch_size: int) -> AsyncIterator[list[tuple[str, float, float]]]:
+        """Distinct (receiver_address, latitude, longitude) of located shipments not in a terminal status."""
         stmt = (
-            select(ShipmentModel).options(selectinload(ShipmentModel.articles)).where(ShipmentModel.carrier == carrier)
+            select(_shipment.c.receiver_address, _shipment.c.receiver_latitude, _shipment.c.receiver_longitude)
+            .where(_shipment.c.status.not_in(TERMINAL_STATUSES), _shipment.c.receiver_latitude.is_not(None))
+            .distinct()
         )
-        result = await self.db.execute(stmt)
-        return result.scalars().all()
+        result = await self.db.stream(stmt.execution_options(yield_per=batch_size))
+        async for batch in result.partitions():
+            yield [tuple(row) for row in batch]
 
-    async def find_one_by_params(self, tracking_number: str, carrier: str) -> ShipmentModel | None:
+    @timed("db.set_receiver_locations")
+    async def set_receiver_locations(self, locations: Sequence[tuple[int, float, float]]) -> None:
+        """Store (id, latitude, longitude) of geocoded receiver addresses, in one transaction."""
+        if not locations:
+            return
         stmt = (
-            select(ShipmentModel)
-            .options(selectinload(ShipmentModel.articles))
-            .where(and_(ShipmentModel.tracking_number == tracking_number, ShipmentModel.carrier == carrier))
+            update(_shipment)
+            .where(_shipment.c.id == bindparam("shipment_id"))
+            .values(
+                receiver_latitude=bindparam("latitude"),
+                receiver_longitude=bindparam("longitude"),
+            )
+        )
+        await self.db.execute(
+            stmt,
+            [
+                {"shipment_id": shipment_id, "latitude": latitude, "longitude": longitude}
+                for shipment_id, latitude, longitude in locations
+            ],
         )
-        result = await self.db.execute(stmt)
-        return result.scalar_one_or_none()
-
-    async def create_shipment(self, shipment: ShipmentCreate, articles: list[ArticleCreate]) -> ShipmentModel:
-        db_shipment = ShipmentModel(
-            tracking_number=shipment.tracking_number,
-            carrier=shipment.carrier,
-            sender_address=shipment.sender_address,
-            receiver_address=shipment.receiver_address,
-            status=shipment.status,
+        await self.db.commit()
+
+    @timed("db.create_shipment")
+    async def create_shipment(self, shipment: ShipmentCreate, articles: list[ArticleCreate]) -> ShipmentModel | None:
+        """Insert a shipment with its articles in one statement; None if the tracking number already exists."""
+        result = await self.db.execute(
+            _CREATE_SHIPMENT,
+            {
+                "tracking_number": shipment.tracking_number,
+                "carrier": shipment.carrier,
+                "sender_address": shipment.sender_address,
+                "receiver_address": shipment.receiver_address,
+                "status": shipment.status.value,
+                "names": [article.name for article in articles],
+                "quantities": [article.quantity for article in articles],
+                "prices": [article.price for article in articles],
+                "skus": [article.sku for article in articles],
+            },
         )
-        self.db.add(db_shipment)
-        await self.db.flush()  # Get the ID without committing
-
-        for article in articles:
-            db_article = ArticleModel(
-                shipment_id=db_shipment.id,
-                name=article.name,
-                quantity=article.quantity,
-                price=article.price,
-                sku=article.sku,
+        rows = result.all()
+        await self.db.commit()
+        if not rows:
+            return None
+        return ShipmentModel(
+            id=rows[0].id,
+            **shipment.model_dump(exclude={"articles"}),
+            articles=[
+                ArticleModel(
+                    id=row.article_id,
+                    shipment_id=row.id,
+                    name=row.name,
+                    quantity=row.quantity,
+                    price=row.price,
+                    sku=row.sku,
+                )
+                for row in rows
+                if row.article_id is not None
+            ],
+        )
+
+    @timed("db.bulk_create")
+    async def bulk_create(self, shipments: Sequence[ShipmentCreate]) -> list[tuple[int, bool]]:
+        """Insert shipments with their articles in a few multi-row statements, skipping known tracking numbers.
+
+        Returns (id, created) for every input shipment, in input order. A tracking number repeated in the
+        input is created once, the repeats count as existing.
+        """
+        if not shipments:
+            return []
+        stmt = (
+            insert(_shipment)
+            .on_conflict_do_nothing(index_elements=[_shipment.c.tracking_number])
+            .returning(_shipment.c.id, _shipment.c.tracking_number)
+        )
+        shipment_rows = [
+            shipment.model_dump(include={"tracking_number", "carrier", "sender_address", "receiver_address", "status"})
+            for shipment in shipments
+        ]
+        result = await self.db.execute(stmt, shipment_rows)
+        created_ids = {tracking_number: shipment_id for shipment_id, tracking_number in result.all()}
+
+        existing_numbers = {shipment.tracking_number for shipment in shipments} - created_ids.keys()
+        existing_ids: dict[str, int] = {}
+        if existing_numbers:
+            result = await self.db.execute(
+                select(_shipment.c.id, _shipment.c.tracking_number).where(
+                    _shipment.c.tracking_number.in_(existing_numbers)
+                )
             )
-            self.db.add(db_article)
+            existing_ids = {tracking_number: shipment_id for shipment_id, tracking_number in result.all()}
+
+        outcome: list[tuple[int, bool]] = []
+        article_rows: list[dict[str, Any]] = []
+        for shipment in shipments:
+            if (shipment_id := created_ids.pop(shipment.tracking_number, None)) is not None:
+                existing_ids[shipment.tracking_number] = shipment_id
+                article_rows.extend(
+                    {"shipment_id": shipment_id, **article.model_dump()} for article in shipment.articles
+                )
+                outcome.append((shipment_id, True))
+            else:
+                outcome.append((existing_ids[shipment.tracking_number], False))
+        if article_rows:
+            await self.db.execute(insert(_article), article_rows)
 
         await self.db.commit()
-        await self.db.refresh(db_shipment)
-        return db_shipment
+        return outcome
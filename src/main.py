@@ -1,19 +1,48 @@
-import os
+import asyncio
 
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.docs import get_swagger_ui_html
 from fastapi.openapi.utils import get_openapi
+from prometheus_client import CONTENT_TYPE_LATEST
 
+from src.api.middleware.metrics import MetricsMiddleware
+from src.api.middleware.profiling import ProfilingMiddleware
+from src.api.middleware.response_cache import ResponseCacheMiddleware
 from src.api.routes import shipments
+from src.config.http import create_http_session
 from src.config.logging import setup_logging
+from src.config.redis import create_redis
+from src.config.settings import settings
+from src.core.metrics import render_latest
+from src.services.shipments_cache import listen_for_invalidations
+from src.services.weather_prefetch import WeatherPrefetcher
 
 
 # Setup logging
 logger = setup_logging()
 logger.info("Starting application...")
 
-API_VERSION = os.getenv("API_VERSION", "0.0.1")
+API_VERSION = settings.api_version
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.http_session = create_http_session()
+    app.state.redis = create_redis()
+    background_tasks = [asyncio.create_task(listen_for_invalidations(app.state.redis))]
+    if settings.weather_prefetch_interval:
+        prefetcher = WeatherPrefetcher(app.state.redis, app.state.http_session)
+        background_tasks.append(asyncio.create_task(prefetcher.run_forever()))
+    yield
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await app.state.http_session.close()
+    await app.state.redis.aclose()
+
 
 app = FastAPI(
     title="Parcellab Track and Trace API",
@@ -22,8 +51,12 @@ app = FastAPI(
     debug=True,  # Enable debug mode
     docs_url=None,  # Disable default docs
     redoc_url=None,  # Disable default redoc
+    lifespan=lifespan,
 )
 
+# Added first so that it runs inside CORS, which then applies to cached responses as well
+app.add_middleware(ResponseCacheMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -33,6 +66,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Not even added unless configured, so unprofiled requests cost nothing
+if settings.profiling_token or settings.profiling_sample_every:
+    app.add_middleware(ProfilingMiddleware)
+
+# Outermost, so request latency includes every other middleware and cache hits
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(shipments.router, prefix="/api/v1", tags=["shipments"])
 
 
@@ -42,6 +82,11 @@ async def root():
     return {"message": "Welcome to Parcellab Track and Trace API"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(render_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.get("/swagger", include_in_schema=False)
 async def custom_swagger_ui_html():
     return get_swagger_ui_html(
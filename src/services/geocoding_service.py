@@ -0,0 +1,138 @@
+import json
+import logging
+import unicodedata
+
+from functools import partial
+from typing import cast
+
+from geopy.adapters import AioHTTPAdapter
+from geopy.exc import GeocoderTimedOut
+from geopy.geocoders import Nominatim
+from pydantic import BaseModel
+from redis.asyncio import Redis
+
+from src.config.settings import settings
+from src.core.circuit_breaker import CircuitBreaker, CircuitOpenError
+from src.core.metrics import UPSTREAM_REQUESTS, timed
+from src.core.singleflight import RedisLease, SingleFlight
+from src.core.ttl_cache import TTLCache
+
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+# In-process front for hot addresses; GEOCODE_LOCAL_CACHE_SIZE=0 disables it.
+_local_cache = TTLCache(
+    "geocode",
+    maxsize=settings.geocode_local_cache_size,
+    ttl=settings.geocode_local_cache_ttl,
+)
+_breaker = CircuitBreaker(
+    "nominatim",
+    failure_rate=settings.upstream_breaker_failure_rate,
+    min_calls=settings.upstream_breaker_min_calls,
+    window=settings.upstream_breaker_window,
+    open_seconds=settings.upstream_breaker_open_seconds,
+)
+
+
+class Coordinates(BaseModel):
+    latitude: float
+    longitude: float
+
+
+_inflight: SingleFlight[Coordinates | None] = SingleFlight("geocode")
+
+
+def normalize_address(address: str) -> str:
+    """Canonical form of an address: case, unicode forms, whitespace and empty comma parts don't matter."""
+    address = unicodedata.normalize("NFKC", address).casefold()
+    parts = (" ".join(part.split()) for part in address.split(","))
+    return ", ".join(part for part in parts if part)
+
+
+class GeocodingService:
+    def __init__(self, redis_client: Redis):
+        self.redis_client = redis_client
+        self.domain = settings.nominatim_domain
+        self.scheme = settings.nominatim_scheme
+        self.cache_ttl = settings.geocode_cache_ttl
+        self.negative_cache_ttl = settings.geocode_negative_cache_ttl
+        self.lease = RedisLease(redis_client, name="geocode", ttl=settings.geocode_lease_ttl)
+
+    @timed("geocode.upstream")
+    async def _geocode(self, address: str) -> Coordinates | None:
+        async with Nominatim(
+            user_agent="peaky blinders",
+            domain=self.domain,
+            scheme=self.scheme,
+            adapter_factory=AioHTTPAdapter,
+        ) as geolocator:
+            try:
+                with _breaker.call():
+                    location = await geolocator.geocode(address)
+            except CircuitOpenError:
+                UPSTREAM_REQUESTS.labels(upstream="nominatim", result="circuit_open").inc()
+                raise
+            except GeocoderTimedOut:
+                UPSTREAM_REQUESTS.labels(upstream="nominatim", result="timeout").inc()
+                raise
+            except Exception:
+                UPSTREAM_REQUESTS.labels(upstream="nominatim", result="error").inc()
+                raise
+            UPSTREAM_REQUESTS.labels(upstream="nominatim", result="ok").inc()
+            if not location:
+                return None
+            return Coordinates(latitude=location.latitude, longitude=location.longitude)
+
+    async def _read_cache(self, cache_key: str) -> tuple[bool, Coordinates | None]:
+        """Return (found, coordinates); a found None is a cached "address can't be resolved"."""
+        try:
+            cached = await self.redis_client.get(cache_key)
+        except Exception as e:
+            logger.error("Failed to read geocode cache: %s", str(e))
+            return False, None
+        if cached is None:
+            return False, None
+        data = json.loads(cached)
+        return True, Coordinates(**data) if data else None
+
+    async def _write_cache(self, cache_key: str, coordinates: Coordinates | None) -> None:
+        ttl = self.cache_ttl if coordinates else self.negative_cache_ttl
+        value = coordinates.model_dump_json() if coordinates else json.dumps(None)
+        try:
+            await self.redis_client.setex(cache_key, ttl, value)
+        except Exception as e:
+            logger.error("Failed to cache geocode result: %s", str(e))
+
+    @timed("geocode")
+    async def get_coordinates(self, address: str) -> Coordinates | None:
+        """Coordinates of an address, None if it can't be resolved. Both outcomes are cached."""
+        cache_key = f"geocode:{normalize_address(address)}"
+
+        local = _local_cache.get(cache_key, _MISSING)
+        if local is not _MISSING:
+            return cast(Coordinates | None, local)
+
+        coordinates = await _inflight.do(cache_key, partial(self._resolve, address, cache_key))
+
+        ttl = None if coordinates else min(self.negative_cache_ttl, _local_cache.ttl)
+        _local_cache.set(cache_key, coordinates, ttl=ttl)
+        return coordinates
+
+    async def _resolve(self, address: str, cache_key: str) -> Coordinates | None:
+        found, coordinates = await self._read_cache(cache_key)
+        if found:
+            return coordinates
+        return await self.lease.run(
+            cache_key,
+            fetch=partial(self._geocode_and_cache, address, cache_key),
+            poll=partial(self._read_cache, cache_key),
+        )
+
+    async def _geocode_and_cache(self, address: str, cache_key: str) -> Coordinates | None:
+        logger.info("No cached coordinates for %s, geocoding", cache_key)
+        coordinates = await self._geocode(address)
+        await self._write_cache(cache_key, coordinates)
+        return coordinates
@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import time
+
+from dataclasses import dataclass
+from typing import Callable
+
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.schemas.shipment import StoredShipment
+from src.db.session import async_session
+from src.db.shipments_repo import ShipmentsRepo
+from src.services.geocoding_service import Coordinates, GeocodingService
+from src.services.shipments_cache import invalidate_shipment
+
+
+logger = logging.getLogger(__name__)
+
+# Shipments being located after creation, referenced until done.
+_locating: set[asyncio.Task] = set()
+
+
+def stored_coordinates(shipment: StoredShipment) -> Coordinates | None:
+    if shipment.receiver_latitude is None or shipment.receiver_longitude is None:
+        return None
+    return Coordinates(latitude=shipment.receiver_latitude, longitude=shipment.receiver_longitude)
+
+
+async def _locate(geocoder: GeocodingService, shipment_id: int, address: str) -> tuple[int, float, float] | None:
+    coordinates = await geocoder.get_coordinates(address)
+    if coordinates is None:
+        return None
+    return shipment_id, coordinates.latitude, coordinates.longitude
+
+
+async def locate_shipment(repo: ShipmentsRepo, geocoder: GeocodingService, shipment_id: int, address: str) -> bool:
+    """Geocode a shipment's receiver address and store the coordinates; False if it can't be geocoded."""
+    location = await _locate(geocoder, shipment_id, address)
+    if location:
+        await repo.set_receiver_locations([location])
+    return location is not None
+
+
+def locate_in_background(redis_client: Redis, shipment_id: int, tracking_number: str, address: str) -> None:
+    """Locate a newly created shipment after the response is sent, in a session of its own.
+
+    Once the coordinates are stored, cached copies of the shipment without them are dropped.
+    """
+
+    async def run() -> None:
+        try:
+            async with async_session() as db:
+                located = await locate_shipment(ShipmentsRepo(db), GeocodingService(redis_client), shipment_id, address)
+            if located:
+                await invalidate_shipment(redis_client, tracking_number)
+        except Exception as e:
+            logger.error("Failed to locate shipment %d: %s", shipment_id, str(e))
+
+    task = asyncio.create_task(run())
+    _locating.add(task)
+    task.add_done_callback(_locating.discard)
+
+
+@dataclass
+class BackfillResult:
+    shipments: int
+    located: int
+    seconds: float
+
+
+async def backfill_locations(
+    session_factory: Callable[[], AsyncSession],
+    redis_client: Redis,
+    batch_size: int = 1000,
+    concurrency: int = 10,
+) -> BackfillResult:
+    """Locate every shipment without receiver coordinates, a batch at a time with one transaction per batch.
+
+    Addresses that can't be geocoded are skipped and stay without coordinates; reads geocode them as before.
+    """
+    geocoder = GeocodingService(redis_client)
+    limit = asyncio.Semaphore(concurrency)
+    shipments = located = 0
+    started = time.perf_counter()
+
+    async def locate(shipment_id: int, address: str) -> tuple[int, float, float] | None:
+        async with limit:
+            try:
+                return await _locate(geocoder, shipment_id, address)
+            except Exception as e:
+                logger.error("Failed to locate shipment %d: %s", shipment_id, str(e))
+                return None
+
+    after_id = 0
+    async with session_factory() as db:
+        repo = ShipmentsRepo(db)
+        while batch := await repo.fetch_unlocated(batch_size, after_id=after_id):
+            locations = [
+                location for location in await asyncio.gather(*(locate(*shipment) for shipment in batch)) if location
+            ]
+            await repo.set_receiver_locations(locations)
+            shipments += len(batch)
+            located += len(locations)
+            after_id = batch[-1][0]
+            logger.info("Located %d of %d shipments", located, shipments)
+    return BackfillResult(shipments=shipments, located=located, seconds=time.perf_counter() - started)
@@ -0,0 +1,67 @@
+import asyncio
+import logging
+
+from redis.asyncio import Redis
+
+from src.api.schemas.shipment import StoredShipment
+from src.config.settings import settings
+from src.core.ttl_cache import TTLCache
+from src.db.shipments_repo import ShipmentsRepo
+
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "shipments:invalidate"
+
+# In-process tier in front of ShipmentsRepo.get_one_by_tracking; SHIPMENT_LOCAL_CACHE_SIZE=0 disables it.
+_local_cache = TTLCache(
+    "shipments",
+    maxsize=settings.shipment_local_cache_size,
+    ttl=settings.shipment_local_cache_ttl,
+    max_bytes=settings.shipment_local_cache_max_bytes,
+)
+
+
+async def get_shipment(repo: ShipmentsRepo, tracking_number: str, carrier: str | None = None) -> StoredShipment | None:
+    """The shipment with this tracking number, or None; with `carrier`, only if it's that carrier's shipment."""
+    shipment: StoredShipment | None = _local_cache.get(tracking_number)
+    if shipment is None:
+        if carrier:
+            db_shipment = await repo.find_one_by_params(tracking_number=tracking_number, carrier=carrier)
+        else:
+            db_shipment = await repo.get_one_by_tracking(tracking_number=tracking_number)
+        if not db_shipment:
+            return None
+        shipment = StoredShipment.model_validate(db_shipment)
+        _local_cache.set(tracking_number, shipment, size=len(shipment.model_dump_json()))
+    if carrier and shipment.carrier != carrier:
+        return None
+    return shipment
+
+
+async def invalidate_shipment(redis_client: Redis, tracking_number: str) -> None:
+    """Drop a created or changed shipment here and, through Redis pub/sub, in every other worker."""
+    _local_cache.delete(tracking_number)
+    try:
+        await redis_client.publish(INVALIDATION_CHANNEL, tracking_number)
+    except Exception as e:
+        logger.error("Failed to publish shipment invalidation: %s", str(e))
+
+
+async def listen_for_invalidations(redis_client: Redis) -> None:
+    """Apply invalidations published by other workers. Runs for the lifetime of the app."""
+    while True:
+        try:
+            async with redis_client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                while True:
+                    message = await pubsub.get_message(timeout=1.0)
+                    if message:
+                        _local_cache.delete(message["data"].decode())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Invalidations may have been missed while disconnected.
+            logger.error("Shipment invalidation listener failed, resubscribing: %s", str(e))
+            _local_cache.clear()
+            await asyncio.sleep(1)
@@ -0,0 +1,78 @@
+import csv
+import io
+
+from enum import StrEnum
+from typing import AsyncIterator, Sequence
+
+from src.api.schemas.shipment import Shipment
+from src.config.settings import settings
+from src.db.enums import ShipmentStatus
+from src.db.shipments_repo import ShipmentRecord, ShipmentsRepo
+
+
+EXPORT_BATCH_SIZE = settings.shipment_export_batch_size
+
+CSV_COLUMNS = (
+    "id",
+    "tracking_number",
+    "carrier",
+    "sender_address",
+    "receiver_address",
+    "status",
+    "article_id",
+    "article_name",
+    "article_quantity",
+    "article_price",
+    "article_sku",
+)
+
+
+class ExportFormat(StrEnum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+    @property
+    def media_type(self) -> str:
+        return "application/x-ndjson" if self is ExportFormat.ndjson else "text/csv"
+
+
+def _ndjson_chunk(batch: Sequence[ShipmentRecord]) -> str:
+    return "".join(Shipment.model_validate(record).model_dump_json() + "\n" for record in batch)
+
+
+def _csv_chunk(batch: Sequence[ShipmentRecord], header: bool = False) -> str:
+    """One row per article, shipment columns repeated; a shipment without articles is a single row."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(CSV_COLUMNS)
+    for record in batch:
+        shipment = (
+            record.id,
+            record.tracking_number,
+            record.carrier,
+            record.sender_address,
+            record.receiver_address,
+            record.status,
+        )
+        if not record.articles:
+            writer.writerow(shipment)
+        for article in record.articles:
+            writer.writerow(
+                (*shipment, article["id"], article["name"], article["quantity"], article["price"], article["sku"])
+            )
+    return buffer.getvalue()
+
+
+async def export_shipments(
+    repo: ShipmentsRepo,
+    export_format: ExportFormat,
+    carrier: str | None = None,
+    status: ShipmentStatus | None = None,
+) -> AsyncIterator[str]:
+    """Serialized shipments with their articles, one chunk per database batch."""
+    if export_format is ExportFormat.csv:
+        # The header goes out even if nothing matches.
+        yield _csv_chunk((), header=True)
+    async for batch in repo.stream(EXPORT_BATCH_SIZE, carrier=carrier, status=status):
+        yield _ndjson_chunk(batch) if export_format is ExportFormat.ndjson else _csv_chunk(batch)
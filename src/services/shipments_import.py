@@ -0,0 +1,181 @@
+import csv
+import itertools
+import logging
+import time
+
+from typing import Iterable, Iterator, cast
+
+import asyncpg
+
+from pydantic import BaseModel
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.config.settings import settings
+from src.db.enums import ShipmentStatus
+
+
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH_ROWS = settings.shipment_import_batch_rows
+
+CSV_HEADER = (
+    "tracking_number",
+    "carrier",
+    "sender_address",
+    "receiver_address",
+    "article_name",
+    "article_quantity",
+    "article_price",
+    "SKU",
+    "status",
+)
+
+# Rows are staged per shipment group: `position` is the group's index in the file.
+_CREATE_STAGING = (
+    """
+    CREATE TEMPORARY TABLE import_shipment (
+        position bigint, tracking_number text, carrier text, sender_address text, receiver_address text, status text
+    ) ON COMMIT DROP
+    """,
+    """
+    CREATE TEMPORARY TABLE import_article (
+        position bigint, name text, quantity integer, price double precision, sku text
+    ) ON COMMIT DROP
+    """,
+)
+
+# First group of a tracking number wins; later groups and tracking numbers already in the table are skipped.
+_MERGE = text(
+    """
+    WITH first_groups AS (
+        SELECT DISTINCT ON (tracking_number) *
+        FROM import_shipment
+        ORDER BY tracking_number, position
+    ),
+    new_shipments AS (
+        INSERT INTO shipment (tracking_number, carrier, sender_address, receiver_address, status)
+        SELECT tracking_number, carrier, sender_address, receiver_address, CAST(status AS shipmentstatus)
+        FROM first_groups
+        ORDER BY position
+        ON CONFLICT (tracking_number) DO NOTHING
+        RETURNING id, tracking_number
+    ),
+    new_articles AS (
+        INSERT INTO article (shipment_id, name, quantity, price, sku)
+        SELECT new_shipments.id, import_article.name, import_article.quantity, import_article.price, import_article.sku
+        FROM new_shipments
+        JOIN first_groups USING (tracking_number)
+        JOIN import_article USING (position)
+        RETURNING 1
+    )
+    SELECT (SELECT count(*) FROM new_shipments), (SELECT count(*) FROM new_articles)
+    """
+)
+
+_STATUSES = {status.value: status for status in ShipmentStatus}
+
+
+class ShipmentImportError(ValueError):
+    def __init__(self, line: int, message: str):
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+
+
+class ImportResult(BaseModel):
+    rows: int
+    shipments: int
+    shipments_created: int
+    articles_created: int
+    rows_per_second: float
+
+
+def parse_status(value: str) -> ShipmentStatus:
+    """Carrier feeds spell statuses like `inbound-scan` or `In_Transit`."""
+    status = _STATUSES.get(value) or _STATUSES.get(value.strip().casefold().replace("-", "_").replace(" ", "_"))
+    if status is None:
+        raise ValueError(f"unknown status {value!r}")
+    return status
+
+
+def read_groups(lines: Iterable[str]) -> Iterator[tuple[int, list[list[str]]]]:
+    """Consecutive rows with the same tracking number, with the line number of the group's first row."""
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    if tuple(column.strip() for column in header) != CSV_HEADER:
+        raise ShipmentImportError(1, f"expected header {','.join(CSV_HEADER)}")
+    numbered = ((line, row) for line, row in zip(itertools.count(2), reader) if row)
+    for _, group in itertools.groupby(numbered, key=lambda numbered_row: numbered_row[1][0]):
+        rows = list(group)
+        yield rows[0][0], [row for _, row in rows]
+
+
+def _stage_group(
+    position: int,
+    line: int,
+    rows: list[list[str]],
+    shipments: list[tuple],
+    articles: list[tuple],
+) -> None:
+    for offset, row in enumerate(rows):
+        if len(row) != len(CSV_HEADER):
+            raise ShipmentImportError(line + offset, f"expected {len(CSV_HEADER)} columns, got {len(row)}")
+    tracking_number, carrier, sender_address, receiver_address, *_, status = rows[0]
+    for offset, row in enumerate(rows):
+        if row[1:4] != rows[0][1:4] or row[8] != status:
+            raise ShipmentImportError(line + offset, f"shipment columns differ within {tracking_number}")
+        try:
+            articles.append((position, row[4], int(row[5]), float(row[6]), row[7]))
+        except ValueError as err:
+            raise ShipmentImportError(line + offset, str(err)) from err
+    try:
+        shipment_status = parse_status(status).value
+    except ValueError as err:
+        raise ShipmentImportError(line, str(err)) from err
+    shipments.append((position, tracking_number, carrier, sender_address, receiver_address, shipment_status))
+
+
+async def import_shipments(conn: AsyncConnection, lines: Iterable[str]) -> ImportResult:
+    """Import the carrier CSV format (one row per article) in the connection's current transaction.
+
+    Rows are grouped into shipments as they are read and COPYed into temporary staging tables in batches of
+    IMPORT_BATCH_ROWS, so memory doesn't depend on the file size. A single INSERT ... SELECT then merges them.
+    Nothing is written if any row is invalid.
+    """
+    started = time.perf_counter()
+    driver_conn = cast(asyncpg.Connection, (await conn.get_raw_connection()).driver_connection)
+    for statement in _CREATE_STAGING:
+        await conn.execute(text(statement))
+
+    shipments: list[tuple] = []
+    articles: list[tuple] = []
+    rows = groups = 0
+
+    async def flush() -> None:
+        await driver_conn.copy_records_to_table("import_shipment", records=shipments)
+        await driver_conn.copy_records_to_table("import_article", records=articles)
+        shipments.clear()
+        articles.clear()
+
+    for position, (line, group) in enumerate(read_groups(lines)):
+        _stage_group(position, line, group, shipments, articles)
+        rows += len(group)
+        groups += 1
+        if len(articles) >= IMPORT_BATCH_ROWS:
+            await flush()
+    await flush()
+
+    await conn.execute(text("ANALYZE import_shipment, import_article"))
+    shipments_created, articles_created = (await conn.execute(_MERGE)).one()
+    elapsed = time.perf_counter() - started
+    result = ImportResult(
+        rows=rows,
+        shipments=groups,
+        shipments_created=shipments_created,
+        articles_created=articles_created,
+        rows_per_second=rows / elapsed if elapsed else 0.0,
+    )
+    logger.info("Imported %s", result)
+    return result
@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import time
+import uuid
+
+from dataclasses import dataclass
+from typing import Callable
+
+import aiohttp
+
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config.settings import settings
+from src.core.metrics import (
+    WEATHER_PREFETCH_DUE,
+    WEATHER_PREFETCH_LAG_SECONDS,
+    WEATHER_PREFETCH_LOCATIONS,
+    WEATHER_PREFETCH_REFRESHES,
+)
+from src.db.session import read_session
+from src.db.shipments_repo import ShipmentsRepo
+from src.services.geocoding_service import Coordinates
+from src.services.weather_service import CacheMode, WeatherService, take_views
+
+
+logger = logging.getLogger(__name__)
+
+# Lookups per weather cache key from all workers, halved every prefetch run so that recent views weigh most.
+VIEWS_KEY = "weather:prefetch:views"
+# One worker at a time scans and refreshes; the others only report their views.
+LEADER_KEY = "weather:prefetch:leader"
+# What Redis TTL returns for a missing key.
+_NO_SUCH_KEY = -2
+
+
+@dataclass
+class DueEntry:
+    cache_key: str
+    coordinates: Coordinates
+    # When the entry should have been refreshed; None if it has expired already.
+    due_at: float | None
+
+
+@dataclass
+class PrefetchResult:
+    locations: int
+    due: int
+    refreshed: int
+
+
+class WeatherPrefetcher:
+    """Keeps the weather at active shipments' destinations cached, so that viewers don't wait for the upstream.
+
+    Every `interval` seconds the leading worker collects the distinct weather cache keys of located shipments in
+    a non-terminal status and refreshes the entries that expire within `refresh_ahead` seconds, or have expired,
+    most viewed first. Upstream calls are limited to `rate` per second, in batches of `batch_size`; whatever
+    doesn't fit in an interval waits for the next run.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        redis_client: Redis,
+        http_session: aiohttp.ClientSession,
+        session_factory: Callable[[], AsyncSession] = read_session,
+        interval: float = settings.weather_prefetch_interval,
+        refresh_ahead: float = settings.weather_prefetch_refresh_ahead,
+        rate: float = settings.weather_prefetch_rate,
+        batch_size: int = settings.weather_prefetch_batch_size,
+    ):
+        self.redis_client = redis_client
+        self.weather = WeatherService(redis_client, http_session)
+        self.session_factory = session_factory
+        self.interval = interval
+        self.refresh_ahead = refresh_ahead
+        self.rate = rate
+        self.batch_size = batch_size
+        self.worker_id = uuid.uuid4().hex
+
+    async def run_forever(self) -> None:
+        while True:
+            try:
+                await self.report_views()
+                if await self._lead():
+                    await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Weather prefetch failed: %s", str(e))
+            await asyncio.sleep(self.interval)
+
+    async def _lead(self) -> bool:
+        ttl = max(1, round(2 * self.interval))
+        if await self.redis_client.set(LEADER_KEY, self.worker_id, nx=True, ex=ttl):
+            return True
+        if await self.redis_client.get(LEADER_KEY) == self.worker_id.encode():
+            await self.redis_client.expire(LEADER_KEY, ttl)
+            return True
+        return False
+
+    async def report_views(self) -> None:
+        if views := take_views():
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for cache_key, count in views.items():
+                    pipe.zincrby(VIEWS_KEY, count, cache_key)
+                await pipe.execute()
+
+    async def run_once(self) -> PrefetchResult:
+        deadline = time.monotonic() + self.interval
+        locations = await self._active_locations()
+        WEATHER_PREFETCH_LOCATIONS.set(len(locations))
+
+        due = await self._due_entries(locations)
+        if due:
+            views = await self.redis_client.zmscore(VIEWS_KEY, [entry.cache_key for entry in due])
+            order = {entry.cache_key: -(score or 0) for entry, score in zip(due, views, strict=True)}
+            due.sort(key=lambda entry: order[entry.cache_key])
+        await self.redis_client.zunionstore(VIEWS_KEY, {VIEWS_KEY: 0.5})
+
+        refreshed = 0
+        for start in range(0, len(due), self.batch_size):
+            if self.interval and time.monotonic() >= deadline:
+                break
+            started = time.monotonic()
+            batch = due[start : start + self.batch_size]
+            refreshed += sum(await asyncio.gather(*(self._refresh(entry) for entry in batch)))
+            WEATHER_PREFETCH_DUE.set(len(due) - start - len(batch))
+            await asyncio.sleep(max(0.0, len(batch) / self.rate - (time.monotonic() - started)))
+        else:
+            WEATHER_PREFETCH_DUE.set(0)
+
+        logger.info("Weather prefetch: %d locations, %d due, %d refreshed", len(locations), len(due), refreshed)
+        return PrefetchResult(locations=len(locations), due=len(due), refreshed=refreshed)
+
+    async def _active_locations(self) -> dict[str, Coordinates]:
+        locations: dict[str, Coordinates] = {}
+        async with self.session_factory() as db:
+            async for batch in ShipmentsRepo(db).stream_active_locations(batch_size=10000):
+                for address, latitude, longitude in batch:
+                    coordinates = Coordinates(latitude=latitude, longitude=longitude)
+                    locations.setdefault(self.weather.cache_key_for(address, coordinates), coordinates)
+        return locations
+
+    async def _due_entries(self, locations: dict[str, Coordinates]) -> list[DueEntry]:
+        """Entries expiring within refresh_ahead, judged by their remaining TTL in Redis."""
+        weather = self.weather
+        # Entries are written with this TTL and go stale cache_ttl after they were written.
+        written_ttl = weather.cache_hard_ttl if weather.cache_mode == CacheMode.swr else weather.cache_ttl
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for cache_key in locations:
+                pipe.ttl(cache_key)
+            remaining_ttls = await pipe.execute()
+
+        now = time.time()
+        due = []
+        for (cache_key, coordinates), remaining in zip(locations.items(), remaining_ttls, strict=True):
+            if remaining == _NO_SUCH_KEY:
+                due.append(DueEntry(cache_key, coordinates, due_at=None))
+            elif remaining >= 0:
+                stale_at = now + remaining - (written_ttl - weather.cache_ttl)
+                if stale_at - now <= self.refresh_ahead:
+                    due.append(DueEntry(cache_key, coordinates, due_at=stale_at - self.refresh_ahead))
+        return due
+
+    async def _refresh(self, entry: DueEntry) -> bool:
+        try:
+            weather = await self.weather.refresh(entry.cache_key, entry.coordinates)
+        except Exception as e:
+            logger.error("Failed to prefetch weather for %s: %s", entry.cache_key, str(e))
+            weather = None
+        state = "expired" if entry.due_at is None else "cached"
+        WEATHER_PREFETCH_REFRESHES.labels(entry=state, result="success" if weather else "failure").inc()
+        if weather and entry.due_at is not None:
+            WEATHER_PREFETCH_LAG_SECONDS.observe(max(0.0, time.time() - entry.due_at))
+        return weather is not None
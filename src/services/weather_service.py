@@ -1,94 +1,291 @@
+import asyncio
 import json
 import logging
-import os
+import re
+import time
 
+from collections import Counter
+from functools import partial
 from typing import Any
 
-import requests
+import aiohttp
 
-from geopy.adapters import AioHTTPAdapter
-from geopy.geocoders import Nominatim
-from pydantic import BaseModel
-from redis import Redis
+from redis.asyncio import Redis
+
+from src.config.settings import CacheKeyStrategy, CacheMode, settings
+from src.core import geohash
+from src.core.circuit_breaker import CircuitBreaker, CircuitOpenError
+from src.core.metrics import (
+    UPSTREAM_REQUESTS,
+    WEATHER_BACKGROUND_REFRESHES,
+    WEATHER_CACHE_REQUESTS,
+    WEATHER_FALLBACKS,
+    timed,
+)
+from src.core.singleflight import RedisLease, SingleFlight
+from src.core.ttl_cache import TTLCache
+from src.services.geocoding_service import Coordinates, GeocodingService
 
 
 logger = logging.getLogger(__name__)
 
+_inflight: SingleFlight[dict[str, Any] | None] = SingleFlight("weather")
+# Background refreshes of stale entries by cache key, also keeps the tasks referenced until they finish.
+_refreshing: dict[str, asyncio.Task] = {}
+# In-process tier in front of the Redis weather cache; WEATHER_LOCAL_CACHE_SIZE=0 disables it.
+_local_cache = TTLCache(
+    "weather",
+    maxsize=settings.weather_local_cache_size,
+    ttl=settings.weather_local_cache_ttl,
+    max_bytes=settings.weather_local_cache_max_bytes,
+)
+_breaker = CircuitBreaker(
+    "openweathermap",
+    failure_rate=settings.upstream_breaker_failure_rate,
+    min_calls=settings.upstream_breaker_min_calls,
+    window=settings.upstream_breaker_window,
+    open_seconds=settings.upstream_breaker_open_seconds,
+)
+# Last fetched weather per cache key, kept for weather_last_known_ttl to answer when the upstream can't in time.
+LAST_KNOWN_PREFIX = "weather:last:"
+# Lookups per cache key since the prefetcher last took them, only counted while it runs.
+_views: Counter[str] = Counter()
+
 
-class Coordinates(BaseModel):
-    latitude: float
-    longitude: float
+def take_views() -> Counter[str]:
+    """Lookups per cache key in this process since the last call."""
+    global _views
+    views, _views = _views, Counter()
+    return views
 
 
 class WeatherService:
-    def __init__(self, redis_client: Redis):
+    def __init__(self, redis_client: Redis, http_session: aiohttp.ClientSession):
         self.redis_client = redis_client
-        self.api_key = os.getenv("OPENWEATHERMAP_API_KEY")
-        self.base_url = "https://api.openweathermap.org/data/2.5/weather"
-        self.cache_ttl = 7200  # 2 hours in seconds
-        logger.info("WeatherService initialized with cache TTL: %d seconds", self.cache_ttl)
+        self.http_session = http_session
+        self.api_key = settings.openweathermap_api_key
+        self.base_url = settings.openweathermap_url
+        self.geocoder = GeocodingService(redis_client)
+        self.cache_ttl = settings.weather_cache_ttl
+        self.cache_mode = settings.weather_cache_mode
+        # swr only: entries older than cache_ttl are served stale until they are this old
+        self.cache_hard_ttl = settings.weather_cache_hard_ttl
+        self.cache_key_strategy = settings.weather_cache_key_strategy
+        self.geohash_precision = settings.weather_cache_geohash_precision
+        self.lease = RedisLease(redis_client, name="weather", ttl=settings.weather_lease_ttl)
+        logger.debug("WeatherService initialized with cache TTL: %d seconds", self.cache_ttl)
 
     def _get_zip_code(self, address: str) -> str | None:
         # Simple implementation - in a real application, you would use a proper geocoding service
-        # This is just a placeholder that extracts the first number sequence that looks like a zip code
-        import re
-
-        match = re.search(r"\b\d{5}\b", address)
-        return match.group(0) if match else None
+        # This is just a placeholder that extracts the first 4-5 digit number after the street part
+        parts = address.split(",")
+        for part in parts[1:] or parts:
+            if match := re.search(r"\b\d{4,5}\b", part):
+                return match.group(0)
+        return None
 
     def _get_country_code(self, address: str) -> str | None:
         # Simple implementation - in a real application, you would use a proper geocoding service
-        # This is just a placeholder that extracts the last word as country
-        country = address.split(",")[-1].strip()
-        return country
+        # This is just a placeholder that extracts the last comma-separated part as country
+        parts = address.split(",")
+        if len(parts) < 2:  # noqa: PLR2004
+            return None
+        return " ".join(parts[-1].split()).casefold() or None
+
+    def _get_address_cache_key(self, address: str) -> str | None:
+        """Cache key derived from the address alone, so a hit needs no geocoding."""
+        if self.cache_key_strategy != CacheKeyStrategy.zip:
+            return None
+        zip_code, country = self._get_zip_code(address), self._get_country_code(address)
+        if not zip_code or not country:
+            return None
+        return f"weather:zip:{country}:{zip_code}"
+
+    def _get_coordinates_cache_key(self, coordinates: Coordinates) -> str:
+        if self.cache_key_strategy == CacheKeyStrategy.coordinates:
+            return f"weather_lat_lon:{coordinates.latitude}:{coordinates.longitude}"
+        cell = geohash.encode(coordinates.latitude, coordinates.longitude, self.geohash_precision)
+        return f"weather:geohash:{cell}"
+
+    def cache_key_for(self, address: str, coordinates: Coordinates) -> str:
+        """The cache key get_weather uses for an address with these coordinates."""
+        return self._get_address_cache_key(address) or self._get_coordinates_cache_key(coordinates)
+
+    def _cache_locally(self, cache_key: str, entry: dict[str, Any], size: int) -> None:
+        # Never keep an entry locally past the point Redis would drop it.
+        max_age = self.cache_hard_ttl if self.cache_mode == CacheMode.swr else self.cache_ttl
+        ttl = min(_local_cache.ttl, max_age - (time.time() - entry["fetched_at"]))
+        if ttl > 0:
+            _local_cache.set(cache_key, entry, ttl=ttl, size=size)
+
+    @timed("weather.cache_read")
+    async def _read_cached_weather(self, cache_key: str, use_local: bool = True) -> tuple[dict[str, Any] | None, bool]:
+        """Return (weather, is_stale); an entry is only ever stale in swr mode."""
+        entry = _local_cache.get(cache_key) if use_local else None
+        if entry is None:
+            cached_weather = await self.redis_client.get(cache_key)
+            if not cached_weather:
+                return None, False
+            entry = json.loads(cached_weather)
+            if "fetched_at" not in entry:  # cached before entries recorded their fetch time
+                entry = {"fetched_at": time.time(), "weather": entry}
+            self._cache_locally(cache_key, entry, size=len(cached_weather))
+        is_stale = self.cache_mode == CacheMode.swr and time.time() - entry["fetched_at"] >= self.cache_ttl
+        return entry["weather"], is_stale
+
+    async def _get_cached_weather(
+        self, cache_key: str, key_kind: str, address: str, coordinates: Coordinates | None = None
+    ) -> dict[str, Any] | None:
+        if settings.weather_prefetch_interval:
+            _views[cache_key] += 1
+        try:
+            weather, is_stale = await self._read_cached_weather(cache_key)
+        except Exception:
+            WEATHER_CACHE_REQUESTS.labels(key_kind=key_kind, result="error").inc()
+            raise
+        if weather is None:
+            WEATHER_CACHE_REQUESTS.labels(key_kind=key_kind, result="miss").inc()
+            return None
+        if is_stale:
+            WEATHER_CACHE_REQUESTS.labels(key_kind=key_kind, result="stale").inc()
+            logger.debug("Serving stale weather data for %s", cache_key)
+            self._schedule_refresh(cache_key, address, coordinates)
+        else:
+            WEATHER_CACHE_REQUESTS.labels(key_kind=key_kind, result="hit").inc()
+            logger.debug("Found cached weather data for %s", cache_key)
+        return weather
+
+    def _schedule_refresh(self, cache_key: str, address: str, coordinates: Coordinates | None) -> None:
+        if cache_key in _refreshing:
+            return
+        _refreshing[cache_key] = asyncio.create_task(self._refresh(cache_key, address, coordinates))
+        _refreshing[cache_key].add_done_callback(lambda _: _refreshing.pop(cache_key, None))
+
+    async def _refresh(self, cache_key: str, address: str, coordinates: Coordinates | None) -> None:
+        weather = None
+        try:
+            if coordinates := coordinates or await self._get_coordinates(address):
+                weather = await _inflight.do(cache_key, partial(self._load_weather, cache_key, coordinates))
+        except Exception as e:
+            logger.error("Failed to refresh weather data for %s: %s", cache_key, str(e))
+        WEATHER_BACKGROUND_REFRESHES.labels(result="success" if weather else "failure").inc()
 
     async def _get_coordinates(self, address: str) -> Coordinates | None:
-        # Warning: makes additional http-call, maybe address should be a cache key.
-        async with Nominatim(
-            user_agent="peaky blinders",
-            adapter_factory=AioHTTPAdapter,
-        ) as geolocator:
-            location = await geolocator.geocode(address)
-            if not location:
-                return None
-            return Coordinates(latitude=location.latitude, longitude=location.longitude)
+        return await self.geocoder.get_coordinates(address)
 
+    @timed("weather.upstream")
     async def _get_openweathermap(self, coordinates: Coordinates) -> dict[str, Any] | None:
-        params = dict(lat=coordinates.latitude, lon=coordinates.longitude, appid=self.api_key)
+        params = dict(lat=coordinates.latitude, lon=coordinates.longitude, appid=self.api_key or "")
         try:
-            logger.info("Making request to OpenWeatherMap API")
-            response = requests.get(self.base_url, params=params)
-            response.raise_for_status()
-            weather_data = response.json()
-            logger.info(
-                "Successfully retrieved weather data for %s", f"{coordinates.latitude} : {coordinates.longitude}"
-            )
-        except requests.exceptions.RequestException as e:
+            logger.debug("Making request to OpenWeatherMap API")
+            with _breaker.call():
+                async with self.http_session.get(self.base_url, params=params) as response:
+                    weather_data: dict[str, Any] = await response.json()
+            logger.debug("Successfully retrieved weather data for %s : %s", coordinates.latitude, coordinates.longitude)
+        except CircuitOpenError:
+            UPSTREAM_REQUESTS.labels(upstream="openweathermap", result="circuit_open").inc()
+            return None
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            result = "timeout" if isinstance(e, asyncio.TimeoutError) else "error"
+            UPSTREAM_REQUESTS.labels(upstream="openweathermap", result=result).inc()
             logger.error("Failed to get weather data: %s", str(e))
             return None
+        UPSTREAM_REQUESTS.labels(upstream="openweathermap", result="ok").inc()
         return weather_data
 
-    async def get_weather(self, address: str) -> dict[str, Any] | None:
-        logger.info("Getting weather for address: %s", address)
+    @timed("weather")
+    async def get_weather(self, address: str, coordinates: Coordinates | None = None) -> dict[str, Any] | None:
+        """Weather at an address; pass its `coordinates` if they are known, to skip geocoding it."""
+        logger.debug("Getting weather for address: %s", address)
+
+        cache_key = self._get_address_cache_key(address)
+        if cache_key and (cached_weather := await self._get_cached_weather(cache_key, "zip", address, coordinates)):
+            return cached_weather
 
-        coordinates = await self._get_coordinates(address)
+        coordinates = coordinates or await self._get_coordinates(address)
         if not coordinates:
             return None
-        cache_key = f"weather_lat_lon:{coordinates.latitude}:{coordinates.longitude}"
-        cached_weather = self.redis_client.get(cache_key)
-        if cached_weather:
-            logger.info("Found cached weather data for %s", cache_key)
-            return json.loads(cached_weather)
+        if not cache_key:
+            cache_key = self._get_coordinates_cache_key(coordinates)
+            key_kind = "coordinates" if self.cache_key_strategy == CacheKeyStrategy.coordinates else "geohash"
+            if cached_weather := await self._get_cached_weather(cache_key, key_kind, address, coordinates):
+                return cached_weather
+
+        return await _inflight.do(cache_key, partial(self._load_weather, cache_key, coordinates))
+
+    async def get_weather_within(
+        self, budget: float, address: str, coordinates: Coordinates | None = None
+    ) -> tuple[bool, dict[str, Any] | None]:
+        """Return (is_fallback, weather): get_weather, giving up after `budget` seconds; then or on failure
+        the last known weather, if any, or None.
+
+        A lookup that runs out of budget keeps fetching for whoever is waiting on the same key, so the cache still
+        gets filled for the next request.
+        """
+        try:
+            weather = await asyncio.wait_for(self.get_weather(address, coordinates=coordinates), timeout=budget)
+        except asyncio.TimeoutError:
+            reason = "budget"
+            logger.warning("Weather lookup for %s took longer than %.2fs", address, budget)
+        except Exception as e:
+            reason = "error"
+            logger.error("Failed to get weather data: %s", str(e))
+        else:
+            if weather is not None:
+                return False, weather
+            reason = "unavailable"
+
+        weather = await self._last_known(address, coordinates)
+        WEATHER_FALLBACKS.labels(reason=reason, served="last_known" if weather else "none").inc()
+        return True, weather
+
+    async def _last_known(self, address: str, coordinates: Coordinates | None) -> dict[str, Any] | None:
+        cache_key = self._get_address_cache_key(address)
+        if not cache_key and coordinates:
+            cache_key = self._get_coordinates_cache_key(coordinates)
+        if not cache_key:
+            return None
+        try:
+            last_known = await self.redis_client.get(LAST_KNOWN_PREFIX + cache_key)
+        except Exception as e:
+            logger.error("Failed to read last known weather: %s", str(e))
+            return None
+        return json.loads(last_known)["weather"] if last_known else None
+
+    async def refresh(self, cache_key: str, coordinates: Coordinates) -> dict[str, Any] | None:
+        """Fetch and cache the weather even if a fresh entry is cached, coalesced with concurrent lookups."""
+        return await _inflight.do(cache_key, partial(self._fetch_weather, cache_key, coordinates))
+
+    async def _load_weather(self, cache_key: str, coordinates: Coordinates) -> dict[str, Any] | None:
+        found, weather = await self._poll_cached_weather(cache_key)
+        if found:
+            return weather
+        return await self.lease.run(
+            cache_key,
+            fetch=partial(self._fetch_weather, cache_key, coordinates),
+            poll=partial(self._poll_cached_weather, cache_key),
+        )
+
+    async def _poll_cached_weather(self, cache_key: str) -> tuple[bool, dict[str, Any] | None]:
+        """Fresh entry straight from Redis, another worker may have just written it."""
+        weather, is_stale = await self._read_cached_weather(cache_key, use_local=False)
+        return weather is not None and not is_stale, weather
 
+    async def _fetch_weather(self, cache_key: str, coordinates: Coordinates) -> dict[str, Any] | None:
         logger.info("No cached data found, making API request")
         weather_data = await self._get_openweathermap(coordinates=coordinates)
         if not weather_data:
             return None
 
         # Cache the weather data
+        ttl = self.cache_hard_ttl if self.cache_mode == CacheMode.swr else self.cache_ttl
+        entry = {"fetched_at": time.time(), "weather": weather_data}
+        serialized = json.dumps(entry)
+        self._cache_locally(cache_key, entry, size=len(serialized))
         try:
-            self.redis_client.setex(cache_key, self.cache_ttl, json.dumps(weather_data))
-            logger.info("Cached weather data for %s with TTL %d", cache_key, self.cache_ttl)
+            await self.redis_client.setex(cache_key, ttl, serialized)
+            await self.redis_client.setex(LAST_KNOWN_PREFIX + cache_key, settings.weather_last_known_ttl, serialized)
+            logger.info("Cached weather data for %s with TTL %d", cache_key, ttl)
         except Exception as e:
             logger.error("Failed to cache weather data: %s", str(e))
 
@@ -0,0 +1,107 @@
+import json
+import uuid
+
+from http import HTTPStatus
+
+import pytest
+
+from fastapi import HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from sqlalchemy.orm import selectinload
+from sqlmodel import select
+
+from src.api.routes import shipments as shipments_routes
+from src.api.routes.shipments import bulk_create_shipments
+from src.db.models.shipment import Shipment as ShipmentModel
+
+
+def make_request(body: bytes, content_type: str = "application/json") -> Request:
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    scope = {"type": "http", "method": "POST", "headers": [(b"content-type", content_type.encode())]}
+    return Request(scope, receive)
+
+
+@pytest.fixture
+def bulk_shipments(shipments_stub):
+    """The stub shipments under tracking numbers unique to this test run."""
+    run = uuid.uuid4().hex[:8]
+    return [shipment.model_copy(update={"tracking_number": f"{run}-{i}"}) for i, shipment in enumerate(shipments_stub)]
+
+
+def dump(shipments) -> list[dict]:
+    return [shipment.model_dump(mode="json") for shipment in shipments]
+
+
+@pytest.mark.asyncio
+class TestBulkCreate:
+    async def test_reports_created_and_existing_in_input_order(self, test_db, mock_redis, bulk_shipments):
+        first = await bulk_create_shipments(
+            request=make_request(json.dumps(dump(bulk_shipments[:2])).encode()), db=test_db, redis=mock_redis
+        )
+        assert (first.created, first.existing) == (2, 0)
+        assert first.rows_per_second > 0
+
+        # One existing, one new, and the new one repeated.
+        body = dump([bulk_shipments[1], bulk_shipments[2], bulk_shipments[2]])
+        second = await bulk_create_shipments(
+            request=make_request(json.dumps(body).encode()), db=test_db, redis=mock_redis
+        )
+
+        assert [(result.tracking_number, result.created) for result in second.results] == [
+            (bulk_shipments[1].tracking_number, False),
+            (bulk_shipments[2].tracking_number, True),
+            (bulk_shipments[2].tracking_number, False),
+        ]
+        assert second.results[0].id == first.results[1].id
+        assert second.results[1].id == second.results[2].id
+        assert (second.created, second.existing) == (1, 2)
+
+        saved = await test_db.execute(
+            select(ShipmentModel)
+            .options(selectinload(ShipmentModel.articles))  # type: ignore[arg-type]
+            .where(ShipmentModel.tracking_number == bulk_shipments[2].tracking_number)
+        )
+        assert [article.sku for article in saved.scalar_one().articles] == ["KB012", "MO456"]
+
+    async def test_ndjson_body_in_small_batches(self, test_db, mock_redis, bulk_shipments, monkeypatch):
+        monkeypatch.setattr(shipments_routes, "BULK_BATCH_SIZE", 2)
+        body = "\n".join(json.dumps(shipment) for shipment in dump(bulk_shipments)) + "\n"
+
+        response = await bulk_create_shipments(
+            request=make_request(body.encode(), "application/x-ndjson; charset=utf-8"), db=test_db, redis=mock_redis
+        )
+
+        assert [result.tracking_number for result in response.results] == [
+            shipment.tracking_number for shipment in bulk_shipments
+        ]
+        assert response.created == len(bulk_shipments)
+
+    async def test_invalid_item(self, test_db, mock_redis, bulk_shipments):
+        body = dump(bulk_shipments[:2])
+        del body[1]["receiver_address"]
+
+        with pytest.raises(RequestValidationError) as exc_info:
+            await bulk_create_shipments(request=make_request(json.dumps(body).encode()), db=test_db, redis=mock_redis)
+        assert exc_info.value.errors()[0]["loc"] == (1, "receiver_address")
+
+    async def test_ndjson_errors_locate_lines(self, test_db, mock_redis, bulk_shipments):
+        first, second, third = (json.dumps(shipment) for shipment in dump(bulk_shipments[:3]))
+        body = f"{first}\n\n{second},{third}\n".encode()
+
+        with pytest.raises(RequestValidationError) as exc_info:
+            await bulk_create_shipments(
+                request=make_request(body, "application/x-ndjson"), db=test_db, redis=mock_redis
+            )
+        [error] = exc_info.value.errors()
+        assert (error["loc"], error["type"]) == ((3,), "json_invalid")
+
+    async def test_too_many_items(self, test_db, mock_redis, bulk_shipments, monkeypatch):
+        monkeypatch.setattr(shipments_routes, "BULK_MAX_ITEMS", 2)
+
+        with pytest.raises(HTTPException) as exc_info:
+            await bulk_create_shipments(
+                request=make_request(json.dumps(dump(bulk_shipments)).encode()), db=test_db, redis=mock_redis
+            )
+        assert exc_info.value.status_code == HTTPStatus.REQUEST_ENTITY_TOO_LARGE
@@ -1,6 +1,11 @@
+import asyncio
+
+from http import HTTPStatus
+
 import pytest
 
 from fastapi import Response
+from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlalchemy.orm import selectinload
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
@@ -10,11 +15,11 @@ from src.db.models.shipment import Shipment as ShipmentModel
 
 
 @pytest.mark.asyncio
-async def test_create_shipment(test_db: AsyncSession, shipments_stub):
+async def test_create_shipment(test_db: AsyncSession, mock_redis, shipments_stub):
     """Test creating shipments via the API route with a real database."""
     for shipment in shipments_stub[0:1]:
         result = await create_shipment_route(
-            shipment=shipment, articles=shipment.articles, response=Response(), db=test_db
+            shipment=shipment, articles=shipment.articles, db=test_db, redis=mock_redis
         )
 
         assert result.tracking_number == shipment.tracking_number
@@ -47,3 +52,45 @@ async def test_create_shipment(test_db: AsyncSession, shipments_stub):
         assert saved_shipment.receiver_address == shipment.receiver_address
         assert saved_shipment.status == shipment.status
         assert len(saved_shipment.articles) == len(shipment.articles)
+
+
+@pytest.mark.asyncio
+async def test_create_existing_shipment(test_db: AsyncSession, mock_redis, shipments_stub):
+    shipment = shipments_stub[0]
+    created = await create_shipment_route(shipment=shipment, articles=shipment.articles, db=test_db, redis=mock_redis)
+
+    result = await create_shipment_route(shipment=shipment, articles=[], db=test_db, redis=mock_redis)
+
+    assert isinstance(result, Response)
+    assert result.status_code == HTTPStatus.NO_CONTENT
+    saved = await test_db.execute(
+        select(ShipmentModel)
+        .options(selectinload(ShipmentModel.articles))  # type: ignore[arg-type]
+        .where(ShipmentModel.id == created.id)
+    )
+    assert len(saved.scalar_one().articles) == len(shipment.articles)
+
+
+@pytest.mark.asyncio
+async def test_create_without_articles(test_db: AsyncSession, mock_redis, shipments_stub):
+    shipment = shipments_stub[1]
+    result = await create_shipment_route(shipment=shipment, articles=[], db=test_db, redis=mock_redis)
+
+    assert result.tracking_number == shipment.tracking_number
+    assert result.articles == []
+
+
+@pytest.mark.asyncio
+async def test_concurrent_creates_of_one_tracking_number(db_engine, mock_redis, shipments_stub):
+    shipment = shipments_stub[2]
+    async_session = async_sessionmaker(bind=db_engine, expire_on_commit=False)
+
+    async def create():
+        async with async_session() as session:
+            return await create_shipment_route(
+                shipment=shipment, articles=shipment.articles, db=session, redis=mock_redis
+            )
+
+    results = await asyncio.gather(*(create() for _ in range(5)))
+
+    assert sorted(isinstance(result, Response) for result in results) == [False, True, True, True, True]
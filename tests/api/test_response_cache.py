@@ -0,0 +1,154 @@
+from http import HTTPStatus
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from src.api.middleware.response_cache import ResponseCacheMiddleware, etag_matches, invalidate_responses
+
+
+class FakeRedis:
+    """The hash commands the response cache uses, in memory."""
+
+    def __init__(self):
+        self.hashes: dict[str, dict[str, bytes]] = {}
+
+    async def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+
+    def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update(mapping)
+
+    def expire(self, key, ttl):
+        pass
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.hashes.pop(key, None)
+
+    def pipeline(self, transaction=True):
+        return self
+
+    async def execute(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+
+@pytest.fixture
+def redis_client():
+    return FakeRedis()
+
+
+@pytest.fixture
+def route_calls():
+    return []
+
+
+@pytest_asyncio.fixture
+async def client(redis_client, route_calls):
+    async def shipment(request):
+        route_calls.append(request.url.path)
+        if request.path_params["tracking_number"] == "NONEXISTENT":
+            return JSONResponse({"detail": "Shipment not found"}, status_code=HTTPStatus.NOT_FOUND)
+        if request.path_params["tracking_number"] == "NOWEATHER":
+            return JSONResponse({"weather": None, "version": len(route_calls)}, headers={"Cache-Control": "no-store"})
+        return JSONResponse({"tracking_number": request.path_params["tracking_number"], "version": len(route_calls)})
+
+    async def shipments(request):
+        route_calls.append(request.url.path)
+        return JSONResponse({"shipments": [], "version": len(route_calls)})
+
+    app = Starlette(
+        routes=[
+            Route("/api/v1/shipments/", shipments),
+            Route("/api/v1/shipments/export", shipments),
+            Route("/api/v1/shipments/{tracking_number}", shipment),
+        ]
+    )
+    app.state.redis = redis_client
+    app.add_middleware(ResponseCacheMiddleware, ttl=60)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+def test_etag_matches():
+    assert etag_matches('"a", W/"b"', '"b"')
+    assert etag_matches("*", '"b"')
+    assert not etag_matches('"a"', '"b"')
+    assert not etag_matches(None, '"b"')
+
+
+@pytest.mark.asyncio
+class TestResponseCache:
+    async def test_hit_skips_the_route(self, client, route_calls):
+        first = await client.get("/api/v1/shipments/TN12345678")
+        second = await client.get("/api/v1/shipments/TN12345678")
+
+        assert (first.headers["x-cache"], second.headers["x-cache"]) == ("miss", "hit")
+        assert second.content == first.content
+        assert second.headers["etag"] == first.headers["etag"]
+        assert second.headers["content-type"] == "application/json"
+        assert len(route_calls) == 1
+
+    async def test_if_none_match(self, client, route_calls):
+        etag = (await client.get("/api/v1/shipments/TN12345678")).headers["etag"]
+
+        response = await client.get("/api/v1/shipments/TN12345678", headers={"If-None-Match": etag})
+
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+        assert len(route_calls) == 1
+
+    async def test_read_primary_skips_cached_copies(self, client, route_calls):
+        await client.get("/api/v1/shipments/TN12345678")
+
+        response = await client.get("/api/v1/shipments/TN12345678", headers={"X-Read-Primary": "1"})
+        cached = await client.get("/api/v1/shipments/TN12345678")
+
+        assert response.headers["x-cache"] == "miss"
+        assert cached.content == response.content
+        assert len(route_calls) == 2
+
+    async def test_query_variants_are_cached_separately(self, client, route_calls):
+        await client.get("/api/v1/shipments/?carrier=DHL&limit=2")
+        await client.get("/api/v1/shipments/?limit=2&carrier=DHL")
+        await client.get("/api/v1/shipments/?carrier=UPS")
+
+        assert len(route_calls) == 2
+
+    async def test_errors_and_other_paths_are_not_cached(self, client, route_calls):
+        for _ in range(2):
+            assert (await client.get("/api/v1/shipments/NONEXISTENT")).status_code == HTTPStatus.NOT_FOUND
+            assert "etag" not in (await client.get("/api/v1/shipments/export")).headers
+
+        assert len(route_calls) == 4
+
+    async def test_no_store_responses_are_not_cached(self, client, route_calls):
+        first = await client.get("/api/v1/shipments/NOWEATHER")
+        second = await client.get("/api/v1/shipments/NOWEATHER")
+
+        assert (first.json()["version"], second.json()["version"]) == (1, 2)
+        assert second.headers["cache-control"] == "no-store"
+        assert "etag" not in second.headers
+
+    async def test_invalidation(self, client, redis_client, route_calls):
+        first = await client.get("/api/v1/shipments/TN12345678")
+        await client.get("/api/v1/shipments/")
+
+        await invalidate_responses(redis_client, ["TN12345678"])
+        second = await client.get("/api/v1/shipments/TN12345678")
+        await client.get("/api/v1/shipments/")
+
+        assert second.headers["x-cache"] == "miss"
+        assert second.headers["etag"] != first.headers["etag"]
+        assert len(route_calls) == 4
@@ -1,3 +1,8 @@
+import csv
+import io
+import json
+import time
+
 from http import HTTPStatus
 from unittest.mock import AsyncMock, Mock, patch
 
@@ -6,23 +11,42 @@ import pytest_asyncio
 
 from fastapi import HTTPException, Response
 
-from src.api.routes.shipments import create_shipment as create_shipment_route, find_shipments, get_one_shipment
-from src.services.weather_service import WeatherService
+from src.api.pagination import encode_cursor
+from src.api.routes.shipments import (
+    create_shipment as create_shipment_route,
+    export_all_shipments,
+    find_shipments,
+    get_one_shipment,
+)
+from src.api.schemas.shipment import Shipment, ShipmentsResponse
+from src.config.settings import settings
+from src.db.enums import ShipmentStatus
+from src.db.shipments_repo import ShipmentsRepo
+from src.services import shipments_export
+from src.services.geocoding_service import GeocodingService
+from src.services.shipments_export import CSV_COLUMNS, ExportFormat, export_shipments
+from src.services.weather_service import LAST_KNOWN_PREFIX, WeatherService
 
 
 @pytest_asyncio.fixture(scope="function")
-async def created_shipments(test_db, shipments_stub):
+async def created_shipments(test_db, mock_redis, shipments_stub):
     """Create shipments in the test database."""
     for shipment in shipments_stub:
         # TODO direct insert into DB
-        await create_shipment_route(shipment=shipment, articles=shipment.articles, response=Response(), db=test_db)
+        await create_shipment_route(shipment=shipment, articles=shipment.articles, db=test_db, redis=mock_redis)
+
+
+async def find(**kwargs) -> ShipmentsResponse:
+    """find_shipments renders its own JSON response; read it back as the schema it documents."""
+    response = await find_shipments(**kwargs)
+    return ShipmentsResponse.model_validate_json(response.body)
 
 
 @pytest.mark.asyncio
 class TestGetOne:
     async def test_get_shipment_not_found(self, test_db, mock_redis):
         with pytest.raises(HTTPException) as exc_info:
-            await get_one_shipment(tracking_number="NONEXISTENT", db=test_db, redis=mock_redis)
+            await get_one_shipment(tracking_number="NONEXISTENT", response=Response(), db=test_db, redis=mock_redis)
 
         assert exc_info.value.status_code == HTTPStatus.NOT_FOUND
         assert exc_info.value.detail == "Shipment not found"
@@ -31,7 +55,7 @@ class TestGetOne:
         """Test filtering shipments by carrier."""
         # Act
         with pytest.raises(HTTPException) as exc_info:
-            await get_one_shipment(tracking_number="", db=test_db, redis=mock_redis)
+            await get_one_shipment(tracking_number="", response=Response(), db=test_db, redis=mock_redis)
 
         # Assert
         assert exc_info.value.status_code == HTTPStatus.BAD_REQUEST
@@ -39,37 +63,65 @@ class TestGetOne:
 
     async def test_get_shipment_with_weather(self, test_db, mock_redis, created_shipments, weather_data_stub):
         mock_weather_service = Mock(spec=WeatherService)
-        mock_weather_service.get_weather = AsyncMock(return_value=weather_data_stub)
+        mock_weather_service.get_weather_within = AsyncMock(return_value=(False, weather_data_stub))
 
         with (
             patch("src.api.routes.shipments.WeatherService", return_value=mock_weather_service),
         ):
             # Act
-            result = await get_one_shipment(tracking_number="TN12345681", db=test_db, redis=mock_redis)
+            response = Response()
+            result = await get_one_shipment(
+                tracking_number="TN12345681", response=response, db=test_db, redis=mock_redis
+            )
 
             # Assert
+            assert "cache-control" not in response.headers
             assert result.tracking_number == "TN12345681"
             assert result.carrier == "FedEx"
             assert result.weather == weather_data_stub
             assert len(result.articles) == 2
-            mock_weather_service.get_weather.assert_called_once_with(address="Street 9, 1016 Amsterdam, Netherlands")
+            mock_weather_service.get_weather_within.assert_called_once_with(
+                settings.weather_budget, address="Street 9, 1016 Amsterdam, Netherlands", coordinates=None
+            )
 
-    async def test_get_shipment_weather_service_error(self, test_db, mock_redis, created_shipments):
-        # Mock the weather service to raise an exception
+    async def test_get_shipment_by_carrier(self, test_db, mock_redis, created_shipments, weather_data_stub):
         mock_weather_service = Mock(spec=WeatherService)
-        mock_weather_service.get_weather = AsyncMock(side_effect=Exception("Weather service error"))
-
-        with (
-            patch("src.api.routes.shipments.WeatherService", return_value=mock_weather_service),
-        ):
-            # Act
-            result = await get_one_shipment(tracking_number="TN12345680", db=test_db, redis=mock_redis)
+        mock_weather_service.get_weather_within = AsyncMock(return_value=(False, weather_data_stub))
 
-            assert result.tracking_number == "TN12345680"
-            assert result.weather is None
+        with patch("src.api.routes.shipments.WeatherService", return_value=mock_weather_service):
+            result = await get_one_shipment(
+                tracking_number="TN12345681", response=Response(), carrier="FedEx", db=test_db, redis=mock_redis
+            )
+            assert result.tracking_number == "TN12345681"
+            assert result.weather == weather_data_stub
 
-            # Assert
-            mock_weather_service.get_weather.assert_called_once_with(address="Street 5, 28013 Madrid, Spain")
+            with pytest.raises(HTTPException) as exc_info:
+                await get_one_shipment(
+                    tracking_number="TN12345681", response=Response(), carrier="DHL", db=test_db, redis=mock_redis
+                )
+            assert exc_info.value.status_code == HTTPStatus.NOT_FOUND
+
+    @pytest.mark.parametrize("last_known", [None, {"temp": 290.0}])
+    async def test_get_shipment_weather_service_error(
+        self, test_db, mock_redis, created_shipments, monkeypatch, last_known
+    ):
+        stored = {"fetched_at": time.time() - 9000, "weather": last_known} if last_known else None
+        mock_redis.get.side_effect = lambda key: {
+            LAST_KNOWN_PREFIX + "weather:zip:spain:28013": stored and json.dumps(stored)
+        }.get(key)
+        geocode = AsyncMock(side_effect=Exception("Geocoder down"))
+        monkeypatch.setattr(GeocodingService, "get_coordinates", geocode)
+
+        response = Response()
+        result = await get_one_shipment(
+            tracking_number="TN12345680", response=response, db=test_db, redis=mock_redis, http_session=Mock()
+        )
+
+        assert result.tracking_number == "TN12345680"
+        assert result.weather == last_known
+        # The fallback isn't cached, so the next request tries again.
+        assert response.headers["cache-control"] == "no-store"
+        geocode.assert_awaited_once_with("Street 5, 28013 Madrid, Spain")
 
 
 @pytest.mark.asyncio
@@ -79,10 +131,99 @@ class TestFilteringShipments:
     async def test_filter_1(self, test_db, mock_redis, created_shipments):
         """Test filtering shipments by tracking number."""
         # Act
-        result = await find_shipments(carrier="DHL", db=test_db)
+        result = await find(carrier="DHL", db=test_db)
 
         # Assert
         assert len(result.shipments) == 1
         found_shipment = result.shipments[0]
         assert found_shipment.tracking_number == "TN12345678"
         assert found_shipment.carrier == "DHL"
+
+    async def test_filter_by_carrier_and_status(self, test_db, created_shipments):
+        result = await find(carrier="DHL", status=ShipmentStatus.in_transit, db=test_db)
+        assert [shipment.tracking_number for shipment in result.shipments] == ["TN12345678"]
+
+        with pytest.raises(HTTPException) as exc_info:
+            await find(carrier="DHL", status=ShipmentStatus.delivery, db=test_db)
+        assert exc_info.value.status_code == HTTPStatus.NOT_FOUND
+
+
+@pytest.mark.asyncio
+class TestPagination:
+    async def test_pages_follow_id_order(self, test_db, created_shipments):
+        full = await find(db=test_db)
+        assert full.next_cursor is None
+
+        pages: list[Shipment] = []
+        cursor = None
+        while True:
+            page = await find(limit=2, cursor=cursor, db=test_db)
+            assert len(page.shipments) <= 2
+            pages.extend(page.shipments)
+            if not (cursor := page.next_cursor):
+                break
+
+        assert [shipment.id for shipment in pages] == [shipment.id for shipment in full.shipments]
+        assert [shipment.id for shipment in pages] == sorted(shipment.id for shipment in pages)
+
+    async def test_cursor_composes_with_filter(self, test_db, created_shipments):
+        first = await find(carrier="UPS", limit=1, db=test_db)
+        assert [shipment.tracking_number for shipment in first.shipments] == ["TN12345679"]
+        assert first.next_cursor is None
+
+        with pytest.raises(HTTPException) as exc_info:
+            await find(carrier="UPS", cursor=encode_cursor(first.shipments[0].id), db=test_db)
+        assert exc_info.value.status_code == HTTPStatus.NOT_FOUND
+
+    async def test_invalid_cursor(self, test_db):
+        with pytest.raises(HTTPException) as exc_info:
+            await find(cursor="not-a-cursor", db=test_db)
+        assert exc_info.value.status_code == HTTPStatus.BAD_REQUEST
+
+
+@pytest.mark.asyncio
+class TestExport:
+    async def test_ndjson_streams_in_batches(self, test_db, created_shipments, monkeypatch):
+        monkeypatch.setattr(shipments_export, "EXPORT_BATCH_SIZE", 2)
+
+        chunks = [chunk async for chunk in export_shipments(ShipmentsRepo(test_db), ExportFormat.ndjson)]
+        shipments = [json.loads(line) for chunk in chunks for line in chunk.splitlines()]
+
+        assert all(chunk.count("\n") <= 2 for chunk in chunks)
+        assert [shipment["id"] for shipment in shipments] == sorted(shipment["id"] for shipment in shipments)
+        by_number = {shipment["tracking_number"]: shipment for shipment in shipments}
+        assert [article["sku"] for article in by_number["TN12345678"]["articles"]] == ["LP123", "MO456"]
+
+    async def test_csv_has_a_row_per_article(self, test_db, created_shipments):
+        chunks = export_shipments(ShipmentsRepo(test_db), ExportFormat.csv, carrier="DHL")
+        rows = list(csv.reader(io.StringIO("".join([chunk async for chunk in chunks]))))
+
+        assert tuple(rows[0]) == CSV_COLUMNS
+        shipment = ["TN12345678", "DHL", "Street 10, 75001 Paris, France", "Lisa-Fittko-Str 13, 10557 Berlin, Germany"]
+        # Ids are generated, so only check they are shared by the shipment's rows and differ per article.
+        assert [row[1:6] + row[7:] for row in rows[1:]] == [
+            [*shipment, "in_transit", "Laptop", "1", "800", "LP123"],
+            [*shipment, "in_transit", "Mouse", "1", "25", "MO456"],
+        ]
+        assert rows[1][0] == rows[2][0]
+        assert rows[1][6] != rows[2][6]
+
+    async def test_filtered_out_csv_is_header_only(self, test_db, created_shipments):
+        chunks = export_shipments(ShipmentsRepo(test_db), ExportFormat.csv, carrier="DHL", status=ShipmentStatus.lost)
+        assert [chunk async for chunk in chunks] == [",".join(CSV_COLUMNS) + "\r\n"]
+
+    async def test_route_headers(self):
+        response = await export_all_shipments(export_format=ExportFormat.csv)
+        assert response.media_type == "text/csv"
+        assert response.headers["content-disposition"] == 'attachment; filename="shipments.csv"'
+
+
+@pytest.mark.asyncio
+async def test_list_matches_validated_serialization(test_db, created_shipments):
+    response = await find_shipments(db=test_db)
+    db_shipments = await ShipmentsRepo(test_db).fetch_page(limit=100)
+
+    validated = ShipmentsResponse(shipments=[Shipment.model_validate(db_obj) for db_obj in db_shipments])
+    # Byte for byte, so a price read back as 800 rather than 800.0 shows up.
+    assert response.body == validated.model_dump_json().encode()
+    assert list(json.loads(response.body)["shipments"][0]) == list(Shipment.model_fields)
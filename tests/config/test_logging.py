@@ -0,0 +1,57 @@
+import json
+import logging
+
+import pytest
+
+from prometheus_client import REGISTRY
+
+from src.config.logging import NonBlockingQueueHandler, setup_logging, stop_logging
+from src.config.settings import Settings
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    root = logging.getLogger()
+    level, handlers = root.level, list(root.handlers)
+    yield tmp_path / "app.log"
+    stop_logging()
+    root.handlers = handlers
+    root.setLevel(level)
+    logging.getLogger("noisy").setLevel(logging.NOTSET)
+
+
+def test_records_are_written_as_json(log_file):
+    setup_logging(Settings(log_file=str(log_file), log_json=True, log_levels="noisy=warning"))
+    logger = logging.getLogger("app")
+    logger.info("Shipment %s", "TN1", extra={"tracking_number": "TN1"})
+    logging.getLogger("noisy").info("Dropped by its own level")
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("Failed")
+    stop_logging()
+
+    entries = [json.loads(line) for line in log_file.read_text().splitlines()]
+    messages = {entry["message"]: entry for entry in entries}
+    assert "Dropped by its own level" not in messages
+    assert messages["Shipment TN1"]["tracking_number"] == "TN1"
+    assert messages["Shipment TN1"]["logger"] == "app"
+    assert "ValueError: boom" in messages["Failed"]["exception"]
+    assert [type(handler) for handler in logging.getLogger().handlers].count(NonBlockingQueueHandler) == 1
+
+
+def test_rate_limit_applies_per_call_site_to_info_and_below(log_file):
+    setup_logging(Settings(log_file=str(log_file), log_rate_limit=2))
+    dropped_before = REGISTRY.get_sample_value("log_records_dropped_total", {"reason": "rate_limited"}) or 0
+
+    logger = logging.getLogger("app")
+    for n in range(5):
+        logger.info("Hot path %d", n)
+        logger.warning("Warning %d", n)
+    stop_logging()
+
+    lines = log_file.read_text().splitlines()
+    # All five might not fit into one second, in which case a few more get through.
+    assert 2 <= sum("Hot path" in line for line in lines) < 5
+    assert sum("Warning" in line for line in lines) == 5
+    assert (REGISTRY.get_sample_value("log_records_dropped_total", {"reason": "rate_limited"}) or 0) > dropped_before
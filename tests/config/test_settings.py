@@ -0,0 +1,19 @@
+import pytest
+
+from pydantic import ValidationError
+
+from src.config.settings import CacheKeyStrategy, CacheMode, Settings
+
+
+def test_weather_cache_options_are_parsed_at_startup(monkeypatch):
+    monkeypatch.setenv("WEATHER_CACHE_MODE", "swr")
+    monkeypatch.setenv("WEATHER_CACHE_KEY_STRATEGY", "geohash")
+    settings = Settings()
+    assert (settings.weather_cache_mode, settings.weather_cache_key_strategy) == (
+        CacheMode.swr,
+        CacheKeyStrategy.geohash,
+    )
+
+    monkeypatch.setenv("WEATHER_CACHE_MODE", "forever")
+    with pytest.raises(ValidationError):
+        Settings()
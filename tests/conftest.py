@@ -1,7 +1,7 @@
 import os
 
 from typing import AsyncGenerator
-from unittest.mock import Mock
+from unittest.mock import AsyncMock, Mock
 
 import pytest
 import pytest_asyncio
@@ -12,6 +12,15 @@ from sqlmodel import SQLModel, text
 
 from src.api.schemas.shipment import ArticleCreate, ShipmentCreate
 from src.db.enums import ShipmentStatus
+from src.services import geocoding_service, shipments_cache, weather_service
+
+
+@pytest.fixture(autouse=True)
+def clear_local_caches():
+    yield
+    geocoding_service._local_cache.clear()
+    shipments_cache._local_cache.clear()
+    weather_service._local_cache.clear()
 
 
 @pytest.fixture
@@ -21,7 +30,10 @@ def mock_db():
 
 @pytest.fixture
 def mock_redis():
-    return Mock()
+    redis = AsyncMock()
+    # The only synchronous client method in use; the script it returns is awaited.
+    redis.register_script = Mock(return_value=AsyncMock())
+    return redis
 
 
 @pytest_asyncio.fixture(scope="function")
@@ -48,8 +60,9 @@ async def db_engine():
 
     engine = create_async_engine(TEST_DATABASE_URL, echo=False)
 
-    # Create tables
+    # Recreate tables, every test starts with them empty and matching the models
     async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
         await conn.run_sync(SQLModel.metadata.create_all)
 
     yield engine
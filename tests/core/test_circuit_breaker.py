@@ -0,0 +1,85 @@
+import asyncio
+import time
+
+from contextlib import nullcontext
+
+import pytest
+
+from prometheus_client import REGISTRY
+
+from src.core.circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
+
+
+class UpstreamError(Exception):
+    pass
+
+
+def fail(breaker: CircuitBreaker) -> None:
+    with pytest.raises(UpstreamError), breaker.call():
+        raise UpstreamError
+
+
+def succeed(breaker: CircuitBreaker) -> None:
+    with breaker.call():
+        pass
+
+
+def test_opens_when_failure_rate_is_reached():
+    breaker = CircuitBreaker("test_opens", failure_rate=0.5, min_calls=4)
+    succeed(breaker)
+    succeed(breaker)
+    fail(breaker)
+    assert breaker.state == CircuitState.closed
+
+    fail(breaker)
+
+    assert breaker.state == CircuitState.open
+    with pytest.raises(CircuitOpenError), breaker.call():
+        pytest.fail("called while the circuit is open")
+    assert REGISTRY.get_sample_value("circuit_breaker_state", {"upstream": "test_opens"}) == CircuitState.open
+
+
+def test_failures_outside_the_window_are_forgotten(monkeypatch):
+    breaker = CircuitBreaker("test_window", min_calls=2, window=30)
+    fail(breaker)
+
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 31)
+    fail(breaker)
+
+    assert breaker.state == CircuitState.closed
+
+
+@pytest.mark.parametrize("trial_fails, state", [(False, CircuitState.closed), (True, CircuitState.open)])
+def test_half_open_trial_decides(monkeypatch, trial_fails, state):
+    breaker = CircuitBreaker("test_half_open", min_calls=1, open_seconds=30)
+    fail(breaker)
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 31)
+
+    with pytest.raises(UpstreamError) if trial_fails else nullcontext(), breaker.call():
+        assert breaker.state == CircuitState.half_open
+        # Only one call at a time tries the upstream.
+        with pytest.raises(CircuitOpenError), breaker.call():
+            pass
+        if trial_fails:
+            raise UpstreamError
+
+    assert breaker.state == state
+
+
+@pytest.mark.asyncio
+async def test_cancellation_is_not_a_failure():
+    breaker = CircuitBreaker("test_cancel", min_calls=1)
+
+    async def call():
+        with breaker.call():
+            await asyncio.sleep(10)
+
+    task = asyncio.create_task(call())
+    await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert breaker.state == CircuitState.closed
@@ -0,0 +1,64 @@
+import httpx
+import pytest
+
+from fastapi import FastAPI
+from prometheus_client import REGISTRY
+from starlette.responses import PlainTextResponse
+
+from src.api.middleware.metrics import MetricsMiddleware
+from src.core.metrics import timed
+
+
+def count(name: str, labels: dict[str, str]) -> float:
+    return REGISTRY.get_sample_value(f"{name}_count", labels) or 0
+
+
+@pytest.mark.asyncio
+async def test_timed_decorator_and_block():
+    @timed("test.decorated")
+    async def decorated():
+        raise ValueError
+
+    before = count("stage_seconds", {"stage": "test.decorated"}), count("stage_seconds", {"stage": "test.block"})
+    with pytest.raises(ValueError):
+        await decorated()
+    with timed("test.block"):
+        pass
+
+    assert count("stage_seconds", {"stage": "test.decorated"}) == before[0] + 1
+    assert count("stage_seconds", {"stage": "test.block"}) == before[1] + 1
+
+
+@pytest.mark.asyncio
+async def test_requests_are_labelled_by_route_template():
+    app = FastAPI()
+
+    @app.get("/things/{thing_id}")
+    async def thing(thing_id: int):
+        return {"id": thing_id}
+
+    class ShortCircuit:
+        """Answers /things/0 before routing, like a response cache hit."""
+
+        def __init__(self, app):
+            self.app = app
+
+        async def __call__(self, scope, receive, send):
+            if scope.get("path") == "/things/0":
+                await PlainTextResponse("cached")(scope, receive, send)
+            else:
+                await self.app(scope, receive, send)
+
+    app.add_middleware(ShortCircuit)
+    app.add_middleware(MetricsMiddleware)
+    labels = {"method": "GET", "route": "/things/{thing_id}", "status": "200"}
+    unmatched = {"method": "GET", "route": "unmatched", "status": "404"}
+    before = count("http_request_seconds", labels), count("http_request_seconds", unmatched)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        await client.get("/things/1")
+        await client.get("/things/0")
+        await client.get("/nothing/here")
+
+    assert count("http_request_seconds", labels) == before[0] + 2
+    assert count("http_request_seconds", unmatched) == before[1] + 1
@@ -0,0 +1,87 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from src.api.middleware.profiling import ProfilingMiddleware
+from src.core.profiling import TaskProfiler
+
+
+def busy(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+async def rows():
+    await asyncio.sleep(0.05)
+    yield 1
+
+
+async def query():
+    async for _ in rows():
+        pass
+
+
+async def handler():
+    await query()
+    busy(0.05)
+
+
+def leaf_times(profile: dict) -> dict[str, float]:
+    frames = profile["shared"]["frames"]
+    sampled = profile["profiles"][0]
+    times: dict[str, float] = {}
+    for stack, weight in zip(sampled["samples"], sampled["weights"], strict=True):
+        path = " > ".join(frames[index]["name"] for index in stack)
+        times[path] = times.get(path, 0) + weight
+    return times
+
+
+@pytest.mark.asyncio
+async def test_awaited_and_running_time_is_attributed_to_the_task():
+    task = asyncio.create_task(handler())
+    profiler = TaskProfiler(task, interval=0.001)
+    profiler.start()
+    await task
+    profiler.stop()
+
+    times = leaf_times(profiler.speedscope("test"))
+    awaited = sum(t for path, t in times.items() if path.startswith("handler > query > rows > sleep > [await"))
+    running = sum(t for path, t in times.items() if path.startswith("handler > busy"))
+    assert awaited > 0.03, times
+    assert running > 0.03, times
+
+
+@pytest.fixture
+def app(tmp_path):
+    async def shipment(request):
+        await asyncio.sleep(0.01)
+        return JSONResponse({"ok": True})
+
+    app = Starlette(routes=[Route("/shipments/{tracking_number}", shipment)])
+    app.add_middleware(ProfilingMiddleware, token="secret", sample_every=3, output_dir=str(tmp_path))
+    return app
+
+
+@pytest.mark.asyncio
+async def test_profiles_on_token_or_sampling(app, tmp_path):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        by_header = await client.get("/shipments/TN1", headers={"X-Profile": "secret"})
+        by_query = await client.get("/shipments/TN2", params={"profile": "secret"})
+        sampled = await client.get("/shipments/TN3", headers={"X-Profile": "wrong"})
+        skipped = await client.get("/shipments/TN4")
+
+    assert by_header.json() == {"ok": True}
+    assert "x-profile" not in skipped.headers
+    saved = sorted(path.name for path in tmp_path.iterdir())
+    assert saved == sorted(response.headers["x-profile"] for response in (by_header, by_query, sampled))
+    profile = json.loads((tmp_path / by_header.headers["x-profile"]).read_text())
+    assert profile["name"] == "GET /shipments/TN1"
+    assert profile["profiles"][0]["samples"]
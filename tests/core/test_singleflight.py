@@ -0,0 +1,108 @@
+import asyncio
+
+from unittest.mock import ANY, AsyncMock
+
+import pytest
+
+from src.core.singleflight import RedisLease, SingleFlight
+
+
+@pytest.mark.asyncio
+class TestSingleFlight:
+    async def test_concurrent_calls_share_one_execution(self):
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return calls
+
+        flight: SingleFlight[int] = SingleFlight("test")
+        results = await asyncio.gather(*(flight.do("key", fetch) for _ in range(10)))
+
+        assert results == [1] * 10
+        assert calls == 1
+        assert len(flight) == 0
+
+    async def test_exception_reaches_every_caller(self):
+        async def fetch():
+            await asyncio.sleep(0.01)
+            raise ValueError("upstream down")
+
+        flight: SingleFlight[int] = SingleFlight("test")
+        results = await asyncio.gather(*(flight.do("key", fetch) for _ in range(3)), return_exceptions=True)
+
+        assert all(isinstance(result, ValueError) for result in results)
+        assert len(flight) == 0
+
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        release = asyncio.Event()
+
+        async def fetch():
+            await release.wait()
+            return "value"
+
+        flight: SingleFlight[str] = SingleFlight("test")
+        leader = asyncio.create_task(flight.do("key", fetch))
+        follower = asyncio.create_task(flight.do("key", fetch))
+        await asyncio.sleep(0)
+        leader.cancel()
+        release.set()
+
+        assert await follower == "value"
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+
+
+@pytest.mark.asyncio
+class TestRedisLease:
+    async def test_holder_fetches_and_releases(self, mock_redis):
+        mock_redis.set.return_value = True
+        fetch = AsyncMock(return_value="value")
+
+        result = await RedisLease(mock_redis, "test", ttl=1).run("key", fetch=fetch, poll=AsyncMock())
+
+        assert result == "value"
+        fetch.assert_awaited_once()
+        assert mock_redis.set.await_args.kwargs == {"nx": True, "px": 1000}
+        mock_redis.register_script.return_value.assert_awaited_once_with(keys=["lease:key"], args=[ANY])
+
+    async def test_waits_for_other_worker(self, mock_redis):
+        mock_redis.set.return_value = None
+        fetch = AsyncMock()
+        poll = AsyncMock(side_effect=[(False, None), (True, "cached")])
+
+        result = await RedisLease(mock_redis, "test", ttl=1, poll_interval=0.001).run("key", fetch=fetch, poll=poll)
+
+        assert result == "cached"
+        fetch.assert_not_awaited()
+
+    async def test_takes_over_when_holder_releases_without_value(self, mock_redis):
+        # The holder's fetch failed: its lease is gone but nothing was cached.
+        mock_redis.set.side_effect = [None, None, True]
+        fetch = AsyncMock(return_value="value")
+        poll = AsyncMock(return_value=(False, None))
+
+        result = await RedisLease(mock_redis, "test", ttl=10, poll_interval=0.001).run("key", fetch=fetch, poll=poll)
+
+        assert result == "value"
+        assert poll.await_count == 2
+        fetch.assert_awaited_once()
+        mock_redis.register_script.return_value.assert_awaited_once()
+
+    async def test_fetches_when_lease_expires(self, mock_redis):
+        mock_redis.set.return_value = None
+        fetch = AsyncMock(return_value="value")
+        poll = AsyncMock(return_value=(False, None))
+
+        result = await RedisLease(mock_redis, "test", ttl=0.01, poll_interval=0.001).run("key", fetch=fetch, poll=poll)
+
+        assert result == "value"
+        fetch.assert_awaited_once()
+
+    async def test_redis_error_falls_back_to_fetch(self, mock_redis):
+        mock_redis.set.side_effect = ConnectionError("redis down")
+        fetch = AsyncMock(return_value="value")
+
+        assert await RedisLease(mock_redis, "test", ttl=1).run("key", fetch=fetch, poll=AsyncMock()) == "value"
@@ -0,0 +1,48 @@
+import time
+
+from src.core.ttl_cache import TTLCache
+
+
+def test_lru_eviction():
+    cache = TTLCache("test", maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+
+
+def test_memory_cap():
+    cache = TTLCache("test", maxsize=100, ttl=60, max_bytes=100)
+    cache.set("a", "a", size=40)
+    cache.set("b", "b", size=40)
+    cache.set("c", "c", size=40)
+    cache.set("huge", "huge", size=101)
+
+    assert len(cache) == 2
+    assert cache.bytes == 80
+    assert cache.get("a") is None
+    assert cache.get("huge") is None
+
+
+def test_oversized_value_replaces_cached_one():
+    cache = TTLCache("test", maxsize=10, ttl=60, max_bytes=100)
+    cache.set("a", "small", size=10)
+    cache.set("a", "huge", size=101)
+
+    assert cache.get("a") is None
+    assert cache.bytes == 0
+
+
+def test_expiry(monkeypatch):
+    cache = TTLCache("test", maxsize=10, ttl=60)
+    cache.set("a", 1, size=10)
+    cache.set("b", 2, ttl=120)
+
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 90)
+
+    assert cache.get("a", "missing") == "missing"
+    assert cache.get("b") == 2
+    assert cache.bytes == 0
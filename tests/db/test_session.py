@@ -0,0 +1,76 @@
+import os
+
+import pytest
+import pytest_asyncio
+
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from src.config.settings import Settings
+from src.db.session import MeteredQueuePool, ReadRouter, create_engine, create_sessionmaker
+
+
+def sample(name: str, pool: str) -> float | None:
+    return REGISTRY.get_sample_value(name, {"pool": pool})
+
+
+def test_engine_applies_pool_settings():
+    config = Settings(
+        database_url=os.environ["TEST_DATABASE_URL"], db_pool_size=3, db_max_overflow=2, db_pool_timeout=1
+    )
+    engine = create_engine(name="settings", config=config)
+
+    assert isinstance(engine.pool, MeteredQueuePool)
+    assert engine.pool.size() == 3
+    assert engine.pool.timeout() == 1
+    assert sample("db_pool_size", "settings") == 3
+
+
+@pytest.mark.asyncio
+async def test_pool_utilization_is_reported(db_engine):
+    config = Settings(database_url=os.environ["TEST_DATABASE_URL"], db_pool_size=1, db_max_overflow=1)
+    engine = create_engine(name="utilization", config=config)
+    checkouts_before = sample("db_pool_checkout_seconds_count", "utilization") or 0
+
+    try:
+        async with engine.connect(), engine.connect():
+            assert sample("db_pool_checked_out", "utilization") == 2
+            assert sample("db_pool_overflow", "utilization") == 1
+        assert sample("db_pool_checked_out", "utilization") == 0
+        assert sample("db_pool_checkout_seconds_count", "utilization") == checkouts_before + 2
+    finally:
+        await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def replica_engines(db_engine):
+    # Two "replicas" that are the test database under its own DSN, as in local setups.
+    engines = [create_engine(os.environ["TEST_DATABASE_URL"], name=f"test-replica{n}") for n in (1, 2)]
+    yield engines
+    for engine in engines:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_reads_rotate_over_read_only_replicas(db_engine, replica_engines):
+    router = ReadRouter(create_sessionmaker(db_engine), replica_engines)
+
+    sessions = [router.session() for _ in range(3)]
+    assert [session.bind.sync_engine.pool for session in sessions] == [
+        engine.pool for engine in (*replica_engines, replica_engines[0])
+    ]
+    async with sessions[0] as session:
+        assert await session.scalar(text("SELECT count(*) FROM shipment")) == 0
+        with pytest.raises(DBAPIError, match="read-only transaction"):
+            await session.execute(text("DELETE FROM shipment"))
+
+    async with router.session(read_primary=True) as session:
+        assert session.bind is db_engine
+        await session.execute(text("DELETE FROM shipment"))
+
+
+def test_reads_use_the_primary_without_replicas(db_engine):
+    router = ReadRouter(create_sessionmaker(db_engine), [])
+
+    assert router.session().bind is db_engine
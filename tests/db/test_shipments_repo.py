@@ -0,0 +1,125 @@
+import pytest
+
+from sqlalchemy import event, text
+
+from src.api.schemas.shipment import Article, ArticleCreate, ShipmentCreate
+from src.db.enums import ShipmentStatus
+from src.db.shipments_repo import ShipmentRecord, ShipmentsRepo
+
+
+CARRIERS = ("DHL", "UPS", "DPD", "GLS", "FedEx")
+
+
+@pytest.mark.asyncio
+async def test_read_is_one_statement_returning_records(db_engine, test_db):
+    repo = ShipmentsRepo(test_db)
+    articles = [
+        ArticleCreate(name="Mouse", quantity=1, price=25.0, sku="MO456"),
+        ArticleCreate(name="Laptop", quantity=2, price=800.0, sku="LP123"),
+    ]
+    for tracking_number, shipment_articles in (("TN00000001", articles), ("TN00000002", [])):
+        shipment = ShipmentCreate(
+            tracking_number=tracking_number,
+            carrier="DHL",
+            sender_address="Street 1, 10115 Berlin, Germany",
+            receiver_address="Street 10, 75001 Paris, France",
+            status=ShipmentStatus.in_transit,
+        )
+        await repo.create_shipment(shipment, shipment_articles)
+
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db_engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        record = await repo.get_one_by_tracking("TN00000001")
+    finally:
+        event.remove(db_engine.sync_engine, "before_cursor_execute", capture)
+
+    assert len(statements) == 1
+    assert isinstance(record, ShipmentRecord)
+    assert record.status is ShipmentStatus.in_transit
+    assert [(article["name"], article["quantity"]) for article in record.articles] == [("Mouse", 1), ("Laptop", 2)]
+    assert list(record.articles[0]) == list(Article.model_fields)
+    without_articles = await repo.get_one_by_tracking("TN00000002")
+    assert without_articles is not None
+    assert without_articles.articles == []
+    assert await repo.get_one_by_tracking("NONEXISTENT") is None
+
+
+async def explain_statement(db_engine, query) -> list[str]:
+    """EXPLAIN output of the first statement `query` runs."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(db_engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        await query
+    finally:
+        event.remove(db_engine.sync_engine, "before_cursor_execute", capture)
+    statement, parameters = statements[0]
+    async with db_engine.connect() as conn:
+        return [row[0] for row in await conn.exec_driver_sql(f"EXPLAIN {statement}", parameters)]
+
+
+@pytest.mark.asyncio
+async def test_lookups_use_their_indexes(db_engine, test_db):
+    repo = ShipmentsRepo(test_db)
+    await repo.bulk_create(
+        [
+            ShipmentCreate(
+                tracking_number=f"TN{n:08d}",
+                # One shipment in a thousand is a rare carrier's, so filtering by it is selective.
+                carrier="Hermes" if n % 1000 == 0 else CARRIERS[n % len(CARRIERS)],
+                sender_address="Street 1, 10115 Berlin, Germany",
+                receiver_address="Street 10, 75001 Paris, France",
+                status=ShipmentStatus.in_transit,
+            )
+            for n in range(5000)
+        ]
+    )
+    async with db_engine.connect() as conn:
+        await conn.execute(text("ANALYZE shipment"))
+
+    assert await repo.find_one_by_params(tracking_number="TN00000042", carrier="DPD") is not None
+    assert await repo.find_one_by_params(tracking_number="TN00000042", carrier="DHL") is None
+    # Each a single index probe returning at most one row, never a scan of the table. With the carrier, either
+    # index is as good: the planner's pick between them is a tie.
+    plan = await explain_statement(db_engine, repo.find_one_by_params(tracking_number="TN00000042", carrier="DPD"))
+    assert plan[0].startswith("Index Scan using ix_shipment_"), plan
+    assert "rows=1 " in plan[0], plan
+    plan = await explain_statement(db_engine, repo.get_one_by_tracking("TN00000042"))
+    assert plan[0].startswith("Index Scan using ix_shipment_tracking_number on shipment"), plan
+    assert "rows=1 " in plan[0], plan
+
+    assert len(await repo.filter_by_carrier("Hermes")) == 5
+    # Filtering by carrier alone needs a composite index led by the carrier; either one will do.
+    plan = await explain_statement(db_engine, repo.filter_by_carrier("Hermes"))
+    index_scans = ("Index Scan using ix_shipment_carrier_", "Index Scan on ix_shipment_carrier_")
+    assert any(scan in line for line in plan for scan in index_scans), plan
+    assert not any("Seq Scan on shipment" in line for line in plan), plan
+
+    page = await repo.fetch_page(limit=2, after_id=1000, carrier="Hermes")
+    assert [record.tracking_number for record in page] == ["TN00001000", "TN00002000"]
+    # A filtered page walks the (carrier, id) index from the cursor: neither filtered by id nor sorted.
+    plan = await explain_statement(db_engine, repo.fetch_page(limit=2, after_id=1000, carrier="Hermes"))
+    shipment_plan = plan[: next(n for n, line in enumerate(plan) if "SubPlan" in line)]  # without the articles
+    assert shipment_plan[1].startswith("  ->  Index Scan using ix_shipment_carrier_id on shipment"), plan
+    assert "(id > 1000)" in shipment_plan[2], plan
+    assert not any("Sort" in line or "Filter" in line for line in shipment_plan), plan
+
+
+@pytest.mark.asyncio
+async def test_carrier_filter_uses_composite_index(db_engine):
+    async with db_engine.connect() as conn:
+        # Empty table: without this, the planner picks a sequential scan regardless of indexes.
+        await conn.exec_driver_sql("SET enable_seqscan = off")
+        plan = [row[0] for row in await conn.exec_driver_sql("EXPLAIN SELECT id FROM shipment WHERE carrier = 'DHL'")]
+
+    # Either composite index led by the carrier; (carrier, id) covers this query.
+    index_scans = ("Index Scan using ix_shipment_carrier_", "Index Scan on ix_shipment_carrier_")
+    assert any(scan in line for line in plan for scan in index_scans), plan
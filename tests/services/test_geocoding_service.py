@@ -0,0 +1,57 @@
+import json
+
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.services import geocoding_service
+from src.services.geocoding_service import Coordinates, GeocodingService, normalize_address
+
+
+@pytest.fixture
+def redis_stub(mock_redis):
+    storage: dict[str, str] = {}
+    mock_redis.get.side_effect = storage.get
+    mock_redis.setex.side_effect = lambda key, ttl, value: storage.__setitem__(key, value)
+    return mock_redis
+
+
+def test_normalize_address():
+    assert normalize_address("  Street 10,75001   Paris ,, FRANCE ") == "street 10, 75001 paris, france"
+    assert normalize_address("Lisa-Fittko-Str 13, 10557 Berlin") == normalize_address("lisa-fittko-str 13,10557 berlin")
+
+
+@pytest.mark.asyncio
+class TestGetCoordinates:
+    async def test_geocodes_once_per_normalized_address(self, redis_stub):
+        service = GeocodingService(redis_stub)
+        service._geocode = AsyncMock(return_value=Coordinates(latitude=48.86, longitude=2.35))
+
+        first = await service.get_coordinates("Street 10, 75001 Paris, France")
+        second = await service.get_coordinates("street 10,  75001 paris, france")
+
+        assert first == second == Coordinates(latitude=48.86, longitude=2.35)
+        service._geocode.assert_awaited_once()
+        redis_stub.setex.assert_awaited_once_with(
+            "geocode:street 10, 75001 paris, france", service.cache_ttl, first.model_dump_json()
+        )
+
+    async def test_redis_hit_skips_geocoder(self, redis_stub):
+        redis_stub.get.side_effect = None
+        redis_stub.get.return_value = json.dumps({"latitude": 1.0, "longitude": 2.0})
+        service = GeocodingService(redis_stub)
+        service._geocode = AsyncMock()
+
+        assert await service.get_coordinates("Somewhere") == Coordinates(latitude=1.0, longitude=2.0)
+        service._geocode.assert_not_awaited()
+
+    async def test_negative_caching(self, redis_stub):
+        service = GeocodingService(redis_stub)
+        service._geocode = AsyncMock(return_value=None)
+
+        assert await service.get_coordinates("Nowhere 1") is None
+        geocoding_service._local_cache.clear()
+        assert await service.get_coordinates("Nowhere 1") is None
+
+        service._geocode.assert_awaited_once()
+        redis_stub.setex.assert_awaited_once_with("geocode:nowhere 1", service.negative_cache_ttl, "null")
@@ -0,0 +1,77 @@
+import asyncio
+
+from unittest.mock import AsyncMock
+
+import pytest
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.config.settings import CacheKeyStrategy
+from src.db.shipments_repo import ShipmentsRepo
+from src.services import shipment_locations
+from src.services.geocoding_service import Coordinates, GeocodingService
+from src.services.shipment_locations import backfill_locations, locate_in_background
+from src.services.shipments_cache import INVALIDATION_CHANNEL, get_shipment
+from src.services.weather_service import WeatherService
+
+
+BERLIN = Coordinates(latitude=52.5277, longitude=13.3734)
+
+
+@pytest.mark.asyncio
+async def test_backfill_stores_coordinates_and_skips_unresolvable(
+    db_engine, test_db, shipments_stub, mock_redis, monkeypatch
+):
+    repo = ShipmentsRepo(test_db)
+    await repo.bulk_create(shipments_stub[:3])
+    geocode = AsyncMock(side_effect=lambda address: BERLIN if "Madrid" not in address else None)
+    monkeypatch.setattr(GeocodingService, "get_coordinates", lambda self, address: geocode(address))
+    sessions = async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)
+
+    result = await backfill_locations(sessions, mock_redis, batch_size=2)
+
+    assert (result.shipments, result.located) == (3, 2)
+    berlin = await get_shipment(repo, "TN12345678")
+    assert berlin is not None
+    assert (berlin.receiver_latitude, berlin.receiver_longitude) == (BERLIN.latitude, BERLIN.longitude)
+    madrid = await get_shipment(repo, "TN12345680")
+    assert madrid is not None
+    assert madrid.receiver_latitude is None
+
+    # Only the one that couldn't be geocoded is tried again.
+    assert (await backfill_locations(sessions, mock_redis)).shipments == 1
+
+
+@pytest.mark.asyncio
+async def test_located_shipment_is_invalidated(db_engine, test_db, shipments_stub, mock_redis, monkeypatch):
+    repo = ShipmentsRepo(test_db)
+    [(shipment_id, _)] = await repo.bulk_create(shipments_stub[:1])
+    monkeypatch.setattr(GeocodingService, "get_coordinates", AsyncMock(return_value=BERLIN))
+    monkeypatch.setattr(
+        shipment_locations, "async_session", async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)
+    )
+    # Cached before the coordinates are stored, as a read right after creating it would.
+    cached = await get_shipment(repo, "TN12345678")
+    assert cached is not None
+    assert cached.receiver_latitude is None
+
+    locate_in_background(mock_redis, shipment_id, "TN12345678", shipments_stub[0].receiver_address)
+    await asyncio.gather(*shipment_locations._locating)
+
+    mock_redis.publish.assert_awaited_once_with(INVALIDATION_CHANNEL, "TN12345678")
+    located = await get_shipment(repo, "TN12345678")
+    assert located is not None
+    assert located.receiver_latitude == BERLIN.latitude
+
+
+@pytest.mark.asyncio
+async def test_known_coordinates_skip_geocoding(weather_data_stub, mock_redis):
+    mock_redis.get.return_value = None
+    service = WeatherService(mock_redis, http_session=AsyncMock())
+    service.cache_key_strategy = CacheKeyStrategy.geohash
+    service._get_coordinates = AsyncMock()
+    service._get_openweathermap = AsyncMock(return_value=weather_data_stub)
+
+    assert await service.get_weather("Lisa-Fittko-Str 13, 10557 Berlin, Germany", coordinates=BERLIN)
+    service._get_coordinates.assert_not_awaited()
+    service._get_openweathermap.assert_awaited_once_with(coordinates=BERLIN)
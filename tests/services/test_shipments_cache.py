@@ -0,0 +1,68 @@
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.db.enums import ShipmentStatus
+from src.db.shipments_repo import ShipmentRecord
+from src.services import shipments_cache
+from src.services.shipments_cache import INVALIDATION_CHANNEL, get_shipment, invalidate_shipment
+
+
+@pytest.fixture
+def repo():
+    db_shipment = ShipmentRecord(
+        id=1,
+        tracking_number="TN12345678",
+        carrier="DHL",
+        sender_address="Street 1, 10115 Berlin, Germany",
+        receiver_address="Street 10, 75001 Paris, France",
+        status=ShipmentStatus.in_transit,
+        articles=[{"id": 1, "name": "Laptop", "quantity": 1, "price": 800.0, "sku": "LP123"}],
+        receiver_latitude=48.8566,
+        receiver_longitude=2.3522,
+    )
+    repo = AsyncMock()
+    repo.get_one_by_tracking.return_value = db_shipment
+    repo.find_one_by_params.return_value = db_shipment
+    return repo
+
+
+@pytest.mark.asyncio
+class TestShipmentsCache:
+    async def test_repeated_reads_hit_local_cache(self, repo):
+        first = await get_shipment(repo, "TN12345678")
+        second = await get_shipment(repo, "TN12345678")
+
+        assert first is second
+        assert first is not None
+        assert first.articles[0].sku == "LP123"
+        assert (first.receiver_latitude, first.receiver_longitude) == (48.8566, 2.3522)
+        repo.get_one_by_tracking.assert_awaited_once_with(tracking_number="TN12345678")
+        assert shipments_cache._local_cache.bytes > 0
+
+    async def test_not_found_is_not_cached(self, repo):
+        repo.get_one_by_tracking.return_value = None
+
+        assert await get_shipment(repo, "NONEXISTENT") is None
+        assert await get_shipment(repo, "NONEXISTENT") is None
+        assert repo.get_one_by_tracking.await_count == 2
+
+    async def test_carrier_scoped_lookup(self, repo):
+        first = await get_shipment(repo, "TN12345678", carrier="DHL")
+        assert first is not None
+        assert first.carrier == "DHL"
+        repo.find_one_by_params.assert_awaited_once_with(tracking_number="TN12345678", carrier="DHL")
+
+        # Served from the local cache, which knows the carrier.
+        assert await get_shipment(repo, "TN12345678", carrier="UPS") is None
+        assert await get_shipment(repo, "TN12345678") is first
+        repo.find_one_by_params.assert_awaited_once()
+        repo.get_one_by_tracking.assert_not_awaited()
+
+    async def test_invalidation(self, repo, mock_redis):
+        await get_shipment(repo, "TN12345678")
+        await invalidate_shipment(mock_redis, "TN12345678")
+        await get_shipment(repo, "TN12345678")
+
+        assert repo.get_one_by_tracking.await_count == 2
+        mock_redis.publish.assert_awaited_once_with(INVALIDATION_CHANNEL, "TN12345678")
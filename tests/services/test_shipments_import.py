@@ -0,0 +1,73 @@
+import io
+
+import pytest
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import selectinload
+from sqlmodel import col
+
+from src.db.enums import ShipmentStatus
+from src.db.models.shipment import Article as ArticleModel, Shipment as ShipmentModel
+from src.services.shipments_import import ShipmentImportError, import_shipments, parse_status, read_groups
+
+
+HEADER = (
+    "tracking_number,carrier,sender_address,receiver_address,article_name,article_quantity,article_price,SKU,status\n"
+)
+SEED = HEADER + (
+    'TN12345678,DHL,"Street 1, 10115 Berlin, Germany","Street 10, 75001 Paris, France",Laptop,1,800,LP123,in_transit\n'
+    'TN12345678,DHL,"Street 1, 10115 Berlin, Germany","Street 10, 75001 Paris, France",Mouse,1,25,MO456,in_transit\n'
+    'TN12345679,UPS,"Street 2, 20144 Hamburg, Germany","Street 20, 1000 Brussels, Belgium",Monitor,2,200,MT789,'
+    "inbound-scan\n"
+)
+
+
+def test_parse_status():
+    assert parse_status("inbound-scan") is ShipmentStatus.inbound_scan
+    assert parse_status(" In_Transit ") is ShipmentStatus.in_transit
+    with pytest.raises(ValueError, match="unknown status"):
+        parse_status("teleported")
+
+
+def test_read_groups_groups_consecutive_rows():
+    groups = list(read_groups(io.StringIO(SEED + "\n")))
+
+    assert [(line, [row[4] for row in rows]) for line, rows in groups] == [(2, ["Laptop", "Mouse"]), (4, ["Monitor"])]
+
+
+def test_read_groups_checks_header():
+    with pytest.raises(ShipmentImportError, match="line 1"):
+        list(read_groups(io.StringIO("tracking_number,carrier\n")))
+
+
+@pytest.mark.asyncio
+class TestImportShipments:
+    async def test_imports_and_skips_known_tracking_numbers(self, db_engine, test_db):
+        async with db_engine.begin() as conn:
+            result = await import_shipments(conn, io.StringIO(SEED))
+        assert (result.rows, result.shipments, result.shipments_created, result.articles_created) == (3, 2, 2, 3)
+
+        saved = await test_db.execute(
+            select(ShipmentModel)
+            .options(selectinload(ShipmentModel.articles))  # type: ignore[arg-type]
+            .where(col(ShipmentModel.tracking_number) == "TN12345679")
+        )
+        shipment = saved.scalar_one()
+        assert shipment.status == ShipmentStatus.inbound_scan
+        assert [(article.name, article.quantity, article.price) for article in shipment.articles] == [
+            ("Monitor", 2, 200.0)
+        ]
+
+        again = SEED + 'TN12345680,DPD,"Street 3","Street 5",Keyboard,1,50,KB012,delivery\n'
+        async with db_engine.begin() as conn:
+            result = await import_shipments(conn, io.StringIO(again))
+        assert (result.shipments, result.shipments_created, result.articles_created) == (3, 1, 1)
+
+    async def test_invalid_row_imports_nothing(self, db_engine, test_db):
+        with pytest.raises(ShipmentImportError, match="line 3: shipment columns differ within TN12345678"):
+            async with db_engine.begin() as conn:
+                await import_shipments(
+                    conn, io.StringIO(SEED.replace("Mouse,1,25,MO456,in_transit", "Mouse,1,25,MO456,lost"))
+                )
+
+        assert await test_db.scalar(select(func.count()).select_from(ArticleModel)) == 0
@@ -0,0 +1,78 @@
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.config.settings import settings
+from src.db.enums import ShipmentStatus
+from src.db.shipments_repo import ShipmentsRepo
+from src.services import weather_service
+from src.services.weather_prefetch import WeatherPrefetcher
+
+
+class FakePipeline:
+    def __init__(self, ttls: dict[str, int]):
+        self.ttls = ttls
+        self.keys: list[str] = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    def ttl(self, key: str) -> None:
+        self.keys.append(key)
+
+    async def execute(self) -> list[int]:
+        return [self.ttls.get(key, -2) for key in self.keys]
+
+
+@pytest.mark.asyncio
+async def test_refreshes_due_active_locations_most_viewed_first(
+    db_engine, test_db, shipments_stub, weather_data_stub, mock_redis
+):
+    shipments_stub[4].status = ShipmentStatus.lost
+    repo = ShipmentsRepo(test_db)
+    ids = [shipment_id for shipment_id, _ in await repo.bulk_create(shipments_stub)]
+    await repo.set_receiver_locations([(shipment_id, 50.0, 10.0) for shipment_id in ids])
+
+    mock_redis.pipeline = Mock(
+        return_value=FakePipeline(
+            {
+                "weather:zip:germany:10557": 600,  # stale in 10 minutes, due since 5
+                "weather:zip:belgium:1000": 5000,  # fresh for long enough
+                # Madrid and Amsterdam expired
+            }
+        )
+    )
+    mock_redis.zmscore.side_effect = lambda key, members: [
+        {"weather:zip:netherlands:1016": 7.0, "weather:zip:germany:10557": 3.0}.get(member) for member in members
+    ]
+    sessions = async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)
+    prefetcher = WeatherPrefetcher(
+        mock_redis, Mock(), sessions, interval=60, refresh_ahead=900, rate=1000, batch_size=1
+    )
+    prefetcher.weather.refresh = AsyncMock(return_value=weather_data_stub)
+
+    result = await prefetcher.run_once()
+
+    # Copenhagen's shipment is lost.
+    assert (result.locations, result.due, result.refreshed) == (4, 3, 3)
+    refreshed = [call.args[0] for call in prefetcher.weather.refresh.await_args_list]
+    assert refreshed == ["weather:zip:netherlands:1016", "weather:zip:germany:10557", "weather:zip:spain:28013"]
+    mock_redis.zunionstore.assert_awaited_once_with("weather:prefetch:views", {"weather:prefetch:views": 0.5})
+
+
+@pytest.mark.asyncio
+async def test_lookups_are_counted_for_the_prefetcher(monkeypatch, mock_redis):
+    monkeypatch.setattr(settings, "weather_prefetch_interval", 60)
+    mock_redis.get.return_value = None
+    service = weather_service.WeatherService(mock_redis, Mock())
+
+    for _ in range(3):
+        await service._get_cached_weather("weather:zip:france:75001", "zip", "")
+
+    assert weather_service.take_views() == {"weather:zip:france:75001": 3}
+    assert weather_service.take_views() == {}
@@ -0,0 +1,228 @@
+import asyncio
+import json
+import time
+
+from unittest.mock import AsyncMock, Mock
+
+import aiohttp
+import pytest
+import pytest_asyncio
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from prometheus_client import REGISTRY
+
+from src.core.circuit_breaker import CircuitBreaker, CircuitState
+from src.services import weather_service
+from src.services.weather_service import CacheKeyStrategy, CacheMode, Coordinates, WeatherService
+
+
+@pytest_asyncio.fixture(scope="function")
+async def weather_server(weather_data_stub):
+    calls = []
+
+    async def handler(request: web.Request) -> web.Response:
+        calls.append(dict(request.query))
+        return web.json_response(weather_data_stub)
+
+    app = web.Application()
+    app.router.add_get("/data/2.5/weather", handler)
+    server = TestServer(app)
+    await server.start_server()
+    server.calls = calls  # type: ignore[attr-defined]
+    yield server
+    await server.close()
+
+
+@pytest_asyncio.fixture(scope="function")
+async def http_session():
+    async with aiohttp.ClientSession(raise_for_status=True) as session:
+        yield session
+
+
+@pytest.mark.asyncio
+class TestGetWeather:
+    async def test_fetches_and_caches(self, weather_server, http_session, weather_data_stub, mock_redis):
+        mock_redis.get.return_value = None
+        service = WeatherService(mock_redis, http_session)
+        service.base_url = str(weather_server.make_url("/data/2.5/weather"))
+        service._get_coordinates = AsyncMock(return_value=Coordinates(latitude=52.52, longitude=13.4))
+
+        result = await service.get_weather(address="Street 10, 75001 Paris, France")
+
+        assert result == weather_data_stub
+        assert weather_server.calls == [{"lat": "52.52", "lon": "13.4", "appid": ""}]
+        (key, ttl, value), (last_known_key, last_known_ttl, _) = [
+            call.args for call in mock_redis.setex.await_args_list
+        ]
+        assert (key, ttl) == ("weather:zip:france:75001", 7200)
+        assert json.loads(value)["weather"] == weather_data_stub
+        assert (last_known_key, last_known_ttl) == ("weather:last:weather:zip:france:75001", 86400)
+
+    async def test_cache_hit_skips_upstream(self, weather_server, http_session, weather_data_stub, mock_redis):
+        mock_redis.get.return_value = json.dumps({"fetched_at": time.time(), "weather": weather_data_stub})
+        service = WeatherService(mock_redis, http_session)
+        service.base_url = str(weather_server.make_url("/data/2.5/weather"))
+        service._get_coordinates = AsyncMock(return_value=Coordinates(latitude=52.52, longitude=13.4))
+
+        assert await service.get_weather(address="Street 10, 75001 Paris, France") == weather_data_stub
+        assert weather_server.calls == []
+        service._get_coordinates.assert_not_awaited()
+
+    async def test_concurrent_misses_fetch_once(self, weather_server, http_session, weather_data_stub, mock_redis):
+        mock_redis.get.return_value = None
+        service = WeatherService(mock_redis, http_session)
+        service.base_url = str(weather_server.make_url("/data/2.5/weather"))
+        service._get_coordinates = AsyncMock(return_value=Coordinates(latitude=52.52, longitude=13.4))
+
+        results = await asyncio.gather(
+            *(service.get_weather(address="Street 10, 75001 Paris, France") for _ in range(20))
+        )
+
+        assert results == [weather_data_stub] * 20
+        assert len(weather_server.calls) == 1
+
+    async def test_upstream_error(self, http_session):
+        service = WeatherService(Mock(), http_session)
+        service.base_url = "http://127.0.0.1:1/data/2.5/weather"
+
+        assert await service._get_openweathermap(Coordinates(latitude=1.0, longitude=2.0)) is None
+
+
+class TestCacheKeys:
+    @pytest.mark.parametrize(
+        "address, expected",
+        [
+            ("Street 10, 75001 Paris, France", "weather:zip:france:75001"),
+            ("Street 20, 1000 Brussels, Belgium", "weather:zip:belgium:1000"),
+            ("Lisa-Fittko-Str 13, 10557  Berlin, GERMANY", "weather:zip:germany:10557"),
+            ("Street 1016, Amsterdam, Netherlands", None),
+            ("Somewhere 12345", None),
+        ],
+    )
+    def test_address_cache_key(self, address, expected):
+        assert WeatherService(Mock(), Mock())._get_address_cache_key(address) == expected
+
+    def test_geohash_groups_nearby_coordinates(self):
+        service = WeatherService(Mock(), Mock())
+        first = service._get_coordinates_cache_key(Coordinates(latitude=52.5251, longitude=13.3694))
+        second = service._get_coordinates_cache_key(Coordinates(latitude=52.5259, longitude=13.3711))
+        assert first == second == "weather:geohash:u33db"
+
+    def test_coordinates_strategy(self):
+        service = WeatherService(Mock(), Mock())
+        service.cache_key_strategy = CacheKeyStrategy.coordinates
+        assert service._get_address_cache_key("Street 10, 75001 Paris, France") is None
+        key = service._get_coordinates_cache_key(Coordinates(latitude=52.52, longitude=13.4))
+        assert key == "weather_lat_lon:52.52:13.4"
+
+    @pytest.mark.asyncio
+    async def test_hit_and_miss_counters(self, weather_data_stub, mock_redis):
+        def sample(result):
+            labels = {"key_kind": "zip", "result": result}
+            return REGISTRY.get_sample_value("weather_cache_requests_total", labels) or 0
+
+        hits, misses = sample("hit"), sample("miss")
+        service = WeatherService(mock_redis, Mock())
+
+        mock_redis.get.return_value = None
+        assert await service._get_cached_weather("weather:zip:france:75001", "zip", "") is None
+        mock_redis.get.return_value = json.dumps(weather_data_stub)  # entry cached before fetched_at was recorded
+        assert await service._get_cached_weather("weather:zip:france:75001", "zip", "") == weather_data_stub
+
+        assert (sample("hit"), sample("miss")) == (hits + 1, misses + 1)
+
+
+@pytest.mark.asyncio
+class TestStaleWhileRevalidate:
+    @pytest.fixture
+    def storage(self):
+        return {
+            "weather:zip:france:75001": json.dumps(
+                {"fetched_at": time.time() - 7300, "weather": {"name": "Paris, two hours ago"}}
+            )
+        }
+
+    @pytest_asyncio.fixture
+    async def stale_service(self, weather_server, http_session, mock_redis, storage):
+        mock_redis.get.side_effect = storage.get
+        mock_redis.setex.side_effect = lambda key, ttl, value: storage.__setitem__(key, value)
+        service = WeatherService(mock_redis, http_session)
+        service.base_url = str(weather_server.make_url("/data/2.5/weather"))
+        service._get_coordinates = AsyncMock(return_value=Coordinates(latitude=48.86, longitude=2.35))
+        return service
+
+    async def test_serves_stale_and_refreshes_in_background(
+        self, stale_service, storage, weather_server, weather_data_stub
+    ):
+        stale_service.cache_mode = CacheMode.swr
+
+        results = await asyncio.gather(
+            *(stale_service.get_weather(address="Street 10, 75001 Paris, France") for _ in range(5))
+        )
+        assert results == [{"name": "Paris, two hours ago"}] * 5
+
+        await asyncio.gather(*weather_service._refreshing.values())
+        assert len(weather_server.calls) == 1
+        assert json.loads(storage["weather:zip:france:75001"])["weather"] == weather_data_stub
+        assert stale_service.redis_client.setex.await_args_list[0].args[1] == stale_service.cache_hard_ttl
+
+        assert await stale_service.get_weather(address="Street 10, 75001 Paris, France") == weather_data_stub
+
+    async def test_ttl_mode_leaves_expiry_to_redis(self, stale_service, weather_server):
+        stale_service.cache_mode = CacheMode.ttl
+
+        result = await stale_service.get_weather(address="Street 10, 75001 Paris, France")
+
+        assert result == {"name": "Paris, two hours ago"}
+        assert weather_service._refreshing == {}
+        assert weather_server.calls == []
+
+
+@pytest.mark.asyncio
+class TestLatencyBudget:
+    def service(self, redis, last_known=None):
+        redis.get.side_effect = lambda key: {"weather:last:weather:zip:france:75001": last_known}.get(key)
+        return WeatherService(redis, Mock())
+
+    async def test_slow_lookup_serves_last_known(self, weather_data_stub, mock_redis):
+        service = self.service(
+            mock_redis, last_known=json.dumps({"fetched_at": time.time() - 9000, "weather": weather_data_stub})
+        )
+
+        async def slow_lookup(address, coordinates=None):
+            await asyncio.sleep(1)
+
+        service.get_weather = slow_lookup
+        labels = {"reason": "budget", "served": "last_known"}
+        before = REGISTRY.get_sample_value("weather_fallbacks_total", labels) or 0
+
+        result = await service.get_weather_within(0.01, address="Street 10, 75001 Paris, France")
+
+        assert result == (True, weather_data_stub)
+        assert REGISTRY.get_sample_value("weather_fallbacks_total", labels) == before + 1
+
+    async def test_lookup_within_budget_is_not_a_fallback(self, weather_data_stub, mock_redis):
+        service = self.service(mock_redis)
+        service.get_weather = AsyncMock(return_value=weather_data_stub)
+
+        assert await service.get_weather_within(1, address="Street 10, 75001 Paris, France") == (
+            False,
+            weather_data_stub,
+        )
+
+    async def test_failed_lookup_without_last_known_serves_none(self, mock_redis):
+        service = self.service(mock_redis)
+        service.get_weather = AsyncMock(side_effect=Exception("geocoder down"))
+
+        assert await service.get_weather_within(1, address="Street 10, 75001 Paris, France") == (True, None)
+
+    async def test_open_circuit_skips_upstream(self, monkeypatch, mock_redis):
+        breaker = CircuitBreaker("test_openweathermap", min_calls=1)
+        breaker._transition(CircuitState.open)
+        monkeypatch.setattr(weather_service, "_breaker", breaker)
+        http_session = Mock()
+        service = WeatherService(mock_redis, http_session)
+
+        assert await service._get_openweathermap(Coordinates(latitude=48.86, longitude=2.35)) is None
+        http_session.get.assert_not_called()